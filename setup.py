@@ -30,23 +30,29 @@ requirements = [
     "tqdm>=4.45.0",
     "numpy>=1.18.2",
     "nltk>=3.4.5",
+    # Used directly by twitter_analysis_tools.text.tokenize.
+    "regex>=2021.8.3",
     "scikit-learn>=0.22.2.post1",
     "loguru>=0.4.1",
     "matplotlib>=3.2.1",
     "seaborn>=0.10.0",
-    "demoji==0.2.1",
     "scipy>=1.4.1",
     "pyfunctional>=1.3.0",
     "lazy-property>=0.0.1",
 ]
 
+# Faster decoding of tweets, see twitter_analysis_tools.twitter.tweet_info.
+fast_requirements = ["orjson>=3.0"]
+
 extra_requirements = {
+    "fast": fast_requirements,
     "test": test_requirements,
     "docs": docs_requirements,
     "setup": setup_requirements,
     "dev": dev_requirements,
     "all": [
         *requirements,
+        *fast_requirements,
         *test_requirements,
         *docs_requirements,
         *setup_requirements,
@@ -72,7 +78,11 @@ setup(
     ],
     description="Tools for loading, manipulating and filtering tweets.",
     entry_points={
-        "console_scripts": ["my_example=twitter_analysis_tools.bin.my_example:main"]
+        "console_scripts": [
+            "my_example=twitter_analysis_tools.bin.my_example:main",
+            "build_tweet_cache=twitter_analysis_tools.bin.build_tweet_cache:main",
+            "make_seekable_gzip=twitter_analysis_tools.bin.make_seekable_gzip:main",
+        ]
     },
     install_requires=requirements,
     license="MIT",
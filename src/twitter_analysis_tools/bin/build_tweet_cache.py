@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Build the columnar caches of .jsonl.gz files of tweets.
+
+See twitter_analysis_tools.twitter.tweet_cache for details. For example,
+
+    build_tweet_cache --workers 8 data/2020-03/*.jsonl.gz
+"""
+
+import argparse
+from multiprocessing import Pool
+
+from twitter_analysis_tools.twitter import tweet_cache
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Build columnar caches of .jsonl.gz files of tweets."
+    )
+    parser.add_argument("filepaths", nargs="+", help="Files of tweets to cache.")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Number of files to cache at once."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild caches which are already up to date.",
+    )
+    args = parser.parse_args(args)
+
+    filepaths = args.filepaths
+    if not args.force:
+        filepaths = [fp for fp in filepaths if not tweet_cache.cache_is_valid(fp)]
+
+    with Pool(args.workers) as pool:
+        for cache_path in pool.imap_unordered(tweet_cache.build_cache, filepaths):
+            print(cache_path)
+
+
+if __name__ == "__main__":
+    main()
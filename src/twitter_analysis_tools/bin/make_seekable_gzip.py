@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Rewrite .jsonl.gz files of tweets so their lines can be looked up quickly.
+
+See twitter_analysis_tools.fileio.write_seekable_gzip for details. The files
+are rewritten in place unless an output directory is given. For example,
+
+    make_seekable_gzip --workers 8 data/2020-03/*.jsonl.gz
+"""
+
+import argparse
+import os
+from functools import partial
+from multiprocessing import Pool
+
+from twitter_analysis_tools import fileio
+
+
+def _rewrite(output_dir, lines_per_member, filepath):
+    """Rewrite filepath as a seekable gzip file and return the new path."""
+    if output_dir is None:
+        dst_filepath = filepath
+    else:
+        dst_filepath = os.path.join(output_dir, os.path.basename(filepath))
+    fileio.write_seekable_gzip(filepath, dst_filepath, lines_per_member)
+    return dst_filepath
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Rewrite gzip files with a restart point every few thousand "
+        "lines, so lines can be looked up without decompressing the whole file."
+    )
+    parser.add_argument("filepaths", nargs="+", help="Gzip files to rewrite.")
+    parser.add_argument(
+        "--output-dir",
+        help="Directory to write the rewritten files to, instead of replacing "
+        "the original files.",
+    )
+    parser.add_argument(
+        "--lines-per-member",
+        type=int,
+        default=5000,
+        help="Number of lines between restart points.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Number of files to rewrite at once."
+    )
+    args = parser.parse_args(args)
+
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+    rewrite = partial(_rewrite, args.output_dir, args.lines_per_member)
+    with Pool(args.workers) as pool:
+        for filepath in pool.imap_unordered(rewrite, args.filepaths):
+            print(filepath)
+
+
+if __name__ == "__main__":
+    main()
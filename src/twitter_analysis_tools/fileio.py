@@ -1,14 +1,61 @@
 import gzip
+import json
+import multiprocessing
+import os
+import queue
+import traceback
+import zlib
 
+import numpy as np
 from loguru import logger
 from tqdm import tqdm
 
+from twitter_analysis_tools.utils import apply_steps, chunked
+
+# Messages passed from the worker processes back to the parent process.
+_CHUNK = "chunk"
+_END_OF_FILE = "end of file"
+_ERROR = "error"
+
+# Suffix of the sidecar files recording the number of lines in a gzip file.
+LINE_COUNT_SUFFIX = ".linecount.json"
+
+# Suffix of the sidecar files recording where each line of a gzip file starts.
+LINE_OFFSETS_SUFFIX = ".lineoffsets.npz"
+
+# Number of compressed bytes decompressed at a time when indexing a file.
+_INDEX_READ_SIZE = 1 << 20
+
+# Maximum number of chunks waiting in each queue. Bounds the number of lines
+# held in memory when the parent process falls behind the workers.
+_MAX_QUEUED_CHUNKS = 8
+
+# Seconds to wait for a message from the workers before checking that they
+# are still running.
+_POLL_INTERVAL = 1.0
+
 
 class LinesFromGzipFiles:
     """Yield lines from gzipped jsonl files.
 
     Args:
         filepaths (iterable of str): paths to one or more files.
+        workers (int): Number of processes used to decompress the files. With
+            more than one worker, files are read in parallel and their lines
+            are passed back to this process in chunks.
+        ordered (bool): Whether to yield the lines in the order of
+            `filepaths` when reading with more than one worker. If False,
+            chunks of lines are yielded as soon as any worker produces them.
+        steps (list of (applier, to_apply)): Manipulations to apply to the
+            lines of each file, see `twitter_analysis_tools.utils.Pipeline`.
+            With more than one worker the steps are applied in the worker
+            processes, so they must be picklable.
+        chunksize (int): Number of lines passed back from a worker at a time.
+        use_index (bool): Whether to record the number of lines in each file
+            in a sidecar index next to it the first time the file is read,
+            and to trust the recorded counts when computing the length. Off
+            by default, so reading doesn't write files into the data
+            directories.
 
     Yields:
         str: The next line of the file.
@@ -17,19 +64,113 @@ class LinesFromGzipFiles:
         >>> lines = LinesFromGzipFiles(["file1.gz", "file2.gz"])
         >>> for line in lines:  # doctest: +SKIP
         ...     process(line)   # doctest: +SKIP
+
+        To decompress the files with four processes:
+
+        >>> lines = LinesFromGzipFiles(["file1.gz", "file2.gz"], workers=4)
     """
 
-    def __init__(self, filepaths):
+    def __init__(
+        self,
+        filepaths,
+        workers=1,
+        ordered=True,
+        steps=None,
+        chunksize=1000,
+        use_index=False,
+    ):
         # This empties `filepaths` if it is a generator.
         self._filepaths = list(filepaths)
         self._n_files = len(self._filepaths)
+        self._workers = workers
+        self._ordered = ordered
+        if steps is None:
+            steps = []
+        self._steps = steps
+        self._chunksize = chunksize
+        self._use_index = use_index
         self._len = None
 
     def __iter__(self):
+        if self._workers > 1 and self._n_files > 1:
+            return self._iter_parallel()
+        return self._iter_serial()
+
+    def _iter_serial(self):
         # TODO: Inner tqdm?
         for filepath in tqdm(self._filepaths, leave=False):
-            with gzip.open(filepath, "r") as f:
-                yield from f  # Yields the lines, one at a time.
+            # Yields the lines, one at a time.
+            yield from apply_steps(
+                self._steps, _lines_of_file(filepath, self._use_index)
+            )
+
+    def _iter_parallel(self):
+        n_workers = min(self._workers, self._n_files)
+        if self._ordered:
+            # Worker k reads files k, k + n_workers, k + 2 * n_workers, ... in
+            # turn, so reading each file from its worker's queue in turn
+            # preserves the order of the files.
+            out_queues = [
+                multiprocessing.Queue(_MAX_QUEUED_CHUNKS) for _ in range(n_workers)
+            ]
+            processes = [
+                multiprocessing.Process(
+                    target=_read_files_worker,
+                    args=(
+                        self._filepaths[k::n_workers],
+                        self._steps,
+                        self._chunksize,
+                        self._use_index,
+                        out_queues[k],
+                    ),
+                    daemon=True,
+                )
+                for k in range(n_workers)
+            ]
+            messages = _messages_in_file_order(out_queues, self._n_files, processes)
+        else:
+            # Workers take the next unread file from a shared queue and pass
+            # their chunks back through a single queue.
+            file_queue = multiprocessing.Queue()
+            for filepath in self._filepaths:
+                file_queue.put(filepath)
+            for _ in range(n_workers):
+                file_queue.put(None)
+            out_queues = [multiprocessing.Queue(_MAX_QUEUED_CHUNKS * n_workers)]
+            processes = [
+                multiprocessing.Process(
+                    target=_read_files_worker,
+                    args=(
+                        file_queue,
+                        self._steps,
+                        self._chunksize,
+                        self._use_index,
+                        out_queues[0],
+                    ),
+                    daemon=True,
+                )
+                for _ in range(n_workers)
+            ]
+            messages = _messages_in_any_order(out_queues[0], self._n_files, processes)
+
+        for process in processes:
+            process.start()
+        progress = tqdm(total=self._n_files, leave=False)
+        try:
+            for kind, payload in messages:
+                if kind == _CHUNK:
+                    yield from payload
+                else:
+                    progress.update()
+        finally:
+            progress.close()
+            # Stop the workers early if the consumer stopped iterating.
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            for out_queue in out_queues:
+                out_queue.close()
 
     def __len__(self):
         """Compute the number of lines among all of the files.
@@ -38,7 +179,467 @@ class LinesFromGzipFiles:
             int: Total lines in all the files.
         """
         if self._len is None:
-            logger.info("Counting the lines in {} files.", self._n_files)
-            self._len = sum(1 for _ in self)
+            if self._use_index and all(applier is map for applier, _ in self._steps):
+                # Maps do not change the number of lines, so the counts in
+                # the index can be used and only unindexed files are read.
+                self._len = sum(map(_count_lines, self._filepaths))
+            else:
+                logger.info("Counting the lines in {} files.", self._n_files)
+                self._len = sum(1 for _ in self)
 
         return self._len
+
+    @property
+    def can_seek(self):
+        """bool: Whether lines can be looked up by index, see `subset`."""
+        return all(applier is map for applier, _ in self._steps)
+
+    def subset(self, keep_idxs):
+        """Keep only the lines at the given indices among all of the files.
+
+        Rather than reading every line, the lines are looked up using the
+        line offsets index of each file, see `GzipLineIndex`. This only
+        skips most of the decompression for files rewritten with
+        `write_seekable_gzip`; in other gzip files everything before a line
+        is still decompressed, though not split or parsed.
+
+        Args:
+            keep_idxs (iterable of int): Indices of the lines to keep.
+
+        Returns:
+            LinesAtIndices: The lines at the indices, in order.
+        """
+        if not self.can_seek:
+            raise Exception("Cannot look up lines by index after filtering them.")
+        return LinesAtIndices(self._filepaths, keep_idxs, steps=self._steps)
+
+
+class LinesAtIndices:
+    """Yield the lines at the given indices among gzipped files.
+
+    Each line is read by seeking to the closest restart point before it in its
+    file, see `GzipLineIndex`, instead of reading all of the preceding lines.
+
+    Args:
+        filepaths (iterable of str): paths to one or more files.
+        line_idxs (iterable of int): Indices of the lines to yield among all
+            of the lines of the files. Duplicates and indices beyond the last
+            line are ignored.
+        steps (list of (applier, to_apply)): Map steps to apply to the lines.
+
+    Yields:
+        str: The lines at the indices, in the order they appear in the files.
+
+    Example:
+        >>> lines = LinesAtIndices(["file1.gz", "file2.gz"], [0, 10, 1000])
+        >>> for line in lines:  # doctest: +SKIP
+        ...     process(line)   # doctest: +SKIP
+    """
+
+    def __init__(self, filepaths, line_idxs, steps=None):
+        self._filepaths = list(filepaths)
+        self._line_idxs = np.unique(np.fromiter(line_idxs, dtype=np.int64))
+        if steps is None:
+            steps = []
+        self._steps = steps
+        self._len = None
+
+    def _idxs_per_file(self):
+        """Yield each file with the indices of the lines to read within it.
+
+        Also yields the index of the file, or None if it wasn't needed to
+        count the lines of the file.
+        """
+        start = 0
+        for filepath in self._filepaths:
+            index = None
+            num_lines = read_line_count(filepath)
+            if num_lines is None:
+                # Counting the lines decompresses the file, so index it at the
+                # same time.
+                index = GzipLineIndex.for_file(filepath)
+                num_lines = len(index)
+            end = start + num_lines
+            lo, hi = np.searchsorted(self._line_idxs, [start, end])
+            yield filepath, index, self._line_idxs[lo:hi] - start
+            start = end
+
+    def __iter__(self):
+        for filepath, index, idxs in self._idxs_per_file():
+            if len(idxs):
+                if index is None:
+                    index = GzipLineIndex.for_file(filepath)
+                lines = index.read_lines(filepath, idxs)
+                yield from apply_steps(self._steps, lines)
+
+    def __len__(self):
+        if self._len is None:
+            self._len = sum(len(idxs) for _, _, idxs in self._idxs_per_file())
+        return self._len
+
+
+class GzipLineIndex:
+    """Where each line starts in a gzip file and where decompression can start.
+
+    A gzip file can only be decompressed from the start of one of its members.
+    Most files consist of a single member, in which case a line is found by
+    decompressing and discarding everything before it, which is still much
+    cheaper than splitting and parsing the preceding lines. Files written by
+    `write_seekable_gzip` have a member every few thousand lines, so any line
+    can be reached by decompressing only a small part of the file.
+
+    The index is saved next to the file and only trusted while the size and
+    modification time of the file match those recorded in the index.
+
+    Args:
+        line_offsets (1d array): Uncompressed offset of the start of each line.
+        restart_points (2d array): Compressed and uncompressed offsets of the
+            start of each gzip member, with dimensions: num_members x 2.
+        size (int): Size of the indexed file in bytes.
+        mtime_ns (int): Modification time of the indexed file.
+    """
+
+    def __init__(self, line_offsets, restart_points, size, mtime_ns):
+        self.line_offsets = line_offsets
+        self.restart_points = restart_points
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __len__(self):
+        """Return the number of lines in the indexed file."""
+        return len(self.line_offsets)
+
+    @classmethod
+    def for_file(cls, filepath):
+        """Load the index of a file, building and saving it if necessary.
+
+        Args:
+            filepath (str): Path to the gzip file.
+
+        Returns:
+            GzipLineIndex: The index of the file.
+        """
+        index = cls.load(filepath)
+        if index is None:
+            index = cls.build(filepath)
+            index.save(filepath)
+        return index
+
+    @classmethod
+    def build(cls, filepath):
+        """Index a gzip file by decompressing it once.
+
+        Args:
+            filepath (str): Path to the gzip file.
+
+        Returns:
+            GzipLineIndex: The index of the file.
+        """
+        stat = os.stat(filepath)
+        newline_offsets = []
+        restart_points = [(0, 0)]
+        uncompressed_pos = 0
+        compressed_pos = 0
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        with open(filepath, "rb") as f:
+            data = f.read(_INDEX_READ_SIZE)
+            while data:
+                out = decompressor.decompress(data)
+                newlines = np.flatnonzero(np.frombuffer(out, dtype=np.uint8) == 10)
+                newline_offsets.append(newlines + uncompressed_pos)
+                uncompressed_pos += len(out)
+                if decompressor.eof:
+                    # The next gzip member, if any, starts after this one.
+                    data = decompressor.unused_data
+                    compressed_pos = f.tell() - len(data)
+                    # The magic bytes of the next member may be split across
+                    # reads.
+                    while len(data) < 2:
+                        more = f.read(_INDEX_READ_SIZE)
+                        if not more:
+                            break
+                        data += more
+                    if not data.startswith(b"\x1f\x8b"):
+                        break
+                    restart_points.append((compressed_pos, uncompressed_pos))
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                else:
+                    data = f.read(_INDEX_READ_SIZE)
+
+        # Each line starts after the previous newline, except at end of file.
+        line_offsets = np.concatenate([[0], *newline_offsets]).astype(np.int64)
+        line_offsets[1:] += 1
+        if len(line_offsets) and line_offsets[-1] >= uncompressed_pos:
+            line_offsets = line_offsets[:-1]
+        return cls(
+            line_offsets,
+            np.array(restart_points, dtype=np.int64),
+            stat.st_size,
+            stat.st_mtime_ns,
+        )
+
+    @classmethod
+    def load(cls, filepath):
+        """Load the saved index of a file.
+
+        Args:
+            filepath (str): Path to the indexed gzip file.
+
+        Returns:
+            GzipLineIndex: The index, or None if the file has no valid index.
+        """
+        try:
+            with np.load(filepath + LINE_OFFSETS_SUFFIX) as saved:
+                index = cls(
+                    saved["line_offsets"],
+                    saved["restart_points"],
+                    int(saved["size"]),
+                    int(saved["mtime_ns"]),
+                )
+            stat = os.stat(filepath)
+        except (OSError, ValueError, KeyError):
+            return None
+        if index.size != stat.st_size or index.mtime_ns != stat.st_mtime_ns:
+            return None
+        return index
+
+    def save(self, filepath):
+        """Save the index next to the indexed file.
+
+        Also records the line count of the file, see `read_line_count`.
+        Fails silently if the directory is not writable.
+
+        Args:
+            filepath (str): Path to the indexed gzip file.
+        """
+        index_path = filepath + LINE_OFFSETS_SUFFIX
+        tmp_path = "{}.{}.tmp.npz".format(index_path, os.getpid())
+        try:
+            np.savez(
+                tmp_path,
+                line_offsets=self.line_offsets,
+                restart_points=self.restart_points,
+                size=self.size,
+                mtime_ns=self.mtime_ns,
+            )
+            os.replace(tmp_path, index_path)
+        except OSError as error:
+            logger.debug(
+                "Could not write line offsets index for {}: {}", filepath, error
+            )
+        write_line_count(filepath, len(self))
+
+    def read_lines(self, filepath, line_idxs):
+        """Read the lines at the given indices of the indexed file.
+
+        Args:
+            filepath (str): Path to the indexed gzip file.
+            line_idxs (iterable of int): Indices of the lines to read.
+
+        Yields:
+            bytes: The lines at the indices, in increasing order of index.
+        """
+        member_offsets = self.restart_points[:, 1]
+        gz = None
+        member = None
+        with open(filepath, "rb") as f:
+            for idx in sorted(set(line_idxs)):
+                start = self.line_offsets[idx]
+                start_member = np.searchsorted(member_offsets, start, "right") - 1
+                # Restart decompression if a later member is closer.
+                if start_member != member:
+                    member = start_member
+                    f.seek(self.restart_points[member, 0])
+                    gz = gzip.GzipFile(fileobj=f, mode="rb")
+                # Seeking forward decompresses and discards the bytes between.
+                gz.seek(start - member_offsets[member])
+                yield gz.readline()
+
+
+def write_seekable_gzip(src_filepath, dst_filepath, lines_per_member=5000):
+    """Rewrite a gzip file with a restart point every few thousand lines.
+
+    The lines are compressed as a sequence of gzip members, which is still a
+    valid gzip file for any reader, but allows `GzipLineIndex` to start
+    decompressing near any line. The new file is indexed once written. See
+    the `make_seekable_gzip` console script to rewrite many files.
+
+    Args:
+        src_filepath (str): Path to the gzip file to rewrite.
+        dst_filepath (str): Path to write the rewritten file to, which may be
+            src_filepath to rewrite the file in place.
+        lines_per_member (int): Number of lines in each gzip member.
+    """
+    # Write to a temporary file first, so the file is only replaced once
+    # it's complete.
+    tmp_path = "{}.{}.tmp".format(dst_filepath, os.getpid())
+    try:
+        with gzip.open(src_filepath, "rb") as src, open(tmp_path, "wb") as dst:
+            for lines in chunked(src, lines_per_member):
+                dst.write(gzip.compress(b"".join(lines)))
+        os.replace(tmp_path, dst_filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    GzipLineIndex.build(dst_filepath).save(dst_filepath)
+
+
+def read_line_count(filepath):
+    """Read the number of lines in a file from its sidecar index.
+
+    The index is only trusted if the size and modification time of the file
+    match those recorded when the index was written.
+
+    Args:
+        filepath (str): Path to the indexed file.
+
+    Returns:
+        int: Number of lines in the file, or None if the file has no valid
+            index.
+    """
+    try:
+        with open(filepath + LINE_COUNT_SUFFIX) as f:
+            index = json.load(f)
+        stat = os.stat(filepath)
+    except (OSError, ValueError):
+        return None
+    if index.get("size") != stat.st_size or index.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return index.get("num_lines")
+
+
+def write_line_count(filepath, num_lines):
+    """Record the number of lines in a file in its sidecar index.
+
+    The index is written next to the file, failing silently if the directory
+    is not writable.
+
+    Args:
+        filepath (str): Path to the file to index.
+        num_lines (int): Number of lines in the file.
+    """
+    index_path = filepath + LINE_COUNT_SUFFIX
+    tmp_path = "{}.{}.tmp".format(index_path, os.getpid())
+    try:
+        stat = os.stat(filepath)
+        index = {
+            "path": os.path.basename(filepath),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "num_lines": num_lines,
+        }
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        # Replace atomically so concurrent readers never see a partial index.
+        os.replace(tmp_path, index_path)
+    except OSError as error:
+        logger.debug("Could not write line count index for {}: {}", filepath, error)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _lines_of_file(filepath, use_index=False):
+    """Yield the lines of a gzip file, indexing its line count if needed."""
+    with gzip.open(filepath, "r") as f:
+        if not use_index or read_line_count(filepath) is not None:
+            yield from f
+            return
+        num_lines = 0
+        for num_lines, line in enumerate(f, 1):
+            yield line
+    write_line_count(filepath, num_lines)
+
+
+def _count_lines(filepath):
+    """Return the number of lines in a gzip file, using or writing its index."""
+    num_lines = read_line_count(filepath)
+    if num_lines is None:
+        num_lines = sum(1 for _ in _lines_of_file(filepath, use_index=True))
+    return num_lines
+
+
+def _read_files_worker(filepaths, steps, chunksize, use_index, out_queue):
+    """Read files in a worker process and put chunks of their lines on a queue.
+
+    The lines of each file are followed by an end of file message. Errors are
+    passed back to the parent process rather than raised in the worker, as
+    strings since the exception may not be picklable.
+
+    Args:
+        filepaths (list of str or Queue): Files to read. A queue is read from
+            until it yields None.
+        steps (list of (applier, to_apply)): Manipulations to apply to the
+            lines of each file.
+        chunksize (int): Number of lines to put on the queue at a time.
+        use_index (bool): Whether to index the line counts of the files.
+        out_queue (Queue): Queue on which to put the chunks of lines.
+    """
+    if not isinstance(filepaths, list):
+        filepaths = iter(filepaths.get, None)
+    filepath = None
+    try:
+        for filepath in filepaths:
+            lines = _lines_of_file(filepath, use_index)
+            for chunk in chunked(apply_steps(steps, lines), chunksize):
+                out_queue.put((_CHUNK, chunk))
+            out_queue.put((_END_OF_FILE, filepath))
+    except Exception as error:
+        out_queue.put((_ERROR, (filepath, repr(error), traceback.format_exc())))
+
+
+def _get_message(out_queue, processes):
+    """Get the next message from a worker, raising any error it sent.
+
+    Raises a RuntimeError if a worker sent an error or died, e.g. when killed
+    for running out of memory, instead of waiting forever for its message.
+    """
+    while True:
+        try:
+            kind, payload = out_queue.get(timeout=_POLL_INTERVAL)
+            break
+        except queue.Empty:
+            pass
+        for process in processes:
+            if process.exitcode not in (None, 0):
+                raise RuntimeError(
+                    "Worker process {} died with exit code {}.".format(
+                        process.pid, process.exitcode
+                    )
+                )
+        if all(process.exitcode is not None for process in processes):
+            # A message sent just before the workers exited is in the queue.
+            try:
+                kind, payload = out_queue.get(timeout=_POLL_INTERVAL)
+                break
+            except queue.Empty:
+                raise RuntimeError(
+                    "The workers exited before reading all files."
+                ) from None
+    if kind == _ERROR:
+        filepath, error, worker_traceback = payload
+        logger.error("Worker failed reading {}:\n{}", filepath, worker_traceback)
+        raise RuntimeError("Worker failed reading {}: {}".format(filepath, error))
+    return kind, payload
+
+
+def _messages_in_file_order(out_queues, n_files, processes):
+    """Yield the workers' messages one file at a time, in file order.
+
+    File i is read by the worker writing to out_queues[i % len(out_queues)].
+    """
+    for i in range(n_files):
+        out_queue = out_queues[i % len(out_queues)]
+        kind = None
+        while kind != _END_OF_FILE:
+            kind, payload = _get_message(out_queue, processes)
+            yield kind, payload
+
+
+def _messages_in_any_order(out_queue, n_files, processes):
+    """Yield the workers' messages as they arrive until all files are read."""
+    files_done = 0
+    while files_done < n_files:
+        kind, payload = _get_message(out_queue, processes)
+        if kind == _END_OF_FILE:
+            files_done += 1
+        yield kind, payload
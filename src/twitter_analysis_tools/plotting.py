@@ -1,28 +1,66 @@
-import matplotlib.pyplot as plt
+"""Plots of topics over time.
+
+matplotlib and seaborn are imported when a plot is made, and the style of the
+plots is only applied within `plotting_style`, leaving the global settings
+of matplotlib unchanged.
+"""
+
+from contextlib import contextmanager
+
 import numpy as np
-import seaborn as sns
 
-sns.set(style="whitegrid", font_scale=1.5, context="talk")
+# Local imports.
+from twitter_analysis_tools import rolling
+
+# Settings of the plots, applied after those of seaborn. For details on the
+# params below, see the matplotlib docs:
+# https://matplotlib.org/users/customizing.html
+_RC_PARAMS = {
+    "axes.edgecolor": "0.6",
+    "figure.dpi": 200,
+    "font.family": "serif",
+    "grid.color": "0.85",
+    "savefig.dpi": 300,
+    "legend.edgecolor": "0.6",
+    "legend.markerscale": 1.0,
+    "legend.framealpha": "1",
+    "legend.numpoints": 2,
+    "text.usetex": True,
+    "xtick.major.pad": -3,
+    "ytick.major.pad": -2,
+}
+# Settings scaled from the seaborn defaults.
+_RC_PARAMS_SCALES = {"legend.columnspacing": 0.8, "legend.handlelength": 1.5}
+
+
+@contextmanager
+def plotting_style(**rc_params):
+    """Apply the style of the plots of this module within a with block.
+
+    The previous matplotlib settings are restored at the end of the block.
 
-"""
-For details on the params below, see the matplotlib docs:
-https://matplotlib.org/users/customizing.html
-"""
+    Args:
+        **rc_params: matplotlib settings overriding those of the style, e.g.
+            `plotting_style(**{"text.usetex": False})` without LaTeX.
 
-plt.rcParams["axes.edgecolor"] = "0.6"
-plt.rcParams["figure.dpi"] = 200
-plt.rcParams["font.family"] = "serif"
-plt.rcParams["grid.color"] = "0.85"
-plt.rcParams["savefig.dpi"] = 300
-plt.rcParams["legend.columnspacing"] *= 0.8
-plt.rcParams["legend.edgecolor"] = "0.6"
-plt.rcParams["legend.markerscale"] = 1.0
-plt.rcParams["legend.framealpha"] = "1"
-plt.rcParams["legend.handlelength"] *= 1.5
-plt.rcParams["legend.numpoints"] = 2
-plt.rcParams["text.usetex"] = True
-plt.rcParams["xtick.major.pad"] = -3
-plt.rcParams["ytick.major.pad"] = -2
+    Example:
+        >>> import matplotlib.pyplot as plt
+        >>> with plotting_style(**{"text.usetex": False}):
+        ...     plt.rcParams["font.family"]
+        ['serif']
+        >>> plt.rcParams["figure.dpi"] == 200
+        False
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    with plt.rc_context():
+        sns.set(style="whitegrid", font_scale=1.5, context="talk")
+        plt.rcParams.update(_RC_PARAMS)
+        for name, scale in _RC_PARAMS_SCALES.items():
+            plt.rcParams[name] *= scale
+        plt.rcParams.update(rc_params)
+        yield
 
 
 def plot_data(
@@ -32,10 +70,13 @@ def plot_data(
     filepath=None,
     save_fig=True,
     figsize=[12.0, 6.0],
+    style=True,
 ):
     """
     Args:
         data (2d array): 2d array with dimensions: num_topics x num_time_slices
+        style (bool): Whether to plot within `plotting_style`. Otherwise the
+            current matplotlib settings are used.
 
     Examples:
 
@@ -59,6 +100,15 @@ def plot_data(
         >>> plot_data(topic_distributions, plot_type='stackplot', save_fig=False)
         >>> plot_data(topic_distributions, plot_type='lineplot', save_fig=False)
     """
+    if style:
+        with plotting_style():
+            return plot_data(
+                data, x, plot_type, filepath, save_fig, figsize, style=False
+            )
+
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     # Get dimensions.
     num_topics, num_time_slices = data.shape
     sns.set_palette(sns.husl_palette(num_topics))
@@ -127,12 +177,5 @@ def sliding_average(data, window=10):
             "Not enough data to average over with window of size {}.".format(window)
         )
 
-    # Make a copy to store averaged data (We could alternatively do this in place).
-    averaged = np.zeros((data.shape[0], data.shape[1] - window + 1))
-
-    # Average over sliding window.
-    for i in range(averaged.shape[1]):
-        # flake8: noqa: E203
-        averaged[:, i] = np.mean(data[:, i : i + window], axis=1)
-
-    return averaged
+    # Average over sliding window, see rolling.py for other reductions.
+    return rolling.rolling_mean(data, window)
@@ -0,0 +1,241 @@
+"""Rolling-window reductions of time series, in batch and online.
+
+The functions reduce each row of a 2d array with dimensions
+msrmts x num_samples over a sliding window of samples, with whole-array NumPy
+operations rather than a loop over the windows: sums and means from
+cumulative sums, medians from a strided view of the windows, reduced in
+blocks to bound memory, and exponential moving averages with a linear filter.
+The classes give the same results for time series which arrive a few samples
+at a time.
+"""
+
+import numpy as np
+
+
+def _check_window(data, window):
+    """Raise an exception unless data has at least one full window."""
+    if window < 1:
+        raise Exception("The window size must be positive, not {}.".format(window))
+    if data.shape[1] < window:
+        raise Exception("Not enough data for a window of size {}.".format(window))
+
+
+def rolling_sum(data, window):
+    """Sum data over a sliding window.
+
+    Args:
+        data (ndarray): Data with dimensions msrmts x num_samples.
+        window (int): Size of the sliding window.
+
+    Returns:
+        ndarray: Sums with dimensions msrmts x (num_samples - window + 1).
+            Integer data is summed exactly.
+
+    Example:
+        >>> rolling_sum(np.arange(12).reshape((2, 6)), window=3)
+        array([[ 3,  6,  9, 12],
+               [21, 24, 27, 30]])
+    """
+    data = np.asarray(data)
+    _check_window(data, window)
+    dtype = np.int64 if np.issubdtype(data.dtype, np.integer) else np.float64
+    cumsum = np.zeros((data.shape[0], data.shape[1] + 1), dtype=dtype)
+    np.cumsum(data, axis=1, dtype=dtype, out=cumsum[:, 1:])
+    return cumsum[:, window:] - cumsum[:, :-window]
+
+
+def rolling_mean(data, window):
+    """Average data over a sliding window.
+
+    Args:
+        data (ndarray): Data with dimensions msrmts x num_samples.
+        window (int): Size of the sliding window.
+
+    Returns:
+        ndarray: Means with dimensions msrmts x (num_samples - window + 1).
+
+    Example:
+        >>> rolling_mean(np.arange(12).reshape((2, 6)), window=3)
+        array([[ 1.,  2.,  3.,  4.],
+               [ 7.,  8.,  9., 10.]])
+    """
+    return rolling_sum(data, window) / window
+
+
+def _windows(data, window):
+    """Return a read-only view of data with the windows in the last axis."""
+    num_windows = data.shape[1] - window + 1
+    return np.lib.stride_tricks.as_strided(
+        data,
+        shape=(data.shape[0], num_windows, window),
+        strides=(data.strides[0], data.strides[1], data.strides[1]),
+        writeable=False,
+    )
+
+
+def rolling_median(data, window):
+    """Take the median of data over a sliding window.
+
+    Args:
+        data (ndarray): Data with dimensions msrmts x num_samples.
+        window (int): Size of the sliding window.
+
+    Returns:
+        ndarray: Medians with dimensions msrmts x (num_samples - window + 1).
+
+    Example:
+        >>> rolling_median(np.array([[1, 9, 2, 8, 3]]), window=3)
+        array([[2., 8., 3.]])
+    """
+    data = np.asarray(data)
+    _check_window(data, window)
+    windows = _windows(data, window)
+    num_windows = windows.shape[1]
+    medians = np.empty((data.shape[0], num_windows))
+    # np.median copies the windows it reduces, so they are reduced in blocks
+    # of about as many values as data, rather than all at once.
+    block_size = max(1, data.shape[1] // window)
+    for start in range(0, num_windows, block_size):
+        stop = min(start + block_size, num_windows)
+        np.median(windows[:, start:stop], axis=2, out=medians[:, start:stop])
+    return medians
+
+
+def exponential_moving_average(data, alpha, initial=None):
+    """Take the exponential moving average of data.
+
+    The average at each sample is alpha times the sample plus 1 - alpha
+    times the average at the previous sample.
+
+    Args:
+        data (ndarray): Data with dimensions msrmts x num_samples.
+        alpha (float): Weight of each new sample, between 0 and 1.
+        initial (1d array, optional): The average of each row before the
+            first sample. Defaults to the first sample, which is then its own
+            average.
+
+    Returns:
+        ndarray: Averages with the same dimensions as data.
+
+    Example:
+        >>> exponential_moving_average(np.array([[0, 4, 4, 7]]), alpha=0.5)
+        array([[0., 2., 3., 5.]])
+    """
+    # Imported here as importing scipy is slow.
+    from scipy.signal import lfilter
+
+    data = np.asarray(data, dtype=np.float64)
+    if not 0 < alpha <= 1:
+        raise Exception("alpha must be in (0, 1], not {}.".format(alpha))
+    if initial is None:
+        initial = data[:, 0] if data.shape[1] else np.zeros(data.shape[0])
+    zi = (1 - alpha) * np.asarray(initial, dtype=np.float64)[:, np.newaxis]
+    averaged, _ = lfilter([alpha], [1, alpha - 1], data, axis=1, zi=zi)
+    return averaged
+
+
+# Reductions over sliding windows, by name.
+ROLLING_REDUCERS = {"sum": rolling_sum, "mean": rolling_mean, "median": rolling_median}
+
+
+class RollingWindow:
+    """Reduce time series over a sliding window, as the samples arrive.
+
+    The last window - 1 samples are kept so that each update returns the
+    reductions of the windows ending at the new samples. Concatenating the
+    results of all the updates gives the same result as reducing the whole
+    series at once.
+
+    Args:
+        window (int): Size of the sliding window.
+        reducer (str): One of ROLLING_REDUCERS.
+
+    Example:
+        >>> rolling = RollingWindow(window=3, reducer="mean")
+        >>> rolling.update(np.array([[0, 1], [10, 11]])).shape
+        (2, 0)
+        >>> rolling.update(np.array([[2, 3], [12, 13]]))
+        array([[ 1.,  2.],
+               [11., 12.]])
+        >>> rolling.update(np.array([4, 14]))
+        array([[ 3.],
+               [13.]])
+    """
+
+    def __init__(self, window, reducer="mean"):
+        if reducer not in ROLLING_REDUCERS:
+            raise Exception(
+                "Reducer {} is not one of {}.".format(
+                    reducer, ", ".join(ROLLING_REDUCERS)
+                )
+            )
+        if window < 1:
+            raise Exception("The window size must be positive, not {}.".format(window))
+        self.window = window
+        self.reducer = reducer
+        self._tail = None
+
+    def update(self, samples):
+        """Add samples and reduce the windows which end at them.
+
+        Args:
+            samples (ndarray): New samples, with dimensions msrmts x
+                num_new_samples, or a 1d array of msrmts for a single sample.
+
+        Returns:
+            ndarray: Reductions with dimensions msrmts x num_windows, with
+                one window for each new sample once window samples arrived.
+        """
+        samples = np.asarray(samples)
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        if self._tail is not None:
+            samples = np.concatenate([self._tail, samples], axis=1)
+        num_samples = samples.shape[1]
+        self._tail = samples[:, max(0, num_samples - self.window + 1) :]
+        if num_samples < self.window:
+            return np.zeros((samples.shape[0], 0))
+        return ROLLING_REDUCERS[self.reducer](samples, self.window)
+
+
+class ExponentialMovingAverage:
+    """Take the exponential moving average of time series as samples arrive.
+
+    Concatenating the results of all the updates gives the same result as
+    `exponential_moving_average` on the whole series.
+
+    Args:
+        alpha (float): Weight of each new sample, between 0 and 1.
+
+    Example:
+        >>> average = ExponentialMovingAverage(alpha=0.5)
+        >>> average.update(np.array([[0, 4]]))
+        array([[0., 2.]])
+        >>> average.update(np.array([4]))
+        array([[3.]])
+        >>> average.value
+        array([3.])
+    """
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, samples):
+        """Add samples and return the averages at each of them.
+
+        Args:
+            samples (ndarray): New samples, with dimensions msrmts x
+                num_new_samples, or a 1d array of msrmts for a single sample.
+
+        Returns:
+            ndarray: Averages with the same dimensions as samples, as 2d.
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        if samples.shape[1] == 0:
+            return samples
+        averaged = exponential_moving_average(samples, self.alpha, self.value)
+        self.value = averaged[:, -1].copy()
+        return averaged
@@ -0,0 +1,391 @@
+"""Approximate counting of integer keys, such as packed ngrams, in bounded memory.
+
+`CountMinSketch` estimates the count of every key and `MisraGries` keeps the
+keys which may be among the most frequent. `HeavyHitters` combines them to
+find the most frequent keys and estimate their counts, using memory which does
+not grow with the number of distinct keys. `KeyCounts` counts keys exactly,
+with the same interface.
+"""
+
+import math
+
+import numpy as np
+
+# Local imports.
+from twitter_analysis_tools.text import ngrams
+
+# Default error of the estimates of sketches, relative to the total count,
+# and probability of exceeding it. A sketch with these uses about 15MB.
+DEFAULT_EPSILON = 1e-5
+DEFAULT_DELTA = 1e-3
+
+
+def _keys_and_counts(keys, counts):
+    """Return keys as uint64 and counts as int64, defaulting counts to 1."""
+    keys = np.asarray(keys, dtype=np.uint64)
+    if counts is None:
+        counts = np.ones(len(keys), dtype=np.int64)
+    return keys, np.asarray(counts, dtype=np.int64)
+
+
+class KeyCounts:
+    """Count integer keys exactly.
+
+    Keys are buffered and folded into sorted arrays of distinct keys and
+    their counts with NumPy, rather than counted one at a time.
+
+    Args:
+        buffer_size (int): Number of keys to collect before folding them into
+            the counts.
+
+    Example:
+        >>> key_counts = KeyCounts()
+        >>> key_counts.update([3, 1, 3])
+        >>> key_counts.update([3, 2], counts=[1, 5])
+        >>> keys, counts = key_counts.most_common()
+        >>> keys.tolist(), counts.tolist()
+        ([2, 3, 1], [5, 3, 1])
+        >>> key_counts.query([1, 4]).tolist()
+        [1, 0]
+    """
+
+    def __init__(self, buffer_size=1000000):
+        self._buffer_size = buffer_size
+        self._keys = np.zeros(0, dtype=np.uint64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._buffer = []
+        self._buffered = 0
+
+    def update(self, keys, counts=None):
+        """Add counts to keys.
+
+        Args:
+            keys (1d array of int): Keys, possibly repeated.
+            counts (1d array of int, optional): Count to add for each key.
+                Defaults to one per key.
+        """
+        self._buffer.append(_keys_and_counts(keys, counts))
+        self._buffered += len(keys)
+        if self._buffered >= self._buffer_size:
+            self._fold()
+
+    def _fold(self):
+        """Fold the buffered keys into the counts."""
+        if not self._buffer:
+            return
+        keys = np.concatenate([self._keys] + [keys for keys, _ in self._buffer])
+        counts = np.concatenate([self._counts] + [counts for _, counts in self._buffer])
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        self._counts = np.bincount(
+            inverse.ravel(), weights=counts, minlength=len(self._keys)
+        ).astype(np.int64)
+        self._buffer = []
+        self._buffered = 0
+
+    def items(self):
+        """Return the distinct keys and their counts.
+
+        Returns:
+            (1d array of uint64, 1d array of int64): Sorted keys and counts.
+        """
+        self._fold()
+        return self._keys, self._counts
+
+    def most_common(self, n=None):
+        """Return the n most frequent keys with their counts.
+
+        Args:
+            n (int, optional): Number of keys to return. Defaults to all keys.
+
+        Returns:
+            (1d array of uint64, 1d array of int64): Keys and counts, most
+                frequent first.
+        """
+        keys, counts = self.items()
+        order = np.lexsort((keys, -counts))[:n]
+        return keys[order], counts[order]
+
+    def query(self, keys):
+        """Return the counts of keys, zero for keys never counted.
+
+        Args:
+            keys (1d array of int): Keys.
+
+        Returns:
+            1d array of int64: The count of each key.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        known_keys, counts = self.items()
+        idxs = np.searchsorted(known_keys, keys)
+        found = idxs < len(known_keys)
+        found[found] = known_keys[idxs[found]] == keys[found]
+        result = np.zeros(len(keys), dtype=np.int64)
+        result[found] = counts[idxs[found]]
+        return result
+
+
+class CountMinSketch:
+    """Estimate the counts of integer keys using a fixed amount of memory.
+
+    Estimates are never below the true count. With probability at least
+    1 - delta, an estimate is at most epsilon * total above the true count,
+    where total is the sum of all counts added.
+
+    Args:
+        width (int): Number of counters in each row.
+        depth (int): Number of rows, each using a different hash of the keys.
+        seed (int): Seed for the hash functions.
+
+    Example:
+        >>> sketch = CountMinSketch.from_error(epsilon=0.01, delta=0.01)
+        >>> sketch.update([1, 2, 2, 3, 3, 3])
+        >>> sketch.query([1, 2, 3]).tolist()
+        [1, 2, 3]
+    """
+
+    def __init__(self, width, depth, seed=0):
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.total = 0
+        self._table = np.zeros((depth, width), dtype=np.int64)
+        self._row_seeds = ngrams._mix64(
+            np.arange(1, depth + 1, dtype=np.uint64) + np.uint64(seed)
+        )
+
+    @classmethod
+    def from_error(cls, epsilon, delta, seed=0):
+        """Create the smallest sketch with the given error bound.
+
+        Args:
+            epsilon (float): Error of the estimates, relative to the total.
+            delta (float): Probability of an estimate exceeding the error.
+            seed (int): Seed for the hash functions.
+        """
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)), seed)
+
+    @classmethod
+    def from_memory(cls, nbytes, delta, seed=0):
+        """Create the most accurate sketch using at most nbytes of memory.
+
+        Args:
+            nbytes (int): Memory budget for the counters.
+            delta (float): Probability of an estimate exceeding the error.
+            seed (int): Seed for the hash functions.
+
+        Example:
+            >>> sketch = CountMinSketch.from_memory(2 ** 20, delta=0.01)
+            >>> sketch.nbytes <= 2 ** 20, round(sketch.epsilon, 6)
+            (True, 0.000104)
+        """
+        depth = math.ceil(math.log(1 / delta))
+        return cls(nbytes // (8 * depth), depth, seed)
+
+    @property
+    def epsilon(self):
+        """The error of the estimates, relative to the total count."""
+        return math.e / self.width
+
+    @property
+    def nbytes(self):
+        """The memory used by the counters."""
+        return self._table.nbytes
+
+    def _columns(self, keys):
+        """Return the counter of each key in each row."""
+        with np.errstate(over="ignore"):
+            return [
+                ngrams._mix64(keys ^ row_seed) % np.uint64(self.width)
+                for row_seed in self._row_seeds
+            ]
+
+    def update(self, keys, counts=None):
+        """Add counts to keys.
+
+        Args:
+            keys (1d array of int): Keys, possibly repeated.
+            counts (1d array of int, optional): Count to add for each key.
+                Defaults to one per key.
+        """
+        keys, counts = _keys_and_counts(keys, counts)
+        for row, columns in zip(self._table, self._columns(keys)):
+            row += np.bincount(columns, weights=counts, minlength=self.width).astype(
+                np.int64
+            )
+        self.total += int(counts.sum())
+
+    def query(self, keys):
+        """Estimate the counts of keys.
+
+        Args:
+            keys (1d array of int): Keys.
+
+        Returns:
+            1d array of int64: Estimated count of each key.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        estimates = [
+            row[columns] for row, columns in zip(self._table, self._columns(keys))
+        ]
+        return np.min(estimates, axis=0)
+
+    def merge(self, other):
+        """Add the counts of a sketch with the same shape and seed."""
+        shape = (self.width, self.depth, self.seed)
+        if (other.width, other.depth, other.seed) != shape:
+            raise Exception("Only sketches with the same shape and seed can be merged.")
+        self._table += other._table
+        self.total += other.total
+
+
+class MisraGries:
+    """Keep the keys whose count may exceed total / (capacity + 1).
+
+    At most capacity keys are kept. The kept counts are never above the true
+    counts and at most `error` below them, and any key which isn't kept has
+    a true count of at most `error`. The error is at most total / (capacity + 1).
+
+    Args:
+        capacity (int): Max number of keys to keep.
+
+    Example:
+        >>> summary = MisraGries(2)
+        >>> summary.update([1, 1, 1, 1, 2, 2, 3])
+        >>> keys, counts = summary.items()
+        >>> keys.tolist(), counts.tolist(), summary.error
+        ([1, 2], [3, 1], 1)
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.error = 0
+        self._keys = np.zeros(0, dtype=np.uint64)
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def update(self, keys, counts=None):
+        """Add counts to keys, then drop keys which can't be frequent.
+
+        Args:
+            keys (1d array of int): Keys, possibly repeated.
+            counts (1d array of int, optional): Count to add for each key.
+                Defaults to one per key.
+        """
+        keys, counts = _keys_and_counts(keys, counts)
+        keys = np.concatenate([self._keys, keys])
+        counts = np.concatenate([self._counts, counts])
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        self._counts = np.bincount(
+            inverse.ravel(), weights=counts, minlength=len(self._keys)
+        ).astype(np.int64)
+        self._prune()
+
+    def _prune(self):
+        """Subtract the (capacity + 1)-th largest count from every count."""
+        if len(self._keys) <= self.capacity:
+            return
+        cutoff = np.partition(self._counts, -(self.capacity + 1))[-(self.capacity + 1)]
+        self._counts -= cutoff
+        keep = self._counts > 0
+        self._keys = self._keys[keep]
+        self._counts = self._counts[keep]
+        self.error += int(cutoff)
+
+    def merge(self, other):
+        """Add the keys and counts of another summary."""
+        self.update(other._keys, other._counts)
+        self.error += other.error
+
+    def items(self):
+        """Return the kept keys and their counts.
+
+        Returns:
+            (1d array of uint64, 1d array of int64): Sorted keys and counts.
+        """
+        return self._keys, self._counts
+
+    @property
+    def nbytes(self):
+        """The memory used by the kept keys and counts."""
+        return self._keys.nbytes + self._counts.nbytes
+
+
+class HeavyHitters:
+    """Find the most frequent integer keys and estimate their counts.
+
+    A `MisraGries` summary keeps the candidates for the most frequent keys
+    and a `CountMinSketch` estimates their counts. The estimate of a key is
+    the smaller of the sketch estimate and the summary count plus its error,
+    so it is never below the true count. Memory is bounded by the capacity
+    of the summary and the size of the sketch.
+
+    Args:
+        max_terms (int): Number of most frequent keys to find.
+        sketch (CountMinSketch, optional): Sketch to estimate counts with.
+            Defaults to a sketch with relative error DEFAULT_EPSILON with
+            probability 1 - DEFAULT_DELTA, which uses about 15MB.
+        capacity (int, optional): Capacity of the summary. Defaults to
+            twice max_terms.
+
+    Example:
+        >>> heavy_hitters = HeavyHitters(2)
+        >>> heavy_hitters.update([1, 1, 1, 1, 2, 2, 2, 3, 4])
+        >>> keys, counts = heavy_hitters.most_common()
+        >>> keys.tolist(), counts.tolist()
+        ([1, 2], [4, 3])
+    """
+
+    def __init__(self, max_terms, sketch=None, capacity=None):
+        self.max_terms = max_terms
+        if sketch is None:
+            sketch = CountMinSketch.from_error(DEFAULT_EPSILON, DEFAULT_DELTA)
+        self.sketch = sketch
+        if capacity is None:
+            capacity = 2 * max_terms
+        self.summary = MisraGries(capacity)
+
+    def update(self, keys, counts=None):
+        """Add counts to keys.
+
+        Args:
+            keys (1d array of int): Keys, possibly repeated.
+            counts (1d array of int, optional): Count to add for each key.
+                Defaults to one per key.
+        """
+        keys, counts = _keys_and_counts(keys, counts)
+        self.sketch.update(keys, counts)
+        self.summary.update(keys, counts)
+
+    def merge(self, other):
+        """Add the counts of another instance with a compatible sketch."""
+        self.sketch.merge(other.sketch)
+        self.summary.merge(other.summary)
+
+    def most_common(self, n=None):
+        """Return the n most frequent keys with their estimated counts.
+
+        Args:
+            n (int, optional): Number of keys to return. Defaults to max_terms.
+
+        Returns:
+            (1d array of uint64, 1d array of int64): Keys and counts, most
+                frequent first.
+        """
+        if n is None:
+            n = self.max_terms
+        keys, counts = self.summary.items()
+        estimates = np.minimum(self.sketch.query(keys), counts + self.summary.error)
+        # Most frequent first, breaking ties by key so the result is stable.
+        order = np.lexsort((keys, -estimates))[:n]
+        return keys[order], estimates[order]
+
+    @property
+    def error_bound(self):
+        """Estimates exceed the true counts by at most this, w.h.p."""
+        return min(
+            self.summary.error, math.ceil(self.sketch.epsilon * self.sketch.total)
+        )
+
+    @property
+    def nbytes(self):
+        """The memory used by the sketch and the summary."""
+        return self.sketch.nbytes + self.summary.nbytes
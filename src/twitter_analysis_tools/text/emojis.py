@@ -1,8 +1,133 @@
-"""Functions for extracting and manipulating emojis."""
+"""Functions for extracting and manipulating emojis.
 
-import demoji
+The emojis are read from a table shipped with the package, so no download is
+needed, and matched with a single compiled regex. The regex is built from a
+trie of the emojis, so that at each position of a text only the emojis
+starting with the character there are tried, and the longest emoji is
+matched, e.g. a whole family rather than its members.
 
-demoji.download_codes()
+The table maps each emoji to its description and was generated from the data
+of the `emoji` package with `write_emoji_codes`.
+"""
+
+import json
+import os
+import re  # For regex.
+from collections import Counter
+
+# Path of the table of emojis shipped with the package.
+EMOJI_CODES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "emoji_codes.json",
+)
+
+# Largest gap between the first characters of emojis merged into one range.
+_MAX_RANGE_GAP = 16
+
+_emoji_codes = None
+_emoji_pattern = None
+
+
+def load_emoji_codes():
+    """Return the description of each emoji, loading the table on first use.
+
+    Returns:
+        dict of str: str: The description of each emoji. Don't modify it.
+
+    Example:
+    >>> load_emoji_codes()["😷"]
+    'face with medical mask'
+    """
+    global _emoji_codes
+    if _emoji_codes is None:
+        with open(EMOJI_CODES_PATH, encoding="utf-8") as f:
+            _emoji_codes = json.load(f)["codes"]
+    return _emoji_codes
+
+
+def write_emoji_codes(path=EMOJI_CODES_PATH):
+    """Write the table of emojis from the data of the `emoji` package.
+
+    Only needed to update the table shipped with the package, after
+    installing a newer version of `emoji`.
+
+    Args:
+        path (str): Where to write the table.
+    """
+    import emoji
+
+    codes = {
+        code: data["en"].strip(":").replace("_", " ")
+        for code, data in emoji.EMOJI_DATA.items()
+    }
+    table = {"source": "emoji {}".format(emoji.__version__), "codes": codes}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, indent=0, sort_keys=True)
+        f.write("\n")
+
+
+def _trie_pattern(strings):
+    """Return a regex matching the longest of strings at each position.
+
+    Example:
+    >>> _trie_pattern(["ab", "a", "ac", "b"])
+    '(?=[a-b])(?:a(?:[bc])?|b)'
+    """
+    trie = {}
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        # Marks the end of a string.
+        node[""] = {}
+    # Lets the regex engine skip quickly over characters which can't start
+    # a match. Nearby first characters are merged into ranges, as a class with
+    # many characters beyond the BMP is slow to test.
+    ranges = []
+    for code in sorted(ord(char) for char in trie if char):
+        if ranges and code - ranges[-1][1] <= _MAX_RANGE_GAP:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    first_chars = "".join(
+        re.escape(chr(low)) + ("-" + re.escape(chr(high)) if high > low else "")
+        for low, high in ranges
+    )
+    return "(?=[{}]){}".format(first_chars, _node_pattern(trie))
+
+
+def _node_pattern(node):
+    """Return the pattern matching the strings in a trie node."""
+    # Group the characters followed by the same strings, such as the many
+    # emojis which may be followed by a skin tone, into a character class,
+    # so the regex engine tries far fewer branches.
+    chars_by_rest = {}
+    for char, child in sorted(node.items()):
+        if char:
+            chars_by_rest.setdefault(_node_pattern(child), []).append(re.escape(char))
+    if not chars_by_rest:
+        return ""
+    branches = [
+        (chars[0] if len(chars) == 1 else "[{}]".format("".join(chars))) + rest
+        for rest, chars in chars_by_rest.items()
+    ]
+    pattern = "(?:{})".format("|".join(branches))
+    if "" in node:
+        # Longer strings first, as the optional group is greedy.
+        pattern += "?"
+    return pattern
+
+
+def get_emoji_pattern():
+    """Return the compiled regex matching any single emoji.
+
+    The regex is compiled on first use.
+    """
+    global _emoji_pattern
+    if _emoji_pattern is None:
+        _emoji_pattern = re.compile(_trie_pattern(load_emoji_codes()))
+    return _emoji_pattern
 
 
 def extract_emojis(text):
@@ -14,17 +139,88 @@ def extract_emojis(text):
     ['🦠', '🤒', '😷', '😷', '😷']
     >>> extract_emojis("No emojis here. :( )")
     []
+    >>> extract_emojis("Families are one emoji: 👨‍👩‍👧")
+    ['👨\\u200d👩\\u200d👧']
     """
-    return [emoji for emoji in demoji._EMOJI_PAT.findall(text)]
+    return get_emoji_pattern().findall(text)
 
 
 def contains_emoji(text):
     """Return True if text contains an emoji, False otherwise.
 
+    The search stops at the first emoji.
     Examples:
     >>> contains_emoji("🦠 coronavirus. 🤒😷😷😷")
     True
     >>> contains_emoji("No emojis here. :( )")
     False
     """
-    return bool(demoji.findall(text))
+    # Every emoji has a character outside of ASCII.
+    return not _is_ascii(text) and get_emoji_pattern().search(text) is not None
+
+
+def count_emojis(text):
+    """Return the number of times each emoji appears in text.
+
+    Example:
+    >>> count_emojis("🤒😷😷 😷")
+    Counter({'😷': 3, '🤒': 1})
+    """
+    return Counter(extract_emojis(text))
+
+
+def _is_ascii(text):
+    """Return whether text only has ASCII characters."""
+    try:
+        text.encode("ascii")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def extract_emojis_batch(texts):
+    """Return the emojis contained in each of texts, see `extract_emojis`.
+
+    Can be used as a `Pipeline.add_batch_map` step.
+    """
+    findall = get_emoji_pattern().findall
+    return [findall(text) for text in texts]
+
+
+def contains_emoji_batch(texts):
+    """Return whether each of texts contains an emoji, see `contains_emoji`.
+
+    Can be used as a `Pipeline.add_batch_filter` step.
+
+    Example:
+    >>> from twitter_analysis_tools.utils import Pipeline
+    >>> texts = ["no emoji", "😷 mask", "🤒"]
+    >>> list(Pipeline(texts).add_batch_filter(contains_emoji_batch))
+    ['😷 mask', '🤒']
+    """
+    search = get_emoji_pattern().search
+    return [not _is_ascii(text) and search(text) is not None for text in texts]
+
+
+def count_emojis_batch(texts):
+    """Return the number of times each emoji appears in each of texts.
+
+    Can be used as a `Pipeline.add_batch_map` step. To count the emojis of all
+    the texts together, see `total_emoji_counts`.
+    """
+    findall = get_emoji_pattern().findall
+    return [Counter(findall(text)) for text in texts]
+
+
+def total_emoji_counts(texts):
+    """Return the number of times each emoji appears in all of texts.
+
+    Example:
+    >>> total_emoji_counts(["🤒😷", "no emoji", "😷"])
+    Counter({'😷': 2, '🤒': 1})
+    """
+    counts = Counter()
+    findall = get_emoji_pattern().findall
+    for text in texts:
+        counts.update(findall(text))
+    return counts
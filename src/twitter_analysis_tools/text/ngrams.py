@@ -1,4 +1,12 @@
-from nltk.util import everygrams
+from collections import Counter
+
+import numpy as np
+
+# Total number of bits available for the token ids in a packed ngram key.
+_KEY_BITS = 63
+
+# Longest ngram which can be packed into a single key, see `pack_ngrams`.
+MAX_PACKED_NGRAM_LEN = 3
 
 
 def get_ngrams(max_len, tokens, delimiter=" "):
@@ -32,6 +40,342 @@ def get_ngrams(max_len, tokens, delimiter=" "):
         >>> listify_nested_iterables(ngrams_gen)
         [['a', 'b', 'c', 'a b', 'b c'], ['d', 'e', 'f', 'd e', 'e f']]
     """
-    # Gotcha: everygrams doesn't work with iterables. Only lists.
-    ngrams = everygrams(list(tokens), max_len=max_len)
-    return map(delimiter.join, ngrams)
+    tokens = list(tokens)
+    ngrams = list(tokens)
+    for n in range(2, max_len + 1):
+        ngrams.extend(map(delimiter.join, zip(*(tokens[i:] for i in range(n)))))
+    return ngrams
+
+
+def _id_bits(max_len):
+    """Return the number of bits per token id when packing ngrams."""
+    if not 1 <= max_len <= MAX_PACKED_NGRAM_LEN:
+        raise Exception(
+            "Only ngrams of length 1 to {} can be packed.".format(MAX_PACKED_NGRAM_LEN)
+        )
+    return _KEY_BITS // max_len
+
+
+def max_packed_token_id(max_len):
+    """Return the largest token id which can be packed into ngram keys.
+
+    Example:
+        >>> max_packed_token_id(2)
+        2147483646
+    """
+    return 2 ** _id_bits(max_len) - 2
+
+
+def pack_ngrams(max_len, token_ids):
+    """Get the ngrams of integer token ids as packed integer keys.
+
+    Each token id is shifted up by one and the ids of the tokens in an ngram
+    are packed into the bits of a single 64 bit integer, so that ngrams of
+    different lengths never share a key. The keys can be decoded with
+    `unpack_ngram`.
+
+    Args:
+        max_len (int): Max length of ngram to consider, at most
+            `MAX_PACKED_NGRAM_LEN`.
+        token_ids (1d array of int): The ids of the tokens, each at most
+            `max_packed_token_id(max_len)`.
+
+    Returns:
+        1d array of uint64: The keys of all of the unigrams, then all of the
+            bigrams and so on.
+
+    Examples:
+        >>> keys = pack_ngrams(2, [0, 1, 2])
+        >>> [unpack_ngram(2, key) for key in keys]
+        [(0,), (1,), (2,), (0, 1), (1, 2)]
+    """
+    return pack_ngrams_batch(max_len, [token_ids])
+
+
+def pack_ngrams_batch(max_len, token_id_lists, return_tweet_idxs=False):
+    """Get the packed ngram keys of the token ids of several tweets at once.
+
+    The token ids of all of the tweets are packed together, so this is much
+    faster than calling `pack_ngrams` for each tweet. ngrams never span two
+    tweets.
+
+    Args:
+        max_len (int): Max length of ngram to consider, at most
+            `MAX_PACKED_NGRAM_LEN`.
+        token_id_lists (iterable of 1d arrays of int): The ids of the tokens
+            of each tweet.
+        return_tweet_idxs (bool): Whether to also return the index of the
+            tweet each ngram is from.
+
+    Returns:
+        1d array of uint64: The keys of the ngrams of all of the tweets, and
+            with return_tweet_idxs, a 1d array of the index of their tweets.
+
+    Examples:
+        >>> keys = pack_ngrams_batch(2, [[0, 1], [2, 3]])
+        >>> [unpack_ngram(2, key) for key in keys]
+        [(0,), (1,), (2,), (3,), (0, 1), (2, 3)]
+    """
+    bits = np.uint64(_id_bits(max_len))
+    token_id_lists = [np.asarray(ids, dtype=np.uint64) for ids in token_id_lists]
+    if not token_id_lists:
+        keys = np.zeros(0, dtype=np.uint64)
+        return (keys, np.zeros(0, dtype=np.int64)) if return_tweet_idxs else keys
+    ids = np.concatenate(token_id_lists)
+    if len(ids) and ids.max() > max_packed_token_id(max_len):
+        raise Exception(
+            "Token ids above {} can't be packed into ngrams of length {}.".format(
+                max_packed_token_id(max_len), max_len
+            )
+        )
+    ids += np.uint64(1)
+
+    # The index one past the last token of the tweet containing each token.
+    lengths = [len(token_ids) for token_ids in token_id_lists]
+    tweet_ends = np.repeat(np.cumsum(lengths), lengths)
+    starts = np.arange(len(ids))
+    tweet_idxs = np.repeat(np.arange(len(lengths)), lengths)
+
+    keys = [ids]
+    key_tweet_idxs = [tweet_idxs]
+    ngram_keys = ids
+    for n in range(2, max_len + 1):
+        # Spanning ngrams are kept in ngram_keys since longer ngrams are built
+        # from them, but only the ngrams which end in the tweet they start in
+        # are returned.
+        ngram_keys = (ngram_keys[:-1] << bits) | ids[n - 1 :]
+        within_tweet = starts[: len(ngram_keys)] + n <= tweet_ends[: len(ngram_keys)]
+        keys.append(ngram_keys[within_tweet])
+        key_tweet_idxs.append(tweet_idxs[: len(ngram_keys)][within_tweet])
+    if return_tweet_idxs:
+        return np.concatenate(keys), np.concatenate(key_tweet_idxs)
+    return np.concatenate(keys)
+
+
+def unpack_ngram(max_len, key):
+    """Get the token ids of the ngram packed into key by `pack_ngrams`.
+
+    Args:
+        max_len (int): Max length of ngram used when packing the key.
+        key (int): Packed ngram key.
+
+    Returns:
+        tuple of int: The token ids of the ngram.
+
+    Examples:
+        >>> unpack_ngram(3, pack_ngrams(3, [5, 7, 11])[-1])
+        (5, 7, 11)
+    """
+    bits = _id_bits(max_len)
+    mask = (1 << bits) - 1
+    key = int(key)
+    ids = []
+    while key:
+        ids.append((key & mask) - 1)
+        key >>= bits
+    return tuple(reversed(ids))
+
+
+def decode_ngram(max_len, key, tokens, delimiter=" "):
+    """Get the string representation of a packed ngram key.
+
+    Args:
+        max_len (int): Max length of ngram used when packing the key.
+        key (int): Packed ngram key.
+        tokens (sequence of str): The token with each id.
+        delimiter (str, optional): Separator to use between tokens in an ngram.
+
+    Returns:
+        str: The ngram, as returned by `get_ngrams`.
+
+    Examples:
+        >>> tokens = ["a", "b", "c"]
+        >>> [decode_ngram(2, key, tokens) for key in pack_ngrams(2, [0, 1, 2])]
+        ['a', 'b', 'c', 'a b', 'b c']
+    """
+    return delimiter.join(tokens[i] for i in unpack_ngram(max_len, key))
+
+
+def _mix64(x):
+    """Scramble the bits of uint64 values (the splitmix64 finalizer)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _counter(ngrams, counts):
+    """Return a Counter of the ngrams, adding up the counts of equal ngrams.
+
+    Distinct keys may decode to the same string, e.g. a token containing the
+    delimiter and a bigram.
+    """
+    counter = Counter()
+    for ngram, count in zip(ngrams, counts):
+        counter[ngram] += count
+    return counter
+
+
+class NgramCounter:
+    """Count the ngrams of tokenized tweets using packed integer keys.
+
+    Tokens are given integer ids by a `terms.TermDictionary`, which may be
+    shared with other stages of a pipeline, the ngrams of a batch of tweets
+    are packed into integer keys with `pack_ngrams_batch` and the keys are
+    counted with NumPy. The ngrams are only turned into strings once, in
+    `to_counter`, instead of for every occurrence.
+
+    With max_terms, only the max_terms most frequent ngrams are counted, in
+    bounded memory, using `counting.HeavyHitters`. Their counts are then
+    estimates which are never below the true counts. Only the table of
+    distinct tokens still grows with the input.
+
+    Args:
+        max_len (int): Max length of ngram to count, at most
+            `MAX_PACKED_NGRAM_LEN`.
+        buffer_size (int): Number of keys to collect before folding them into
+            the counts.
+        max_terms (int, optional): Number of most frequent ngrams to count
+            approximately. By default all ngrams are counted exactly.
+        doc_counts (bool): Whether to also count the number of tweets each
+            ngram appears in. With max_terms, these are estimated with a
+            `counting.CountMinSketch`.
+        term_dictionary (TermDictionary, optional): Dictionary giving the
+            ids of the tokens. Defaults to a new dictionary.
+        epsilon (float, optional): With max_terms, the error of the estimated
+            counts relative to the total count, see
+            `counting.CountMinSketch.from_error`. Defaults to
+            `counting.DEFAULT_EPSILON`.
+        delta (float, optional): With max_terms, the probability of an
+            estimate exceeding the error. Defaults to `counting.DEFAULT_DELTA`.
+        sketch_nbytes (int, optional): With max_terms, the memory budget of
+            the sketches, split between the counts and the document counts.
+            Replaces epsilon, which is then as small as the budget allows.
+
+    Example:
+        >>> counter = NgramCounter(2, doc_counts=True)
+        >>> counter.update([["a", "b", "a"], ["a", "b"]])
+        >>> counter.to_counter()
+        Counter({'a': 3, 'b': 2, 'a b': 2, 'b a': 1})
+        >>> counter.doc_counter()
+        Counter({'a': 2, 'b': 2, 'a b': 2, 'b a': 1})
+    """
+
+    def __init__(
+        self,
+        max_len,
+        buffer_size=1000000,
+        max_terms=None,
+        doc_counts=False,
+        term_dictionary=None,
+        epsilon=None,
+        delta=None,
+        sketch_nbytes=None,
+    ):
+        _id_bits(max_len)
+        # Imported here since counting uses this module.
+        from twitter_analysis_tools.text import counting, terms
+
+        if epsilon is None:
+            epsilon = counting.DEFAULT_EPSILON
+        if delta is None:
+            delta = counting.DEFAULT_DELTA
+
+        def new_sketch():
+            if sketch_nbytes is None:
+                return counting.CountMinSketch.from_error(epsilon, delta)
+            num_sketches = 2 if doc_counts else 1
+            return counting.CountMinSketch.from_memory(
+                sketch_nbytes // num_sketches, delta
+            )
+
+        self.max_len = max_len
+        self.num_docs = 0
+        if max_terms is None:
+            self._term_counts = counting.KeyCounts(buffer_size)
+        else:
+            self._term_counts = counting.HeavyHitters(max_terms, sketch=new_sketch())
+        self._doc_counts = None
+        if doc_counts and max_terms is None:
+            self._doc_counts = counting.KeyCounts(buffer_size)
+        elif doc_counts:
+            self._doc_counts = new_sketch()
+        if term_dictionary is None:
+            term_dictionary = terms.TermDictionary()
+        self.term_dictionary = term_dictionary
+
+    def update(self, token_lists):
+        """Count the ngrams of a batch of tweets.
+
+        Args:
+            token_lists (iterable of iterable of str): Tokens of each tweet.
+        """
+        self.update_ids(self.term_dictionary.encode_batch(token_lists))
+
+    def update_ids(self, id_lists):
+        """Count the ngrams of a batch of tweets encoded as token ids.
+
+        Args:
+            id_lists (list of 1d arrays of int): Ids of the tokens of each
+                tweet, from `term_dictionary`.
+        """
+        self.num_docs += len(id_lists)
+        if self._doc_counts is None:
+            self._term_counts.update(pack_ngrams_batch(self.max_len, id_lists))
+            return
+
+        keys, tweet_idxs = pack_ngrams_batch(
+            self.max_len, id_lists, return_tweet_idxs=True
+        )
+        self._term_counts.update(keys)
+        # Count each distinct ngram of a tweet once.
+        order = np.lexsort((keys, tweet_idxs))
+        keys = keys[order]
+        tweet_idxs = tweet_idxs[order]
+        is_first = np.ones(len(keys), dtype=bool)
+        is_first[1:] = (keys[1:] != keys[:-1]) | (tweet_idxs[1:] != tweet_idxs[:-1])
+        self._doc_counts.update(keys[is_first])
+
+    def key_counts(self):
+        """Return the distinct ngram keys and their counts.
+
+        Returns:
+            (1d array of uint64, 1d array of int64): Keys and counts, most
+                frequent first.
+        """
+        return self._term_counts.most_common()
+
+    def _decode(self, keys, delimiter):
+        """Return the string representations of packed ngram keys."""
+        return [
+            decode_ngram(self.max_len, key, self.term_dictionary.tokens, delimiter)
+            for key in keys.tolist()
+        ]
+
+    def to_counter(self, delimiter=" "):
+        """Return the counts of the ngrams as strings.
+
+        Args:
+            delimiter (str, optional): Separator to use between tokens.
+
+        Returns:
+            Counter: The count of each ngram, as returned by `get_ngrams`.
+        """
+        keys, counts = self.key_counts()
+        return _counter(self._decode(keys, delimiter), counts.tolist())
+
+    def doc_counter(self, delimiter=" "):
+        """Return the number of tweets each ngram in `to_counter` appears in.
+
+        Args:
+            delimiter (str, optional): Separator to use between tokens.
+
+        Returns:
+            Counter: The number of tweets containing each ngram.
+        """
+        if self._doc_counts is None:
+            raise Exception("Document counts were not counted.")
+        keys, _ = self.key_counts()
+        doc_counts = self._doc_counts.query(keys)
+        return _counter(self._decode(keys, delimiter), doc_counts.tolist())
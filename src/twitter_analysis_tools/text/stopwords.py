@@ -3,6 +3,8 @@
 import string
 from itertools import filterfalse
 
+import numpy as np
+
 from ._nltk_stopwords import nltk_stopwords
 
 # Augment stopwords list.
@@ -25,8 +27,8 @@ _stopword_sublists = [
     string.punctuation,
     _other_unwanted_things,
 ]
-# Combine sublists into single list.
-stopwords = list(set().union(*_stopword_sublists))
+# Combine sublists into a single set, for constant time lookups.
+stopwords = frozenset().union(*_stopword_sublists)
 
 
 def is_stopword(word):
@@ -63,4 +65,173 @@ def remove_stopword_tokens(tokens):
         >>> list(tokens_gen)
         ['apple', 'coronavirus']
     """
-    return filterfalse(is_stopword, tokens)
+    return filterfalse(stopwords.__contains__, tokens)
+
+
+def remove_stopwords(tokens):
+    """Remove stopwords from a whole list of tokens at once.
+
+    Faster than `remove_stopword_tokens` when the tokens are needed as a list.
+
+    Args:
+        tokens (iterable of str): The tokens of a tweet.
+
+    Returns:
+        list of str: The tokens which are not stopwords.
+
+    Examples:
+        >>> remove_stopwords(['the', 'a', 'apple', '.', ',', 'coronavirus'])
+        ['apple', 'coronavirus']
+    """
+    return [token for token in tokens if token not in stopwords]
+
+
+class StopwordFilter:
+    """Remove a custom set of stopwords from lists of tokens.
+
+    Args:
+        extra_stopwords (iterable of str): Stopwords to remove in addition to
+            the default `stopwords`.
+        include_defaults (bool): Whether to remove the default `stopwords`.
+
+    Attributes:
+        stopwords (frozenset of str): All of the stopwords to remove.
+
+    Examples:
+        >>> stopword_filter = StopwordFilter(["covid", "coronavirus"])
+        >>> stopword_filter(['the', 'apple', 'coronavirus'])
+        ['apple']
+
+        Filter the tokens of several tweets at once:
+
+        >>> stopword_filter.remove_batch([['the', 'apple'], ['covid', 'pear']])
+        [['apple'], ['pear']]
+
+        Only remove the given stopwords:
+
+        >>> stopword_filter = StopwordFilter(["covid"], include_defaults=False)
+        >>> stopword_filter(['the', 'covid', 'apple'])
+        ['the', 'apple']
+    """
+
+    def __init__(self, extra_stopwords=(), include_defaults=True):
+        if include_defaults:
+            self.stopwords = stopwords.union(extra_stopwords)
+        else:
+            self.stopwords = frozenset(extra_stopwords)
+
+    def is_stopword(self, word):
+        """Check if a word is one of the stopwords."""
+        return word in self.stopwords
+
+    def __call__(self, tokens):
+        """Remove the stopwords from a list of tokens.
+
+        Args:
+            tokens (iterable of str): The tokens of a tweet.
+
+        Returns:
+            list of str: The tokens which are not stopwords.
+        """
+        stopword_set = self.stopwords
+        return [token for token in tokens if token not in stopword_set]
+
+    def remove_batch(self, token_lists):
+        """Remove the stopwords from the tokens of several tweets.
+
+        Args:
+            token_lists (iterable of iterable of str): Tokens of each tweet.
+
+        Returns:
+            list of list of str: The tokens of each tweet which are not
+                stopwords.
+        """
+        stopword_set = self.stopwords
+        return [
+            [token for token in tokens if token not in stopword_set]
+            for tokens in token_lists
+        ]
+
+    def id_filter(self, term_dictionary):
+        """Return a filter removing these stopwords from arrays of token ids.
+
+        Args:
+            term_dictionary (TermDictionary): The dictionary of the ids, see
+                `twitter_analysis_tools.text.terms`.
+
+        Returns:
+            StopwordIdFilter: The filter.
+        """
+        return StopwordIdFilter(self.stopwords, term_dictionary)
+
+
+class StopwordIdFilter:
+    """Remove stopwords from arrays of token ids.
+
+    Whether each id is a stopword is stored in a boolean array indexed by id,
+    which is extended as tokens are added to the dictionary, so each distinct
+    token is only looked up in the set of stopwords once.
+
+    Args:
+        stopwords (iterable of str): The stopwords to remove.
+        term_dictionary (TermDictionary): The dictionary of the ids, see
+            `twitter_analysis_tools.text.terms`.
+
+    Example:
+        >>> from twitter_analysis_tools.text.terms import TermDictionary
+        >>> term_dictionary = TermDictionary()
+        >>> stopword_id_filter = StopwordFilter().id_filter(term_dictionary)
+        >>> ids = term_dictionary.encode(['the', 'apple', 'and', 'pear'])
+        >>> term_dictionary.decode(stopword_id_filter(ids))
+        ['apple', 'pear']
+    """
+
+    def __init__(self, stopwords, term_dictionary):
+        self.stopwords = frozenset(stopwords)
+        self.term_dictionary = term_dictionary
+        self._is_stopword = np.zeros(0, dtype=bool)
+        self._num_known = 0
+
+    def _update(self):
+        """Look up the tokens added to the dictionary since the last update."""
+        tokens = self.term_dictionary.tokens
+        if self._num_known == len(tokens):
+            return
+        if len(self._is_stopword) < len(tokens):
+            # Grow geometrically so that updates take amortized constant time.
+            grown = np.zeros(max(len(tokens), 2 * len(self._is_stopword)), dtype=bool)
+            grown[: self._num_known] = self._is_stopword[: self._num_known]
+            self._is_stopword = grown
+        stopword_set = self.stopwords
+        self._is_stopword[self._num_known : len(tokens)] = [
+            token in stopword_set for token in tokens[self._num_known :]
+        ]
+        self._num_known = len(tokens)
+
+    def __call__(self, ids):
+        """Remove the stopwords from an array of token ids.
+
+        Args:
+            ids (1d array of int): The token ids of a tweet.
+
+        Returns:
+            1d array of int: The ids which are not stopwords.
+        """
+        self._update()
+        ids = np.asarray(ids, dtype=np.intp)
+        return ids[~self._is_stopword[ids]]
+
+    def remove_batch(self, id_arrays):
+        """Remove the stopwords from the token ids of several tweets.
+
+        Args:
+            id_arrays (iterable of 1d arrays of int): Token ids of each tweet.
+
+        Returns:
+            list of 1d arrays of int: The ids of each tweet which are not
+                stopwords.
+        """
+        self._update()
+        is_stopword = self._is_stopword
+        id_arrays = [np.asarray(ids, dtype=np.intp) for ids in id_arrays]
+        return [ids[~is_stopword[ids]] for ids in id_arrays]
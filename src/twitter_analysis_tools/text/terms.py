@@ -0,0 +1,186 @@
+"""Integer ids for tokens, shared by the stages of a text pipeline.
+
+Interning each token to an integer id once, right after tokenization, lets
+the later stages (stopword removal, ngrams, counting and bags of words) work on
+compact arrays of ids instead of hashing the same strings again at every stage.
+"""
+
+from array import array
+
+import numpy as np
+
+# Typecode of the arrays of token ids, unsigned ints of at least 4 bytes.
+ID_TYPECODE = "I"
+
+
+class TermDictionary:
+    """Map tokens to consecutive integer ids, assigned as tokens are first seen.
+
+    Args:
+        tokens (iterable of str): Tokens to add to the dictionary.
+
+    Example:
+        >>> term_dictionary = TermDictionary()
+        >>> ids = term_dictionary.encode(["a", "rose", "is", "a", "rose"])
+        >>> ids
+        array('I', [0, 1, 2, 0, 1])
+        >>> term_dictionary.decode(ids[1:3])
+        ['rose', 'is']
+        >>> len(term_dictionary), term_dictionary["is"], term_dictionary.token(1)
+        (3, 2, 'rose')
+    """
+
+    def __init__(self, tokens=()):
+        self._ids = {}
+        self._tokens = []
+        for token in tokens:
+            self.add(token)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __contains__(self, token):
+        return token in self._ids
+
+    def __getitem__(self, token):
+        """Return the id of token, raising KeyError if it has none."""
+        return self._ids[token]
+
+    def get(self, token, default=None):
+        """Return the id of token, or default if it has none."""
+        return self._ids.get(token, default)
+
+    def token(self, token_id):
+        """Return the token with the given id."""
+        return self._tokens[token_id]
+
+    @property
+    def tokens(self):
+        """The list of tokens, indexed by id. Don't modify it."""
+        return self._tokens
+
+    def add(self, token):
+        """Return the id of token, giving it the next id if it's new."""
+        token_id = self._ids.get(token)
+        if token_id is None:
+            token_id = self._ids[token] = len(self._tokens)
+            self._tokens.append(token)
+        return token_id
+
+    def encode(self, tokens, add=True):
+        """Return the ids of tokens, adding new tokens to the dictionary.
+
+        Args:
+            tokens (iterable of str): The tokens of a tweet.
+            add (bool): Whether to add new tokens. Otherwise tokens which
+                aren't in the dictionary are skipped.
+
+        Returns:
+            array('I'): The id of each token.
+
+        Example:
+            >>> term_dictionary = TermDictionary(["a", "rose"])
+            >>> term_dictionary.encode(["a", "red", "rose"], add=False)
+            array('I', [0, 1])
+        """
+        token_ids = self._ids
+        tokens_by_id = self._tokens
+        ids = array(ID_TYPECODE)
+        for token in tokens:
+            token_id = token_ids.get(token)
+            if token_id is None:
+                if not add:
+                    continue
+                token_id = token_ids[token] = len(tokens_by_id)
+                tokens_by_id.append(token)
+            ids.append(token_id)
+        return ids
+
+    def encode_batch(self, token_lists, add=True):
+        """Return the ids of the tokens of several tweets.
+
+        Args:
+            token_lists (iterable of iterable of str): Tokens of each tweet.
+            add (bool): Whether to add new tokens, see `encode`.
+
+        Returns:
+            list of array('I'): The ids of the tokens of each tweet.
+        """
+        return [self.encode(tokens, add) for tokens in token_lists]
+
+    def decode(self, ids):
+        """Return the tokens with the given ids.
+
+        Args:
+            ids (iterable of int): Token ids.
+
+        Returns:
+            list of str: The token with each id.
+        """
+        return list(map(self._tokens.__getitem__, ids))
+
+    def mask(self, tokens):
+        """Return a boolean array indexed by id which is True for tokens.
+
+        Only tokens already in the dictionary can be marked; the mask is only
+        as long as the dictionary when it's created.
+
+        Example:
+            >>> TermDictionary(["a", "b", "c"]).mask({"b", "d"}).tolist()
+            [False, True, False]
+        """
+        mask = np.zeros(len(self._tokens), dtype=bool)
+        ids = [self._ids[token] for token in tokens if token in self._ids]
+        mask[ids] = True
+        return mask
+
+    def merge(self, other):
+        """Add the tokens of another dictionary to this one.
+
+        Args:
+            other (TermDictionary): Dictionary to merge into this one.
+
+        Returns:
+            1d array of int64: The id in this dictionary of each id in other,
+                to remap arrays of ids encoded with other.
+
+        Example:
+            >>> first = TermDictionary(["a", "b"])
+            >>> second = TermDictionary(["b", "c"])
+            >>> remap = first.merge(second)
+            >>> remap.tolist(), first.decode(remap[[1, 0]])
+            ([1, 2], ['c', 'b'])
+        """
+        return np.array([self.add(token) for token in other._tokens], dtype=np.int64)
+
+
+def bag_of_ids(id_arrays, num_ids):
+    """Count the ids of each tweet as a sparse document-term matrix.
+
+    Args:
+        id_arrays (iterable of 1d arrays of int): The token ids of each tweet.
+        num_ids (int): Number of columns, larger than any id, e.g. the length
+            of the `TermDictionary` the ids come from.
+
+    Returns:
+        csr_matrix: Matrix with a row for each tweet, with the number of times
+            each id appears in the tweet in the column of the id.
+
+    Example:
+        >>> bag_of_ids([[0, 2, 2], [1]], 3).toarray()
+        array([[1, 0, 2],
+               [0, 1, 0]])
+    """
+    # Imported here as importing scipy is slow.
+    from scipy.sparse import csr_matrix
+
+    id_arrays = [np.asarray(ids, dtype=np.int64) for ids in id_arrays]
+    lengths = [len(ids) for ids in id_arrays]
+    indptr = np.zeros(len(id_arrays) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.concatenate([np.zeros(0, dtype=np.int64)] + id_arrays)
+    data = np.ones(len(indices), dtype=np.int64)
+    matrix = csr_matrix((data, indices, indptr), shape=(len(id_arrays), num_ids))
+    # Add up the counts of ids repeated within a tweet.
+    matrix.sum_duplicates()
+    return matrix
@@ -0,0 +1,215 @@
+"""Tokenizers for tweet text, with a fast backend and the NLTK one.
+
+`get_tokenizer` returns a tokenizer for a backend, with `tokenize(text)` and
+`tokenize_batch(texts)` methods. The "fast" backend gives the same tokens as
+`nltk.tokenize.TweetTokenizer`, using the same patterns, but compiles them with
+the standard library `re` module, which is much faster than the `regex` module
+NLTK uses, and skips the steps which can't change a given text. The two modules
+disagree on a few characters, such as combining marks, and texts containing
+them are tokenized with `regex` like NLTK does.
+
+NLTK is imported when the patterns are first needed, as importing it is slow.
+"""
+
+import re
+
+# Names of the available tokenizer backends.
+TOKENIZER_BACKENDS = ("fast", "nltk")
+
+# Any character repeated four times, which casual.HANG_RE may shorten.
+_REPEATED_CHAR_RE = re.compile(r"(.)\1{3}", re.DOTALL)
+
+# The names of nltk.tokenize.casual which the fast backend uses. Some are
+# private to NLTK, so they are checked when the patterns are compiled.
+_CASUAL_NAMES = ("REGEXPS_PHONE", "EMOTICONS", "HANG_RE", "_replace_html_entities")
+
+# The character classes whose meaning the word pattern depends on.
+_CHAR_CLASSES = (r"\w", r"\d", r"\s", r"[a-z]")
+_RE_CHAR_CLASSES = [re.compile(c, re.I | re.UNICODE) for c in _CHAR_CLASSES]
+
+
+class _TweetPatterns:
+    """The patterns of NLTK's TweetTokenizer, compiled with `re` and `regex`."""
+
+    def __init__(self):
+        import nltk
+        import regex
+        from nltk.tokenize import casual
+
+        missing = [name for name in _CASUAL_NAMES if not hasattr(casual, name)]
+        if missing:
+            raise Exception(
+                "nltk {} has no {} in nltk.tokenize.casual, use the nltk "
+                "tokenizer backend.".format(nltk.__version__, ", ".join(missing))
+            )
+        # The pattern of NLTK's TweetTokenizer, with phone numbers.
+        word_pattern = "({})".format("|".join(casual.REGEXPS_PHONE))
+        # No token starts with whitespace, so skipping it before trying the
+        # pattern gives the same tokens, faster.
+        self.word_re = re.compile(r"\s*" + word_pattern, re.VERBOSE | re.I | re.UNICODE)
+        self.regex_word_re = regex.compile(
+            word_pattern, regex.VERBOSE | regex.I | regex.UNICODE
+        )
+        self.emoticon_re = re.compile(casual.EMOTICONS, re.VERBOSE | re.I | re.UNICODE)
+        self.hang_re = casual.HANG_RE
+        self.replace_html_entities = casual._replace_html_entities
+        self.regex_char_classes = [
+            regex.compile(c, regex.I | regex.UNICODE) for c in _CHAR_CLASSES
+        ]
+
+
+_tweet_patterns = None
+
+
+def _get_tweet_patterns():
+    """Return the tweet patterns, compiling them and importing NLTK once."""
+    global _tweet_patterns
+    if _tweet_patterns is None:
+        _tweet_patterns = _TweetPatterns()
+    return _tweet_patterns
+
+
+# Characters which `re` and `regex` are known to put in the same classes, or
+# not, filled in as characters are seen.
+_same_chars = set()
+_different_chars = set()
+
+
+def _same_in_re_and_regex(chars):
+    """Return whether `re` and `regex` put each of chars in the same classes."""
+    chars = set(chars)
+    if chars <= _same_chars:
+        return True
+    if not chars.isdisjoint(_different_chars):
+        return False
+    regex_char_classes = _get_tweet_patterns().regex_char_classes
+    for char in chars - _same_chars:
+        same = all(
+            bool(re_class.match(char)) == bool(regex_class.match(char))
+            for re_class, regex_class in zip(_RE_CHAR_CLASSES, regex_char_classes)
+        )
+        (_same_chars if same else _different_chars).add(char)
+    return chars <= _same_chars
+
+
+def _word_re(patterns, text):
+    """Return the compiled word pattern which tokenizes text like NLTK."""
+    if _same_in_re_and_regex(text):
+        return patterns.word_re
+    return patterns.regex_word_re
+
+
+class FastTweetTokenizer:
+    """Tokenize tweets exactly like `nltk.tokenize.TweetTokenizer`, faster.
+
+    Only the default options of TweetTokenizer and preserve_case are
+    supported; use the NLTK backend to strip handles or reduce lengthening.
+
+    Args:
+        preserve_case (bool): Whether to keep the case of tokens, otherwise
+            tokens other than emoticons are lowercased.
+
+    Example:
+        >>> tokenizer = FastTweetTokenizer(preserve_case=False)
+        >>> tokenizer.tokenize("@Jack This is SO cool :D &amp; http://t.co/x")
+        ['@jack', 'this', 'is', 'so', 'cool', ':D', '&', 'http://t.co/x']
+    """
+
+    def __init__(self, preserve_case=True):
+        self.preserve_case = preserve_case
+
+    def tokenize(self, text):
+        """Return the tokens of text.
+
+        Args:
+            text (str): Text of a tweet.
+
+        Returns:
+            list of str: Tokens, in the order they appear.
+        """
+        patterns = _get_tweet_patterns()
+        if "&" in text:
+            text = patterns.replace_html_entities(text)
+        if _REPEATED_CHAR_RE.search(text):
+            text = patterns.hang_re.sub(r"\1\1\1", text)
+        words = _word_re(patterns, text).findall(text)
+        if self.preserve_case:
+            return words
+        tokens = []
+        for word in words:
+            lower = word.lower()
+            # Avoid changing emoticons like :D into :d.
+            if lower != word and patterns.emoticon_re.search(word):
+                lower = word
+            tokens.append(lower)
+        return tokens
+
+    def tokenize_batch(self, texts):
+        """Return the tokens of each text.
+
+        Args:
+            texts (iterable of str): Texts of tweets.
+
+        Returns:
+            list of list of str: Tokens of each text.
+        """
+        return [self.tokenize(text) for text in texts]
+
+
+class NltkTweetTokenizer:
+    """`nltk.tokenize.TweetTokenizer`, with a `tokenize_batch` method.
+
+    Args:
+        **kwargs: Options of TweetTokenizer.
+
+    Example:
+        >>> NltkTweetTokenizer(reduce_len=True).tokenize("waaaaay cool")
+        ['waaay', 'cool']
+    """
+
+    def __init__(self, **kwargs):
+        from nltk.tokenize import TweetTokenizer
+
+        self._tokenizer = TweetTokenizer(**kwargs)
+
+    def tokenize(self, text):
+        """Return the tokens of text, see `FastTweetTokenizer.tokenize`."""
+        return self._tokenizer.tokenize(text)
+
+    def tokenize_batch(self, texts):
+        """Return the tokens of each text.
+
+        Args:
+            texts (iterable of str): Texts of tweets.
+
+        Returns:
+            list of list of str: Tokens of each text.
+        """
+        return [self._tokenizer.tokenize(text) for text in texts]
+
+
+def get_tokenizer(backend="fast", **kwargs):
+    """Return a tweet tokenizer using the given backend.
+
+    Args:
+        backend (str): One of TOKENIZER_BACKENDS. "fast" gives the same
+            tokens as "nltk", faster, but only supports preserve_case.
+        **kwargs: Options of the tokenizer, as for TweetTokenizer.
+
+    Returns:
+        FastTweetTokenizer or NltkTweetTokenizer: A tokenizer with tokenize and
+            tokenize_batch methods.
+
+    Example:
+        >>> get_tokenizer(preserve_case=False).tokenize_batch(["Hi there", "#Yes!"])
+        [['hi', 'there'], ['#yes', '!']]
+    """
+    if backend == "fast":
+        return FastTweetTokenizer(**kwargs)
+    elif backend == "nltk":
+        return NltkTweetTokenizer(**kwargs)
+    raise Exception(
+        "Tokenizer backend {} is not one of {}.".format(
+            backend, ", ".join(TOKENIZER_BACKENDS)
+        )
+    )
@@ -1,2 +1,2 @@
 # flake8: noqa: F402
-from . import clean_text, file_mgmt, get_tweets, tweet_info, vocabulary
+from . import clean_text, file_mgmt, get_tweets, tweet_cache, tweet_info, vocabulary
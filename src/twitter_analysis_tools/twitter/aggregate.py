@@ -0,0 +1,268 @@
+"""Aggregate streams of tweets into time series, in a single pass.
+
+`TimeSeriesAggregator` counts the tweets, the occurrences of tracked terms
+and the tweets matching tracked predicates in each hour, day or week. The
+counts are kept in a dense matrix with a row per series and a column per slice
+of time, which is the layout `twitter_analysis_tools.plotting.plot_data`
+expects, so memory is proportional to the number of series times the number
+of slices, however many tweets are aggregated.
+"""
+
+import datetime
+
+import numpy as np
+
+# Local imports.
+from twitter_analysis_tools.text import ngrams, tokenize
+from twitter_analysis_tools.twitter import (
+    clean_text,
+    common_pipelines,
+    file_mgmt,
+    tweet_info,
+)
+
+# Length of each kind of time slice.
+_SLICE_LENGTHS = {
+    "hour": datetime.timedelta(hours=1),
+    "day": datetime.timedelta(days=1),
+    "week": datetime.timedelta(weeks=1),
+}
+
+# Slices are numbered from a Monday, so that weeks start on Mondays.
+_EPOCH = datetime.datetime(1970, 1, 5)
+
+
+class TimeSeriesAggregator:
+    """Count tweets, terms and tweets matching predicates per slice of time.
+
+    Args:
+        terms (iterable of str): Terms to count the occurrences of. Terms are
+            tokenized like the cleaned text of each tweet and matched against
+            its lowercased tokens, so they may be ngrams such as "stay home".
+            Terms which are the same once tokenized raise an exception.
+        predicates (dict of str: function, optional): Functions of a tweet,
+            by name. The tweets for which each returns True are counted.
+        slice_by (str): One of `tweet_info.TIME_SLICES`.
+        buffer_size (int): Number of counts to collect before adding them to
+            the matrix of counts.
+
+    Example:
+        >>> aggregator = TimeSeriesAggregator(
+        ...     terms=["flu", "stay home"],
+        ...     predicates={"retweets": tweet_info.is_retweet},
+        ...     slice_by="day",
+        ... )
+        >>> aggregator.update([
+        ...     {"created_at": "Mon Mar 02 10:00:00 +0000 2020",
+        ...      "full_text": "Stay home, it's flu season"},
+        ...     {"created_at": "Wed Mar 04 12:00:00 +0000 2020",
+        ...      "full_text": "Flu flu", "retweeted_status": {}},
+        ... ])
+        >>> aggregator.series_names
+        ['flu', 'stay home', 'retweets']
+        >>> aggregator.to_array()
+        array([[1, 0, 2],
+               [1, 0, 0],
+               [0, 0, 1]])
+        >>> aggregator.num_tweets().tolist()
+        [1, 0, 1]
+        >>> [str(time_slice) for time_slice in aggregator.time_slices()]
+        ['2020-03-02 00:00:00', '2020-03-03 00:00:00', '2020-03-04 00:00:00']
+    """
+
+    def __init__(self, terms=(), predicates=None, slice_by="hour", buffer_size=100000):
+        if slice_by not in _SLICE_LENGTHS:
+            raise Exception(
+                "Time slice {} is not one of {}.".format(
+                    slice_by, ", ".join(tweet_info.TIME_SLICES)
+                )
+            )
+        self.slice_by = slice_by
+        self._slice_length = _SLICE_LENGTHS[slice_by]
+        self._tokenizer = tokenize.get_tokenizer(preserve_case=False)
+        self._terms = list(terms)
+        # Terms are tokenized like the tweets, so they match the ngrams of
+        # the tokens, e.g. "COVID-19" is counted as "covid - 19".
+        self._term_rows = {}
+        self._max_term_len = 0
+        for row, term in enumerate(self._terms):
+            tokens = self._tokenizer.tokenize(term)
+            if not tokens:
+                raise Exception("Term {!r} has no tokens.".format(term))
+            normalized = " ".join(tokens)
+            if normalized in self._term_rows:
+                raise Exception(
+                    "Term {!r} is the same as {!r} once tokenized.".format(
+                        term, self._terms[self._term_rows[normalized]]
+                    )
+                )
+            self._term_rows[normalized] = row
+            self._max_term_len = max(self._max_term_len, len(tokens))
+        if predicates is None:
+            predicates = {}
+        self._predicates = list(predicates.items())
+        self._buffer_size = buffer_size
+
+        # The last row counts all the tweets. Column 0 is slice _first_slice.
+        self._counts = np.zeros((self.num_series + 1, 0), dtype=np.int64)
+        self._first_slice = None
+        self._rows = []
+        self._slices = []
+
+    @property
+    def num_series(self):
+        """The number of tracked terms and predicates."""
+        return len(self._terms) + len(self._predicates)
+
+    @property
+    def series_names(self):
+        """The name of each series, in the order of the rows of the counts."""
+        return self._terms + [name for name, _ in self._predicates]
+
+    def _slice_index(self, created_at):
+        """Return the number of slices between the epoch and created_at."""
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(datetime.timezone.utc).replace(
+                tzinfo=None
+            )
+        return (created_at - _EPOCH) // self._slice_length
+
+    def add(self, tweet, created_at=None):
+        """Count a tweet.
+
+        Args:
+            tweet (dict): Tweet object, with the fields used by the predicates
+                and tweet["full_text"] if terms are tracked.
+            created_at (datetime, optional): Time to count the tweet at.
+                Defaults to the time the tweet was created.
+        """
+        if created_at is None:
+            created_at = tweet_info.get_created_at(tweet)
+        slice_index = self._slice_index(created_at)
+        rows = []
+        if self._terms:
+            text = clean_text.clean_tweet_text(tweet_info.get_full_text(tweet))
+            tokens = self._tokenizer.tokenize(text)
+            if self._max_term_len > 1:
+                tokens = ngrams.get_ngrams(self._max_term_len, tokens)
+            term_rows = self._term_rows
+            rows.extend(term_rows[token] for token in tokens if token in term_rows)
+        row = len(self._terms)
+        for _, predicate in self._predicates:
+            if predicate(tweet):
+                rows.append(row)
+            row += 1
+        rows.append(self.num_series)
+
+        self._rows.extend(rows)
+        self._slices.extend([slice_index] * len(rows))
+        if len(self._rows) >= self._buffer_size:
+            self._flush()
+
+    def update(self, tweets, created_at=None):
+        """Count each of a stream of tweets.
+
+        Args:
+            tweets (iterable of dict): Tweet objects, see `add`.
+            created_at (datetime, optional): Time to count all the tweets
+                at. Defaults to the time each tweet was created.
+        """
+        for tweet in tweets:
+            self.add(tweet, created_at)
+
+    def update_from_files(
+        self, filepaths, include_retweets=True, fields=(), use_file_date_hours=False
+    ):
+        """Count the English tweets in files.
+
+        Args:
+            filepaths (iterable of str): Paths to gzip files of tweets.
+            include_retweets (bool): Whether to include retweets.
+            fields (tuple of str): Fields used by the predicates, besides
+                those of `tweet_info.TEXT_FIELDS` and "created_at".
+            use_file_date_hours (bool): Whether to count all the tweets of a
+                file at the date-hour in its filename, see
+                `file_mgmt.extract_date_hour`, rather than at the time each
+                tweet was created. Only the text needs to be decoded then.
+        """
+        fields = tweet_info.TEXT_FIELDS + tuple(fields)
+        if not use_file_date_hours:
+            fields += ("created_at",)
+        for filepath in filepaths:
+            created_at = None
+            if use_file_date_hours:
+                date_hour = file_mgmt.extract_date_hour(filepath)
+                if not date_hour:
+                    raise Exception("No date-hour in {}.".format(filepath))
+                created_at = file_mgmt.datetime_from_date_hour(date_hour)
+            tweets = common_pipelines.get_tweets_pipeline(
+                filepath, include_retweets=include_retweets, fields=fields
+            )
+            self.update(tweets, created_at)
+
+    def _flush(self):
+        """Add the buffered counts to the matrix, growing it to fit them."""
+        if not self._rows:
+            return
+        rows = np.array(self._rows, dtype=np.intp)
+        slices = np.array(self._slices, dtype=np.int64)
+        self._rows = []
+        self._slices = []
+
+        first_slice = slices.min()
+        last_slice = slices.max()
+        if self._first_slice is None:
+            self._first_slice = first_slice
+        num_before = max(0, self._first_slice - first_slice)
+        num_after = max(0, last_slice - (self._first_slice + self._counts.shape[1] - 1))
+        if num_before or num_after:
+            self._counts = np.pad(self._counts, ((0, 0), (num_before, num_after)))
+            self._first_slice -= num_before
+        np.add.at(self._counts, (rows, slices - self._first_slice), 1)
+
+    def time_slices(self):
+        """Return the start of each slice of time, from the first to the last.
+
+        Returns:
+            list of datetime: The start of the time slice of each column, in
+                UTC, without a timezone.
+        """
+        self._flush()
+        if self._first_slice is None:
+            return []
+        return [
+            _EPOCH + int(self._first_slice + i) * self._slice_length
+            for i in range(self._counts.shape[1])
+        ]
+
+    def num_tweets(self):
+        """Return the number of tweets counted in each slice of time.
+
+        Returns:
+            1d array of int64: The number of tweets, for each time slice.
+        """
+        self._flush()
+        return self._counts[-1].copy()
+
+    def to_array(self, normalize=False):
+        """Return the counts of each series in each slice of time.
+
+        Args:
+            normalize (bool): Whether to divide the counts by the number of
+                tweets in each time slice. Empty slices are left at zero.
+
+        Returns:
+            2d array: Array with dimensions num_series x num_time_slices,
+                as expected by `plotting.plot_data`.
+        """
+        self._flush()
+        counts = self._counts[:-1].copy()
+        if not normalize:
+            return counts
+        num_tweets = self._counts[-1]
+        return np.divide(
+            counts,
+            num_tweets,
+            out=np.zeros(counts.shape),
+            where=num_tweets > 0,
+        )
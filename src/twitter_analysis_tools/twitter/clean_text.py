@@ -2,6 +2,26 @@
 
 import re  # For regex processing.
 
+# Twitter automatically shortens all links to https://t.co/<hash>.
+LINK_PATTERN = r"http[s]?://\S+"
+
+# Regex from https://stackoverflow.com/a/6351873
+USER_TAG_PATTERN = r"(?<=^|(?<=[^a-zA-Z0-9-_\.]))@([A-Za-z]+[A-Za-z0-9-_]+)"
+
+HASHTAG_PATTERN = r"(?<!\w)#\w+"
+
+# When combined with LINK_PATTERN, user tags and hashtags must stop before a
+# link, as in "@userhttps://t.co/FakeLink", which would otherwise be consumed
+# as part of the tag before the link can be matched.
+_NOT_LINK = r"(?!http[s]?://\S)"
+_USER_TAG_BEFORE_LINK_PATTERN = (
+    r"(?<=^|(?<=[^a-zA-Z0-9-_\.]))@((?:{0}[A-Za-z])+(?:{0}[A-Za-z0-9-_])+)"
+).format(_NOT_LINK)
+_HASHTAG_BEFORE_LINK_PATTERN = r"(?<!\w)#(?:{0}\w)+".format(_NOT_LINK)
+
+_link_regex = re.compile(LINK_PATTERN)
+_user_tag_regex = re.compile(USER_TAG_PATTERN)
+
 
 def remove_links(text):
     """Remove links/urls from text.
@@ -22,7 +42,7 @@ def remove_links(text):
         >>> remove_links(r'There was a link: https://t.co/FakeLink')
         'There was a link: '
     """
-    return re.sub(r"http[s]?://\S+", "", text)
+    return _link_regex.sub("", text)
 
 
 def remove_user_tags(text):
@@ -46,4 +66,117 @@ def remove_user_tags(text):
         >>> remove_user_tags('test text')
         'test text'
     """
-    return re.sub(r"(?<=^|(?<=[^a-zA-Z0-9-_\.]))@([A-Za-z]+[A-Za-z0-9-_]+)", "", text)
+    return _user_tag_regex.sub("", text)
+
+
+class TextCleaner:
+    """Remove several kinds of unwanted text in a single pass.
+
+    The patterns of all of the enabled rules are combined into one compiled
+    regex, so each text is only scanned once however many rules are enabled.
+    The result is the same as removing the links first and then the rest.
+    By default, links and user tags are removed, matching `remove_links`
+    followed by `remove_user_tags`.
+
+    Args:
+        links (bool): Whether to remove links, see `remove_links`.
+        user_tags (bool): Whether to remove user tags, see `remove_user_tags`.
+        hashtags (bool): Whether to remove hashtags such as #COVID19.
+        emojis (bool): Whether to remove emojis.
+        normalize_whitespace (bool): Whether to replace each run of
+            whitespace with a single space and strip leading and trailing
+            whitespace, after removing the other text.
+        extra_patterns (iterable of str): Additional regex patterns to remove.
+
+    Examples:
+        >>> clean = TextCleaner()
+        >>> clean('@user Look at this: https://t.co/FakeLink')
+        ' Look at this: '
+
+        >>> clean = TextCleaner(hashtags=True, normalize_whitespace=True)
+        >>> clean('@user Look  at this: #news https://t.co/FakeLink')
+        'Look at this:'
+
+        Emojis are matched with the table shipped with the package, see
+        `twitter_analysis_tools.text.emojis`:
+
+        >>> TextCleaner(emojis=True, normalize_whitespace=True)('Stay safe 😷👍🏽!')
+        'Stay safe !'
+
+        Clean the texts of several tweets at once:
+
+        >>> clean.clean_batch(['@user Hi', 'Hi #news'])
+        ['Hi', 'Hi']
+    """
+
+    def __init__(
+        self,
+        links=True,
+        user_tags=True,
+        hashtags=False,
+        emojis=False,
+        normalize_whitespace=False,
+        extra_patterns=(),
+    ):
+        # Each rule's pattern along with the characters its matches start
+        # with, if known.
+        rules = []
+        if links:
+            rules.append((LINK_PATTERN, "h"))
+        if user_tags:
+            pattern = _USER_TAG_BEFORE_LINK_PATTERN if links else USER_TAG_PATTERN
+            rules.append((pattern, "@"))
+        if hashtags:
+            pattern = _HASHTAG_BEFORE_LINK_PATTERN if links else HASHTAG_PATTERN
+            rules.append((pattern, "#"))
+        if emojis:
+            # Only load the emoji codes if they are needed.
+            from twitter_analysis_tools.text.emojis import get_emoji_pattern
+
+            rules.append((get_emoji_pattern().pattern, None))
+        rules.extend((pattern, None) for pattern in extra_patterns)
+
+        self._regex = None
+        if rules:
+            pattern = "|".join("(?:{})".format(pattern) for pattern, _ in rules)
+            first_chars = [chars for _, chars in rules]
+            if None not in first_chars:
+                # Lets the regex engine skip quickly to possible matches.
+                pattern = "(?=[{}])(?:{})".format("".join(first_chars), pattern)
+            self._regex = re.compile(pattern)
+        self._normalize_whitespace = normalize_whitespace
+
+    def __call__(self, text):
+        """Clean a single text.
+
+        Args:
+            text (str): Text to clean.
+
+        Returns:
+            str: The cleaned text.
+        """
+        if self._regex is not None:
+            text = self._regex.sub("", text)
+        if self._normalize_whitespace:
+            text = " ".join(text.split())
+        return text
+
+    def clean_batch(self, texts):
+        """Clean several texts.
+
+        Args:
+            texts (iterable of str): Texts to clean.
+
+        Returns:
+            list of str: The cleaned texts.
+        """
+        if self._regex is not None:
+            sub = self._regex.sub
+            texts = [sub("", text) for text in texts]
+        if self._normalize_whitespace:
+            texts = [" ".join(text.split()) for text in texts]
+        return list(texts)
+
+
+# Removes links and user tags from tweet text.
+clean_tweet_text = TextCleaner()
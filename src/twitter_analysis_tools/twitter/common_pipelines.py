@@ -1,61 +1,321 @@
 from functools import partial
-
-from scipy.sparse import csr_matrix
+from itertools import groupby
+from operator import itemgetter, methodcaller
 
 # Local imports.
-from twitter_analysis_tools.twitter import clean_text, get_tweets, tweet_info
-from twitter_analysis_tools.utils import Pipeline, negate
+from twitter_analysis_tools.text import terms, tokenize
+from twitter_analysis_tools.twitter import (
+    clean_text,
+    get_tweets,
+    tweet_cache,
+    tweet_info,
+)
+from twitter_analysis_tools.utils import Pipeline, chunked, negate
 
 
-def get_bag_of_words_per_file(filepaths, include_retweets, vectorizer):
+def get_bag_of_words_per_file(
+    filepaths,
+    include_retweets,
+    vectorizer=None,
+    use_cache=False,
+    batch_size=10000,
+    term_dictionary=None,
+):
     """Form an iterator of bag_of_words for each file in filepaths.
 
     Args:
         filepaths (list(str)): Filepaths from which to load tweets.
         include_retweets: Whether to include retweets.
         vectorizer (CountVectorizer): Vectorizer for transform to bag of words.
+            Give either vectorizer or term_dictionary.
+        use_cache (bool): Whether to read the tweets from columnar caches,
+            see `get_tweet_text_pipeline`.
+        batch_size (int): Number of tweets transformed at a time, bounding
+            the memory used for their text.
+        term_dictionary (TermDictionary): Dictionary of the terms, to count
+            the lowercased tokens of the tweets by id with `terms.bag_of_ids`
+            rather than with a vectorizer. Tokens which aren't in the
+            dictionary are skipped.
 
     Returns:
         Pipeline: iterable with sparse matrices with bag of words
             representations of the tweets for each file in filepaths.
     """
-    # TODO: Allow for splitting up by more general ways than just file.
+    transform = _get_transform(vectorizer, term_dictionary, batch_size)
+    # See get_bag_of_words_per_slice for splitting up by time or tweet count.
     bag_of_words_pipeline = Pipeline(filepaths, precompute_len=True)
-    bag_of_words_pipeline.add_map(get_tweets.TweetsFromFiles)
     bag_of_words_pipeline.add_map(
-        partial(get_tweets.text_from_tweets, include_retweets=include_retweets)
+        partial(
+            get_tweet_text_pipeline,
+            include_retweets=include_retweets,
+            use_cache=use_cache,
+        )
     )
-    # Transform text to bag of words using vectorizer.
-    bag_of_words_pipeline.add_map(vectorizer.transform)
+    # Transform text to bag of words, a batch at a time.
+    bag_of_words_pipeline.add_map(transform)
     # Take transpose of each bag of words matrix to match input required by
     # onmf.py.
-    bag_of_words_pipeline.add_map(csr_matrix.transpose)
+    bag_of_words_pipeline.add_map(methodcaller("transpose"))
     return bag_of_words_pipeline
 
 
-def get_tweet_text_pipeline(*filepaths, include_retweets):
-    """Form an iterator of bag_of_words for each file in filepaths.
+def transform_in_batches(vectorizer, batch_size, tweet_text):
+    """Transform a stream of tweet text to bag of words, a batch at a time.
+
+    Args:
+        vectorizer (CountVectorizer): Vectorizer for transform to bag of words.
+        batch_size (int): Number of tweets transformed at a time.
+        tweet_text (iterable of str): Text of each tweet.
+
+    Returns:
+        csr_matrix: Bag of words with a row for each tweet.
+    """
+    # Imported here as importing scipy is slow.
+    from scipy.sparse import vstack
+
+    batches = [vectorizer.transform(batch) for batch in chunked(tweet_text, batch_size)]
+    if not batches:
+        # Keep the number of columns when there are no tweets.
+        return vectorizer.transform([])
+    return vstack(batches, format="csr")
+
+
+def transform_ids_in_batches(term_dictionary, batch_size, tweet_text):
+    """Count the terms of a stream of tweet text by id, a batch at a time.
+
+    The tweets are tokenized like the vocabularies of
+    `twitter_analysis_tools.twitter.vocabulary`, in lowercase, and only tokens
+    already in term_dictionary are counted, so the columns stay the same
+    across calls.
+
+    Args:
+        term_dictionary (TermDictionary): Dictionary giving the column of
+            each term.
+        batch_size (int): Number of tweets transformed at a time.
+        tweet_text (iterable of str): Text of each tweet.
+
+    Returns:
+        csr_matrix: Bag of words with a row for each tweet and a column for
+            each id of term_dictionary.
+    """
+    # Imported here as importing scipy is slow.
+    from scipy.sparse import vstack
+
+    tokenizer = tokenize.get_tokenizer(preserve_case=False)
+    num_ids = len(term_dictionary)
+    batches = [
+        terms.bag_of_ids(
+            term_dictionary.encode_batch(tokenizer.tokenize_batch(batch), add=False),
+            num_ids,
+        )
+        for batch in chunked(tweet_text, batch_size)
+    ]
+    if not batches:
+        # Keep the number of columns when there are no tweets.
+        return terms.bag_of_ids([], num_ids)
+    return vstack(batches, format="csr")
+
+
+def _get_transform(vectorizer, term_dictionary, batch_size):
+    """Return a function transforming tweet text to bag of words."""
+    if (vectorizer is None) == (term_dictionary is None):
+        raise Exception("Give either a vectorizer or a term dictionary.")
+    if vectorizer is not None:
+        return partial(transform_in_batches, vectorizer, batch_size)
+    return partial(transform_ids_in_batches, term_dictionary, batch_size)
+
+
+def get_bag_of_words_per_slice(
+    filepaths,
+    include_retweets,
+    vectorizer=None,
+    slice_by="day",
+    batch_size=10000,
+    return_keys=False,
+    term_dictionary=None,
+):
+    """Form an iterator of bag_of_words for each slice of the tweets in filepaths.
+
+    The tweets of all the files are split into slices of consecutive tweets
+    created in the same hour, day or week, or into slices of a fixed number
+    of tweets. For time slices, the tweets must be in the order of their
+    slices, as they are in files of consecutive hours given in order, and an
+    exception is raised at the first tweet from an earlier slice than the
+    one before it. Each slice is transformed a batch at a time, so only one
+    batch of text is held in memory, however long the slice.
 
     Args:
         filepaths (list(str)): Filepaths from which to load tweets.
         include_retweets: Whether to include retweets.
+        vectorizer (CountVectorizer): Vectorizer for transform to bag of words.
+            Give either vectorizer or term_dictionary.
+        slice_by (str or int): One of `tweet_info.TIME_SLICES`, or a number
+            of tweets per slice.
+        batch_size (int): Number of tweets transformed at a time.
+        return_keys (bool): Whether to also return the key of each slice:
+            the start of its time slice, or its index for slices of a number
+            of tweets.
+        term_dictionary (TermDictionary): Dictionary of the terms, see
+            `get_bag_of_words_per_file`.
 
     Returns:
-        Pipeline: iterable with text from English tweets.
+        Pipeline: iterable with sparse matrices with bag of words
+            representations of the tweets for each slice, transposed like
+            those of `get_bag_of_words_per_file`, or (key, matrix) pairs.
+    """
+    transform = _get_transform(vectorizer, term_dictionary, batch_size)
+    if slice_by in tweet_info.TIME_SLICES:
+        # Keep the creation time of each tweet with its text.
+        tweet_text = get_tweets_pipeline(
+            *filepaths,
+            include_retweets=include_retweets,
+            fields=tweet_info.TEXT_FIELDS + ("created_at",),
+        )
+        tweet_text.add_map(_get_created_at_and_text)
+    elif isinstance(slice_by, int) and slice_by > 0:
+        tweet_text = get_tweet_text_pipeline(
+            *filepaths, include_retweets=include_retweets
+        )
+    else:
+        raise Exception(
+            "Slices must be one of {} or a positive number of tweets.".format(
+                ", ".join(tweet_info.TIME_SLICES)
+            )
+        )
+
+    bag_of_words_pipeline = Pipeline(_Slices(tweet_text, slice_by))
+    bag_of_words_pipeline.add_map(
+        partial(_get_bag_of_words_for_slice, transform, return_keys)
+    )
+    return bag_of_words_pipeline
+
+
+class _Slices:
+    """Iterate over the (key, text of each tweet) of each slice of a stream.
+
+    Args:
+        tweet_text (iterable): (created_at, text) of each tweet for time
+            slices, otherwise text.
+        slice_by (str or int): See `get_bag_of_words_per_slice`.
     """
-    tweet_text_pipeline = get_tweets.TweetsFromFiles(*filepaths)
+
+    def __init__(self, tweet_text, slice_by):
+        self._tweet_text = tweet_text
+        self._slice_by = slice_by
+
+    def __iter__(self):
+        if self._slice_by in tweet_info.TIME_SLICES:
+            keyed_text = (
+                (tweet_info.time_slice_start(created_at, self._slice_by), text)
+                for created_at, text in self._tweet_text
+            )
+            keyed_text = _check_keys_in_order(keyed_text)
+        else:
+            keyed_text = (
+                (i // self._slice_by, text) for i, text in enumerate(self._tweet_text)
+            )
+        # Each slice is read lazily, before moving on to the next one.
+        for key, group in groupby(keyed_text, key=itemgetter(0)):
+            yield key, map(itemgetter(1), group)
+
+
+def _check_keys_in_order(keyed_text):
+    """Yield (key, text) pairs, raising an exception if a key decreases.
+
+    groupby only groups consecutive tweets, so a tweet out of order would
+    otherwise silently split its slice in two.
+    """
+    previous_key = None
+    for key, text in keyed_text:
+        if previous_key is not None and key < previous_key:
+            raise Exception(
+                "Tweets must be in the order of their time slices, but a tweet "
+                "from the slice starting at {} follows one from {}.".format(
+                    key, previous_key
+                )
+            )
+        previous_key = key
+        yield key, text
+
+
+def _get_created_at_and_text(tweet):
+    """Return the creation time and the cleaned text of tweet."""
+    return (
+        tweet_info.get_created_at(tweet),
+        clean_text.clean_tweet_text(tweet_info.get_full_text(tweet)),
+    )
+
+
+def _get_bag_of_words_for_slice(transform, return_keys, key_and_text):
+    """Transform the text of a slice to a transposed bag of words."""
+    key, tweet_text = key_and_text
+    # Take transpose of the bag of words matrix to match input required by
+    # onmf.py.
+    bag_of_words = transform(tweet_text).transpose()
+    if return_keys:
+        return key, bag_of_words
+    return bag_of_words
+
+
+def get_tweets_pipeline(*filepaths, include_retweets, fields=tweet_info.TEXT_FIELDS):
+    """Form an iterator of the English tweets in filepaths.
+
+    Args:
+        filepaths (list(str)): Filepaths from which to load tweets.
+        include_retweets: Whether to include retweets.
+        fields (tuple of str): Fields of the tweets to decode, which must
+            include `tweet_info.TEXT_FIELDS`.
+
+    Returns:
+        Pipeline: iterable with English tweets, as dicts with fields.
+    """
+    # Only decode the fields needed below, skipping most non-English tweets
+    # without decoding them.
+    tweets_pipeline = get_tweets.TweetsFromFiles(
+        *filepaths,
+        fields=fields,
+        present_fields=tweet_info.PRESENCE_FIELDS,
+        line_filters=[tweet_info.may_be_english],
+    )
 
     # Only keep English tweets.
-    tweet_text_pipeline.add_filter(tweet_info.is_english)
+    tweets_pipeline.add_filter(tweet_info.is_english)
 
     if not include_retweets:
         # Remove retweets.
-        tweet_text_pipeline.add_filter(negate(tweet_info.is_retweet))
+        tweets_pipeline.add_filter(negate(tweet_info.is_retweet))
+
+    return tweets_pipeline
+
+
+def get_tweet_text_pipeline(*filepaths, include_retweets, use_cache=False):
+    """Form an iterator of bag_of_words for each file in filepaths.
+
+    Args:
+        filepaths (list(str)): Filepaths from which to load tweets.
+        include_retweets: Whether to include retweets.
+        use_cache (bool): Whether to read the tweets from the columnar cache
+            next to each file rather than the file itself, building any
+            missing caches. See `twitter_analysis_tools.twitter.tweet_cache`.
+
+    Returns:
+        Pipeline: iterable with text from English tweets.
+    """
+    if use_cache:
+        # The English tweets and retweets are selected from whole columns.
+        tweet_text_pipeline = Pipeline(
+            tweet_cache.TextFromCache(*filepaths, include_retweets=include_retweets)
+        )
+        tweet_text_pipeline.add_map(clean_text.clean_tweet_text)
+        return tweet_text_pipeline
+
+    tweet_text_pipeline = get_tweets_pipeline(
+        *filepaths, include_retweets=include_retweets
+    )
 
     # Preprocess tweets.
     # Only keep text from tweets, remove links and user tags.
     tweet_text_pipeline.add_map(tweet_info.get_full_text)
-    tweet_text_pipeline.add_map(clean_text.remove_links)
-    tweet_text_pipeline.add_map(clean_text.remove_user_tags)
+    tweet_text_pipeline.add_map(clean_text.clean_tweet_text)
 
     return tweet_text_pipeline
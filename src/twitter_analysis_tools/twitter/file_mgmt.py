@@ -1,27 +1,40 @@
 """Functions for collecting files of tweet data."""
 
+import bisect
 import datetime
-import glob
+import json
 import os
 import re  # For regex.
 
+from loguru import logger
+
+# A date-hour of the form YYYY-MM-DD-HH.
+_DATE_HOUR_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}-\d{2}")
+
+# Name of the file in which a `FileCatalog` is saved, in the data directory.
+CATALOG_FILENAME = ".file_catalog.json"
+_CATALOG_VERSION = 1
+
 
 def valid_date(date):
-    """Check whether the date has the required form of 2020-MM-DD-HH.
+    """Check whether the date has the required form of YYYY-MM-DD-HH.
 
     Note that this will still return true if the numeric entries are not valid,
     for example, '2020-45-23-32'.
+
+    Example:
+    >>> valid_date('2021-03-01-00'), valid_date('2021-03-01')
+    (True, False)
     """
     # TODO: use glob to check whether the data exists in a file, i.e. is valid.
-    date_template = re.compile(r"2020-\d{2}-\d{2}-\d{2}")
-    if date_template.fullmatch(date):
+    if _DATE_HOUR_PATTERN.fullmatch(date):
         return True
     else:
         return False
 
 
 def extract_date_hour(filename):
-    """Extract the first match of the form 2020-MM-DD-HH in the filename.
+    """Extract the first match of the form YYYY-MM-DD-HH in the filename.
 
     Examples:
     >>> extract_date_hour('coronavirus-tweet-id-2020-03-01-00.txt')
@@ -39,8 +52,7 @@ def extract_date_hour(filename):
     '2020-03-01-00'
     """
     # TODO: return match object to account for multiple dates in file.
-    date = re.compile(r"2020-\d{2}-\d{2}-\d{2}")
-    date_match = date.search(filename)
+    date_match = _DATE_HOUR_PATTERN.search(filename)
     if date_match:
         return date_match.group(0)
     return None
@@ -116,7 +128,7 @@ def in_range(low_date_hour=None, high_date_hour=None):
 
     def _in_range(filepath):
         """Indicate whether file is in the desired range."""
-        # Get the date in form 2020-MM-DD-HH from file if present, None if not.
+        # Get the date in form YYYY-MM-DD-HH from file if present, None if not.
         file_date_hour = extract_date_hour(filepath)
         if not file_date_hour:  # No date-hour in file
             return False
@@ -130,13 +142,159 @@ def in_range(low_date_hour=None, high_date_hour=None):
 
 
 def files_in_range(data_dir, data_range_low, data_range_high):
-    """Return files in indicated date-time range."""
+    """Return files in indicated date-time range.
+
+    The files are found with the `FileCatalog` of data_dir, which is saved in
+    the directory and only updated for the subdirectories which changed.
+
+    Returns:
+        list of str: Paths of the files, in order of their date-hour.
+    """
     # Check that the date range provided has the required format.
     if not valid_date(data_range_low) or not valid_date(data_range_high):
         raise Exception("Invalid date ranges provided.")
 
-    # Files from which to collect tweets.
-    files = glob.glob(os.path.join(data_dir, "2020*/*.gz"), recursive=True)
-    # Restrict files to desired range.
-    files = filter(in_range(data_range_low, data_range_high), files)
-    return files
+    return FileCatalog(data_dir).files_in_range(data_range_low, data_range_high)
+
+
+class FileCatalog:
+    """Index of the tweet files in a data directory, sorted by date-hour.
+
+    The files indexed are the gzip files in the subdirectories of data_dir,
+    such as data_dir/2020-03/coronavirus-tweet-id-2020-03-01-00.jsonl.gz,
+    whose path within data_dir contains a date-hour, see `extract_date_hour`.
+
+    The catalog is saved in data_dir and loaded when created again. Refreshing
+    it only lists the subdirectories which were modified since, as adding or
+    removing a file changes the modification time of its directory. Finding
+    the files in a range of date-hours is then a binary search.
+
+    Args:
+        data_dir (str): Directory containing the tweet data.
+        save (bool): Whether to save the catalog in data_dir when it changes.
+            Fails silently if the directory is not writable.
+
+    Example:
+        >>> catalog = FileCatalog("data")  # doctest: +SKIP
+        >>> files = catalog.files_in_range(
+        ...     "2020-03-01-00", "2020-03-31-23")  # doctest: +SKIP
+    """
+
+    def __init__(self, data_dir, save=True):
+        self.data_dir = data_dir
+        self._save = save
+        # Modification time and (date-hour, filename) of the files of each
+        # subdirectory.
+        self._dirs = self._load()
+        self.refresh()
+
+    @property
+    def path(self):
+        """Path of the saved catalog."""
+        return os.path.join(self.data_dir, CATALOG_FILENAME)
+
+    def _load(self):
+        """Return the subdirectories of the saved catalog, if it's valid."""
+        try:
+            with open(self.path) as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if catalog.get("version") != _CATALOG_VERSION:
+            return {}
+        return catalog["dirs"]
+
+    def _write(self):
+        """Save the catalog, replacing it atomically."""
+        tmp_path = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"version": _CATALOG_VERSION, "dirs": self._dirs}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as error:
+            logger.debug("Could not save file catalog of {}: {}", self.data_dir, error)
+
+    def refresh(self):
+        """Update the catalog for the subdirectories modified since it was built.
+
+        Returns:
+            bool: Whether the catalog changed.
+        """
+        try:
+            entries = [
+                entry
+                for entry in os.scandir(self.data_dir or os.curdir)
+                if entry.is_dir() and not entry.name.startswith(".")
+            ]
+        except OSError:
+            entries = []
+        changed = len(entries) != len(self._dirs)
+        dirs = {}
+        for entry in entries:
+            mtime_ns = entry.stat().st_mtime_ns
+            cached = self._dirs.get(entry.name)
+            if cached is not None and cached["mtime_ns"] == mtime_ns:
+                dirs[entry.name] = cached
+                continue
+            dirs[entry.name] = {
+                "mtime_ns": mtime_ns,
+                "files": self._scan_dir(entry.name),
+            }
+            changed = True
+        self._dirs = dirs
+        self._index()
+        if changed and self._save:
+            self._write()
+        return changed
+
+    def _scan_dir(self, dirname):
+        """Return the (date-hour, filename) of the dated gzip files of a dir."""
+        files = []
+        for entry in os.scandir(os.path.join(self.data_dir, dirname)):
+            if entry.name.startswith(".") or not entry.name.endswith(".gz"):
+                continue
+            date_hour = extract_date_hour(os.path.join(dirname, entry.name))
+            if date_hour is not None:
+                files.append([date_hour, entry.name])
+        return files
+
+    def _index(self):
+        """Sort the files of all the subdirectories by date-hour."""
+        files = sorted(
+            (date_hour, os.path.join(self.data_dir, dirname, filename))
+            for dirname, cached in self._dirs.items()
+            for date_hour, filename in cached["files"]
+        )
+        self._date_hours = [date_hour for date_hour, _ in files]
+        self._paths = [path for _, path in files]
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    @property
+    def date_hours(self):
+        """The sorted date-hours of the files, with repeats. Don't modify it."""
+        return self._date_hours
+
+    def files_in_range(self, low_date_hour=None, high_date_hour=None):
+        """Return the files with date-hours in a range, including its ends.
+
+        Args:
+            low_date_hour (str, optional): Earliest date-hour, YYYY-MM-DD-HH.
+                Defaults to the earliest file.
+            high_date_hour (str, optional): Latest date-hour. Defaults to
+                the latest file.
+
+        Returns:
+            list of str: Paths of the files, in order of their date-hour.
+        """
+        start = 0
+        stop = len(self._paths)
+        if low_date_hour:
+            start = bisect.bisect_left(self._date_hours, low_date_hour)
+        if high_date_hour:
+            stop = bisect.bisect_right(self._date_hours, high_date_hour)
+        return self._paths[start:stop]
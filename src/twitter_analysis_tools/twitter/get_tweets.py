@@ -1,5 +1,7 @@
 """Iterables for streaming tweets from files."""
 
+from functools import partial
+
 from twitter_analysis_tools.fileio import LinesFromGzipFiles
 from twitter_analysis_tools.twitter import clean_text, tweet_info
 from twitter_analysis_tools.utils import Pipeline, negate
@@ -10,19 +12,114 @@ class TweetsFromFiles(Pipeline):
 
     Args:
         filepaths (iterable of str): Paths to gzip files of tweets.
+        workers (int): Number of processes used to decompress the files and
+            parse the tweets. With more than one worker, files are read in
+            parallel.
+        ordered (bool): Whether to yield the tweets in the order of
+            `filepaths` when reading with more than one worker.
+        fields (iterable of str): If given, only these fields are kept in
+            each tweet, see `tweet_info.tweet_from_json_line`.
+        present_fields (iterable of str): Fields to mark as present, with the
+            value True, if they are in the tweet. Only used with `fields`.
+        line_filters (iterable of function): Filters to apply to the raw
+            lines of json before they are parsed, such as
+            `tweet_info.may_be_english`.
+        json_backend (str): Library used to parse the tweets, one of
+            `tweet_info.JSON_BACKENDS`. By default the one chosen with
+            `tweet_info.set_json_backend` when the pipeline is created, which
+            is also used by the worker processes.
+        use_index (bool): Whether to record the number of lines of each file
+            in a sidecar file next to it, so the length of later pipelines
+            over the file can be computed without reading it. See
+            `twitter_analysis_tools.fileio.LinesFromGzipFiles`.
 
     Yields:
         dict: Tweet object.
 
     Notes:
         See `twitter_analysis_tools.utils.Pipeline` for more details.
+
+    Example:
+        To decompress and parse the files with four processes, yielding the
+        tweets as soon as they are parsed:
+
+        >>> tweets = TweetsFromFiles("file1.gz", "file2.gz", workers=4, ordered=False)
+
+        To only decode the fields needed for `get_full_text`, `is_english`
+        and `is_retweet`:
+
+        >>> tweets = TweetsFromFiles(
+        ...     "file1.gz",
+        ...     fields=tweet_info.TEXT_FIELDS,
+        ...     present_fields=tweet_info.PRESENCE_FIELDS,
+        ... )
+
+        To avoid parsing most tweets which are not in English:
+
+        >>> tweets = TweetsFromFiles("file1.gz", line_filters=[tweet_info.may_be_english])
+        >>> tweets = tweets.add_filter(tweet_info.is_english)
     """
 
-    def __init__(self, *filepaths):
-        lines = LinesFromGzipFiles(filepaths)
-        steps = [(map, tweet_info.tweet_from_json_line)]
+    def __init__(
+        self,
+        *filepaths,
+        workers=1,
+        ordered=True,
+        fields=None,
+        present_fields=None,
+        line_filters=(),
+        json_backend=None,
+        use_index=False
+    ):
+        if json_backend is None:
+            json_backend = tweet_info.get_json_backend()
+        else:
+            tweet_info.check_json_backend(json_backend)
+        # Pass the backend along with the fields, as worker processes started
+        # with spawn don't see the one set in this process.
+        parse = partial(
+            tweet_info.tweet_from_json_line,
+            fields=None if fields is None else tuple(fields),
+            present_fields=present_fields and tuple(present_fields),
+            backend=json_backend,
+        )
+        parse_steps = [(filter, line_filter) for line_filter in line_filters]
+        parse_steps.append((map, parse))
+        if workers > 1:
+            # Parse the lines in the worker processes that read them.
+            lines = LinesFromGzipFiles(
+                filepaths,
+                workers=workers,
+                ordered=ordered,
+                steps=parse_steps,
+                use_index=use_index,
+            )
+            steps = []
+        else:
+            lines = LinesFromGzipFiles(filepaths, use_index=use_index)
+            steps = parse_steps
         super().__init__(lines, steps)
 
+    def subset(self, keep_idxs):
+        """Keep only the tweets indicated in keep_idxs from the stream.
+
+        While no tweets have been filtered out, the tweets are looked up
+        directly in the files rather than reading every tweet before them.
+        See `twitter_analysis_tools.fileio.GzipLineIndex`. Seeking only avoids
+        decompressing most of each file for files rewritten with
+        `twitter_analysis_tools.fileio.write_seekable_gzip`, e.g. by the
+        `make_seekable_gzip` console script. Other files are still
+        decompressed up to the last tweet kept, but the tweets are only
+        parsed if they are kept.
+        """
+        lines = self._stream
+        no_filters = all(applier is map for applier, _ in self._steps)
+        if no_filters and isinstance(lines, LinesFromGzipFiles) and lines.can_seek:
+            self._stream = lines.subset(keep_idxs)
+            self._len = len(self._stream)
+            return self
+        return super().subset(keep_idxs)
+
 
 def text_from_tweets(tweets, include_retweets=True):
     """Return a generator of text of tweets from the indicated range.
@@ -45,7 +142,6 @@ def text_from_tweets(tweets, include_retweets=True):
     # Preprocess tweets.
     # Only keep text from tweets, remove links and user tags.
     tweet_texts = map(tweet_info.get_full_text, tweets)
-    tweet_texts = map(clean_text.remove_links, tweet_texts)
-    tweet_texts = map(clean_text.remove_user_tags, tweet_texts)
+    tweet_texts = map(clean_text.clean_tweet_text, tweet_texts)
 
     return tweet_texts
@@ -0,0 +1,213 @@
+"""Columnar caches of the fields of tweets used by the common pipelines.
+
+Decompressing and parsing a .jsonl.gz file of tweets is by far the most
+expensive part of most pipelines, even though only a handful of fields of each
+tweet are used. A cache stores those fields as NumPy arrays in a .npz file
+next to the tweet file, so that later runs only load a few columns.
+"""
+
+import os
+import re
+
+import numpy as np
+
+# Local imports.
+from twitter_analysis_tools.twitter import get_tweets, tweet_info
+
+# Suffix replacing .jsonl.gz in the filename of a cache.
+CACHE_SUFFIX = ".columns.npz"
+
+# The fields of each tweet stored in a cache.
+CACHE_FIELDS = ("id", "created_at", "lang", "full_text", "is_retweet", "has_place")
+
+
+def cache_path(filepath):
+    """Return the path of the cache of a tweet file.
+
+    Example:
+        >>> cache_path('data/coronavirus-tweet-id-2020-03-01-00.jsonl.gz')
+        'data/coronavirus-tweet-id-2020-03-01-00.columns.npz'
+    """
+    return re.sub(r"(\.jsonl)?(\.gz)?$", CACHE_SUFFIX, filepath, count=1)
+
+
+def cache_is_valid(filepath):
+    """Check whether the tweet file has a cache built since it last changed.
+
+    Args:
+        filepath (str): Path to the .jsonl.gz file of tweets.
+
+    Returns:
+        bool: True if the cache exists and matches the tweet file.
+    """
+    try:
+        with np.load(cache_path(filepath)) as cache:
+            source = cache["source_stat"]
+        stat = os.stat(filepath)
+    except (OSError, ValueError, KeyError):
+        return False
+    return source.tolist() == [stat.st_size, stat.st_mtime_ns]
+
+
+def build_cache(filepath):
+    """Store the fields in `CACHE_FIELDS` of each tweet in a columnar cache.
+
+    Strings are stored UTF-8 encoded, with the text of all tweets concatenated
+    into a single array along with the offset of each tweet's text. Missing
+    ids are stored as -1 and other missing fields as empty strings.
+
+    Args:
+        filepath (str): Path to the .jsonl.gz file of tweets.
+
+    Returns:
+        str: Path to the cache.
+    """
+    stat = os.stat(filepath)
+    tweets = get_tweets.TweetsFromFiles(
+        filepath,
+        fields=("id", "created_at", "lang", "full_text"),
+        present_fields=tweet_info.PRESENCE_FIELDS,
+    )
+
+    ids = []
+    created_ats = []
+    langs = []
+    texts = []
+    is_retweets = []
+    has_places = []
+    for tweet in tweets:
+        ids.append(tweet.get("id", -1))
+        created_ats.append(tweet.get("created_at", "").encode())
+        langs.append(tweet.get("lang", "").encode())
+        texts.append(tweet.get("full_text", "").encode())
+        is_retweets.append(tweet_info.is_retweet(tweet))
+        has_places.append(tweet_info.has_location(tweet))
+
+    text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in texts], out=text_offsets[1:])
+
+    path = cache_path(filepath)
+    tmp_path = "{}.{}.tmp.npz".format(path, os.getpid())
+    np.savez(
+        tmp_path,
+        id=np.array(ids, dtype=np.int64),
+        created_at=np.array(created_ats, dtype=bytes),
+        lang=np.array(langs, dtype=bytes),
+        text_pool=np.frombuffer(b"".join(texts), dtype=np.uint8),
+        text_offsets=text_offsets,
+        is_retweet=np.array(is_retweets, dtype=bool),
+        has_place=np.array(has_places, dtype=bool),
+        source_stat=np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64),
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def _load_columns(filepath, columns):
+    """Load columns from the cache of a tweet file, building it if needed."""
+    if not cache_is_valid(filepath):
+        build_cache(filepath)
+    with np.load(cache_path(filepath)) as cache:
+        return {column: cache[column] for column in columns}
+
+
+def _decode_texts(text_pool, text_offsets, idxs):
+    """Yield the texts at idxs from the concatenated UTF-8 text pool."""
+    for i in idxs:
+        yield text_pool[text_offsets[i] : text_offsets[i + 1]].tobytes().decode()
+
+
+class TweetsFromCache:
+    """Iterate over tweets from the caches of the given .jsonl.gz files.
+
+    Each tweet is a dict with the fields "id", "created_at", "lang" and
+    "full_text", omitting fields which were missing from the original tweet.
+    Retweets and tweets with location data are marked with the value True for
+    "retweeted_status" and "place", so that `tweet_info.is_retweet` and
+    `tweet_info.has_location` can be used on them. Missing caches are built.
+
+    Args:
+        filepaths (iterable of str): Paths to gzip files of tweets.
+
+    Yields:
+        dict: Tweet object with the cached fields.
+
+    Example:
+        >>> from twitter_analysis_tools.utils import Pipeline
+        >>> tweets = Pipeline(TweetsFromCache("file1.jsonl.gz", "file2.jsonl.gz"))
+        >>> tweets = tweets.add_filter(tweet_info.is_english)
+    """
+
+    def __init__(self, *filepaths):
+        self._filepaths = filepaths
+
+    def __iter__(self):
+        for filepath in self._filepaths:
+            columns = _load_columns(
+                filepath,
+                ("id", "created_at", "lang", "text_pool", "text_offsets")
+                + ("is_retweet", "has_place"),
+            )
+            texts = _decode_texts(
+                columns["text_pool"],
+                columns["text_offsets"],
+                range(len(columns["id"])),
+            )
+            for i, text in enumerate(texts):
+                tweet = {}
+                if columns["id"][i] != -1:
+                    tweet["id"] = int(columns["id"][i])
+                for field in ("created_at", "lang"):
+                    if columns[field][i]:
+                        tweet[field] = columns[field][i].decode()
+                tweet["full_text"] = text
+                if columns["is_retweet"][i]:
+                    tweet["retweeted_status"] = True
+                if columns["has_place"][i]:
+                    tweet["place"] = True
+                yield tweet
+
+    def __len__(self):
+        return sum(
+            len(_load_columns(filepath, ["id"])["id"]) for filepath in self._filepaths
+        )
+
+
+class TextFromCache:
+    """Iterate over the text of English tweets from the caches of files.
+
+    Selecting the tweets is done on whole columns at once, so only the text of
+    the selected tweets is decoded. Missing caches are built.
+
+    Args:
+        filepaths (iterable of str): Paths to gzip files of tweets.
+        include_retweets (bool): Whether to include retweets.
+
+    Yields:
+        str: The full text of each English tweet.
+    """
+
+    def __init__(self, *filepaths, include_retweets=True):
+        self._filepaths = filepaths
+        self._include_retweets = include_retweets
+
+    def _keep_idxs(self, columns):
+        keep = columns["lang"] == b"en"
+        if not self._include_retweets:
+            keep &= ~columns["is_retweet"]
+        return np.flatnonzero(keep)
+
+    def __iter__(self):
+        for filepath in self._filepaths:
+            columns = _load_columns(
+                filepath, ("lang", "is_retweet", "text_pool", "text_offsets")
+            )
+            yield from _decode_texts(
+                columns["text_pool"], columns["text_offsets"], self._keep_idxs(columns)
+            )
+
+    def __len__(self):
+        return sum(
+            len(self._keep_idxs(_load_columns(filepath, ("lang", "is_retweet"))))
+            for filepath in self._filepaths
+        )
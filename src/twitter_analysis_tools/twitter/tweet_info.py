@@ -1,22 +1,190 @@
 """Functions for checking properties of tweets."""
 
 import json
+import re
+from datetime import datetime, timedelta
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def tweet_from_json_line(line):
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# Decoders available for parsing tweets, in order of preference.
+JSON_BACKENDS = tuple(
+    name
+    for name, module in [("orjson", orjson), ("simdjson", simdjson), ("json", json)]
+    if module is not None
+)
+
+# The fields read by `get_full_text`, `is_english`, `is_retweet` and
+# `has_location`. The last two only check whether the field is present.
+TEXT_FIELDS = ("full_text", "lang")
+PRESENCE_FIELDS = ("retweeted_status", "place")
+
+# Format of the created_at field, e.g. "Wed Oct 10 20:19:24 +0000 2018".
+CREATED_AT_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+# Lengths of time which tweets can be grouped by, see `time_slice_start`.
+TIME_SLICES = ("hour", "day", "week")
+
+# The lang field of an English tweet, or of a tweet nested in it.
+_ENGLISH_LANG_PATTERN = re.compile(r'"lang"\s*:\s*"en"')
+_ENGLISH_LANG_BYTES_PATTERN = re.compile(rb'"lang"\s*:\s*"en"')
+
+_json_backend = JSON_BACKENDS[0]
+_simdjson_parser = None
+
+
+def set_json_backend(name):
+    """Choose the library used to decode tweets in `tweet_from_json_line`.
+
+    By default the fastest installed library is used, preferring orjson,
+    then simdjson and falling back on the standard library json module.
+    This only sets the default of this process. Worker processes started with
+    spawn don't see it, so pass the backend to `TweetsFromFiles` (or to
+    `tweet_from_json_line` in steps run by workers) instead.
+
+    Args:
+        name (str): One of `JSON_BACKENDS`.
+
+    Example:
+        >>> set_json_backend("json")
+        >>> tweet_from_json_line('{"full_text": "..."}')
+        {'full_text': '...'}
+        >>> set_json_backend(JSON_BACKENDS[0])
+    """
+    global _json_backend
+    check_json_backend(name)
+    _json_backend = name
+
+
+def get_json_backend():
+    """Return the name of the library used by default to decode tweets."""
+    return _json_backend
+
+
+def check_json_backend(name):
+    """Raise an exception if name is not one of `JSON_BACKENDS`."""
+    if name not in JSON_BACKENDS:
+        raise Exception(
+            "JSON backend {} is not one of {}.".format(name, ", ".join(JSON_BACKENDS))
+        )
+
+
+def _get_simdjson_parser():
+    """Return this process's simdjson parser, creating it on first use."""
+    global _simdjson_parser
+    if _simdjson_parser is None:
+        _simdjson_parser = simdjson.Parser()
+    return _simdjson_parser
+
+
+def _from_simdjson(value):
+    """Convert a value from a simdjson document into Python objects."""
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    if isinstance(value, simdjson.Array):
+        return value.as_list()
+    return value
+
+
+def tweet_from_json_line(line, fields=None, present_fields=None, backend=None):
     r"""Extract a tweet dict from a line of json.
 
     Args:
-        line (str): A json representation of a tweet.
+        line (str or bytes): A json representation of a tweet.
+        fields (iterable of str): If given, only these fields are kept in the
+            tweet. With simdjson, the other fields are never converted into
+            Python objects.
+        present_fields (iterable of str): Fields to mark as present, with the
+            value True, if they are in the tweet. Only used along with
+            `fields`, for checks such as `is_retweet` which only need to know
+            whether the field exists.
+        backend (str): One of `JSON_BACKENDS`, by default the one chosen
+            with `set_json_backend`.
 
     Returns:
         dict: The tweet represented by the json.
 
     >>> tweet_from_json_line('{"full_text": "..."}\n')
     {'full_text': '...'}
+
+    To only keep the fields needed to get English text from original tweets:
+
+    >>> line = '{"full_text": "...", "lang": "en", "retweeted_status": {}}'
+    >>> tweet_from_json_line(line, TEXT_FIELDS, PRESENCE_FIELDS)
+    {'full_text': '...', 'lang': 'en', 'retweeted_status': True}
     """
     # TODO: Verify that tweet has 'full_text' at a minimum.
-    return json.loads(line)
+    if backend is None:
+        backend = _json_backend
+    if fields is not None and backend == "simdjson":
+        document = _get_simdjson_parser().parse(line)
+        tweet = {
+            field: _from_simdjson(document[field])
+            for field in fields
+            if field in document
+        }
+        if present_fields is not None:
+            tweet.update((field, True) for field in present_fields if field in document)
+        return tweet
+
+    if backend == "orjson":
+        try:
+            tweet = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # Fall back on the more lenient standard library, e.g. for NaN.
+            tweet = json.loads(line)
+    elif backend == "simdjson":
+        tweet = _from_simdjson(_get_simdjson_parser().parse(line))
+    else:
+        tweet = json.loads(line)
+
+    if fields is not None:
+        projected = {field: tweet[field] for field in fields if field in tweet}
+        if present_fields is not None:
+            projected.update(
+                (field, True) for field in present_fields if field in tweet
+            )
+        return projected
+    return tweet
+
+
+def may_be_english(line):
+    """Check whether a line of json could be an English tweet, without parsing it.
+
+    Lines without "lang": "en" anywhere in them are rejected. The remaining
+    lines may still not be English tweets, for example a Spanish tweet quoting
+    an English one, so parse them and check them with `is_english` as well.
+
+    Args:
+        line (str or bytes): A json representation of a tweet.
+
+    Returns:
+        bool: False if the tweet is certainly not in English, True otherwise.
+
+    Examples:
+        >>> may_be_english(b'{"full_text": "...", "lang": "en"}')
+        True
+
+        >>> may_be_english(b'{"full_text": "...", "lang": "es"}')
+        False
+
+        To skip parsing most non-English tweets in a stream of lines:
+
+        >>> lines = [b'{"lang": "en"}', b'{"lang": "es"}']
+        >>> tweets = map(tweet_from_json_line, filter(may_be_english, lines))
+        >>> list(filter(is_english, tweets))
+        [{'lang': 'en'}]
+    """
+    if isinstance(line, bytes):
+        return _ENGLISH_LANG_BYTES_PATTERN.search(line) is not None
+    return _ENGLISH_LANG_PATTERN.search(line) is not None
 
 
 def get_full_text(tweet):
@@ -38,6 +206,50 @@ def get_full_text(tweet):
     return tweet["full_text"]
 
 
+def get_created_at(tweet):
+    """Return the time a tweet was created.
+
+    Args:
+        tweet (dict): Tweet object with tweet["created_at"] intact.
+
+    Returns:
+        datetime: Time the tweet was created, with its timezone (UTC).
+
+    Example:
+        >>> tweet = {"created_at": "Wed Oct 10 20:19:24 +0000 2018"}
+        >>> get_created_at(tweet).isoformat()
+        '2018-10-10T20:19:24+00:00'
+    """
+    return datetime.strptime(tweet["created_at"], CREATED_AT_FORMAT)
+
+
+def time_slice_start(created_at, slice_by):
+    """Return the start of the hour, day or week containing a time.
+
+    Args:
+        created_at (datetime): Time, such as the creation time of a tweet.
+        slice_by (str): One of TIME_SLICES. Weeks start on Monday.
+
+    Returns:
+        datetime: The start of the slice of time containing created_at.
+
+    Example:
+        >>> created_at = datetime(2018, 10, 10, 20, 19, 24)
+        >>> [str(time_slice_start(created_at, slice_by)) for slice_by in TIME_SLICES]
+        ['2018-10-10 20:00:00', '2018-10-10 00:00:00', '2018-10-08 00:00:00']
+    """
+    if slice_by == "hour":
+        return created_at.replace(minute=0, second=0, microsecond=0)
+    day = created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    if slice_by == "day":
+        return day
+    elif slice_by == "week":
+        return day - timedelta(days=day.weekday())
+    raise Exception(
+        "Time slice {} is not one of {}.".format(slice_by, ", ".join(TIME_SLICES))
+    )
+
+
 def is_english(tweet):
     """Check if tweet is in English.
 
@@ -1,16 +1,15 @@
-import glob
 import itertools
 import os
-import pickle  # For saving the vocabulary.
 import re  # For regex.
+import tempfile
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from functools import partial
 
-from nltk.tokenize import TweetTokenizer
-
 # Local imports.
-from twitter_analysis_tools.text import ngrams, stopwords
-from twitter_analysis_tools.twitter import common_pipelines, file_mgmt
+from twitter_analysis_tools import utils
+from twitter_analysis_tools.text import ngrams, stopwords, terms, tokenize
+from twitter_analysis_tools.twitter import common_pipelines, file_mgmt, vocabulary_file
 
 
 def get_vocab_file_substring(include_retweets, max_ngram_len):
@@ -32,21 +31,260 @@ def get_vocab_file_substring(include_retweets, max_ngram_len):
     )
 
 
+# The filename of a saved vocabulary, with the substring from
+# `get_vocab_file_substring` and the date-hour of the tweet file.
+_VOCAB_FILENAME_PATTERN = re.compile(
+    r"(vocab-retweets-(?:True|False)-ngrams-1-to-\d+)-(\d{4}-\d{2}-\d{2}-\d{2})"
+    r"(?:\.vocab|\.pickle)$"
+)
+
+
+# The name of a directory of tweet files of a month.
+_YEAR_MONTH_PATTERN = re.compile(r"\d{4}-\d{2}")
+
+
+def _scandir(dirpath):
+    """Return the entries of a directory, or none if it can't be listed."""
+    try:
+        return list(os.scandir(dirpath or os.curdir))
+    except OSError:
+        return []
+
+
+class VocabularyIndex:
+    """Index of the vocabularies saved under a directory.
+
+    The index is built by listing the directory and its year-month
+    subdirectories, such as data_dir/2020-03, where the vocabularies of the
+    tweet files are saved, after which looking up the vocabularies saved for
+    a date-hour is a dict lookup. Other subdirectories are not scanned.
+    Vocabularies saved later can be added to the index with `add`.
+
+    Args:
+        data_dir (str): Directory containing the saved vocabularies.
+
+    Example:
+        >>> import tempfile
+        >>> data_dir = tempfile.mkdtemp()
+        >>> index = VocabularyIndex(data_dir)
+        >>> substring = get_vocab_file_substring(True, 2)
+        >>> filename = "coronavirus-tweet-{}-2020-03-01-00.vocab".format(substring)
+        >>> index.add(os.path.join(data_dir, "2020-03", filename))
+        True
+        >>> len(index.paths(substring, "2020-03-01-00"))
+        1
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the index from the files in the directory."""
+        self._paths = {}
+        for entry in _scandir(self.data_dir):
+            path = os.path.join(self.data_dir, entry.name)
+            if not entry.is_dir():
+                self.add(path)
+            elif _YEAR_MONTH_PATTERN.fullmatch(entry.name):
+                for month_entry in _scandir(path):
+                    self.add(os.path.join(path, month_entry.name))
+
+    def add(self, path):
+        """Add a saved vocabulary to the index.
+
+        Args:
+            path (str): Path to the saved vocabulary.
+
+        Returns:
+            bool: Whether the filename is that of a saved vocabulary.
+        """
+        match = _VOCAB_FILENAME_PATTERN.search(os.path.basename(path))
+        if not match:
+            return False
+        paths = self._paths.setdefault(match.groups(), [])
+        if path not in paths:
+            paths.append(path)
+            # Vocabulary files come before vocabularies pickled by older
+            # versions.
+            paths.sort(key=lambda p: not p.endswith(vocabulary_file.VOCAB_SUFFIX))
+        return True
+
+    def paths(self, vocab_file_substring, date_hour):
+        """Return the paths of the vocabularies saved for a date-hour.
+
+        Args:
+            vocab_file_substring (str): Parameters of the vocabulary, see
+                `get_vocab_file_substring`.
+            date_hour (str): Date-hour of the tweet file.
+
+        Returns:
+            list of str: Paths to the saved vocabularies.
+        """
+        return list(self._paths.get((vocab_file_substring, date_hour), ()))
+
+    def __len__(self):
+        return sum(len(paths) for paths in self._paths.values())
+
+
+def merge_term_counts(term_counts, min_count=1):
+    """Merge the term counts of several vocabularies.
+
+    The counts are merged pairwise, always merging the smaller Counter into
+    the larger. Terms with a total count below min_count are dropped in the
+    final merge, since pruning earlier could drop terms which are frequent
+    overall. The given Counters may be modified.
+
+    Args:
+        term_counts (iterable of Counter): The counts to merge.
+        min_count (int): Smallest total count of the terms to keep.
+
+    Returns:
+        Counter: The total count of each term.
+
+    Example:
+        >>> merge_term_counts([Counter(a=2, b=1), Counter(a=1), Counter(b=1, c=1)],
+        ...                   min_count=2)
+        Counter({'a': 3, 'b': 2})
+    """
+    term_counts = list(term_counts)
+    if not term_counts:
+        return Counter()
+    while len(term_counts) > 1:
+        merged = []
+        for first, second in zip(term_counts[::2], term_counts[1::2]):
+            if len(first) < len(second):
+                first, second = second, first
+            first.update(second)
+            merged.append(first)
+        if len(term_counts) % 2:
+            merged.append(term_counts[-1])
+        term_counts = merged
+    if min_count > 1:
+        return Counter(
+            {
+                term: count
+                for term, count in term_counts[0].items()
+                if count >= min_count
+            }
+        )
+    return term_counts[0]
+
+
+def _build_partial_vocabulary(vocabulary, filepaths, save_file_vocabs, tmp_dir):
+    """Build the vocabularies of several files and merge them into a file.
+
+    Files whose vocabulary was saved in a vocabulary file aren't loaded, so
+    that they can be merged on disk with `vocabulary_file.merge_vocabulary_files`.
+    The other files are built, or loaded if their vocabulary was pickled by
+    an older version, and merged into a vocabulary file in tmp_dir. Its
+    document counts and number of tweets are left out if any of the pickled
+    vocabularies were saved without them.
+
+    Returns:
+        (list of str, list of str): The paths of the vocabulary files to
+            merge, and those of the vocabularies saved.
+    """
+    partial_vocab = dict(
+        vocabulary._params(),
+        term_counts=Counter(),
+        doc_counts=Counter(),
+        num_docs=0,
+        date_hours=[],
+    )
+    vocab_paths = []
+    saved_paths = []
+    for filepath in filepaths:
+        if vocabulary.vocab_exists(filepath):
+            path = vocabulary._saved_vocab_paths(filepath)[0]
+            if vocabulary_file.is_vocabulary_file(path):
+                vocab_paths.append(path)
+                continue
+            vocab_dict = vocabulary_file.load_vocabulary(path)
+        else:
+            vocab_dict = vocabulary.build_vocabulary_for_file(
+                filepath, save_vocab=save_file_vocabs
+            )
+            if save_file_vocabs:
+                saved_paths.append(vocabulary.vocab_filepath(filepath))
+        partial_vocab["term_counts"].update(vocab_dict["term_counts"])
+        for key in ("doc_counts", "num_docs"):
+            if key not in vocab_dict or partial_vocab.get(key) is None:
+                partial_vocab[key] = None
+            else:
+                partial_vocab[key] += vocab_dict[key]
+        partial_vocab["date_hours"].extend(vocab_dict.get("date_hours", []))
+    for key in ("doc_counts", "num_docs"):
+        if partial_vocab[key] is None:
+            del partial_vocab[key]
+
+    fd, partial_path = tempfile.mkstemp(
+        suffix=vocabulary_file.VOCAB_SUFFIX, dir=tmp_dir
+    )
+    os.close(fd)
+    vocabulary_file.save_vocabulary(partial_path, partial_vocab)
+    return vocab_paths + [partial_path], saved_paths
+
+
 class Vocabulary:
     """Class corresponding to a vocabulary with given parameters."""
 
-    def __init__(self, data_dir="", include_retweets=True, max_ngram_len=2):
-        """Store parameters for vocabulary instance."""
+    def __init__(
+        self,
+        data_dir="",
+        include_retweets=True,
+        max_ngram_len=2,
+        stopword_filter=None,
+        max_terms=None,
+        epsilon=None,
+        delta=None,
+        sketch_nbytes=None,
+    ):
+        """Store parameters for vocabulary instance.
+
+        Args:
+            data_dir (str): Directory containing the tweet data.
+            include_retweets (bool): Whether retweets should be included.
+            max_ngram_len (int): The max length of ngrams to include.
+            stopword_filter (StopwordFilter): Removes stopwords from the
+                tokens of each tweet. Defaults to removing the default
+                stopwords, see `twitter_analysis_tools.text.stopwords`.
+            max_terms (int, optional): If given, only the max_terms most
+                frequent terms are kept, counted approximately in bounded
+                memory. Their counts may be slightly too high, see
+                `twitter_analysis_tools.text.counting.HeavyHitters`. Ngrams
+                longer than `ngrams.MAX_PACKED_NGRAM_LEN` are counted exactly
+                instead, without bounding memory.
+            epsilon (float, optional): With max_terms, the error bound of the
+                approximate counts, see `ngrams.NgramCounter`.
+            delta (float, optional): With max_terms, the probability of a
+                count exceeding the error bound, see `ngrams.NgramCounter`.
+            sketch_nbytes (int, optional): With max_terms, the memory budget
+                for approximate counting, instead of an error bound, see
+                `ngrams.NgramCounter`.
+        """
         self.data_dir = data_dir
         self.include_retweets = include_retweets
         self.max_ngram_len = max_ngram_len
+        if stopword_filter is None:
+            stopword_filter = stopwords.StopwordFilter()
+        self.stopword_filter = stopword_filter
+        self.max_terms = max_terms
+        self.epsilon = epsilon
+        self.delta = delta
+        self.sketch_nbytes = sketch_nbytes
         self.vocab_file_substring = get_vocab_file_substring(
             include_retweets, max_ngram_len
         )
+        self._vocab_index = None
 
     def build_vocabulary_for_file(self, filepath, save_vocab=False):
         """Get the vocabulary for each tweet file in filepaths.
 
+        Besides the count of each term, the vocabulary records the number
+        of tweets each term appears in ("doc_counts"), the number of tweets
+        ("num_docs") and the date-hour of the file ("date_hours").
+
         Args:
             filepath (str): The file containing the tweet data.
             include_retweets (bool): Whether retweets should be included.
@@ -56,65 +294,336 @@ class Vocabulary:
         # Parameters to save with vocabulary.
         vocab_dict = {
             "include_retweets": self.include_retweets,
-            "stopwords": stopwords.stopwords,
+            "stopwords": self.stopword_filter.stopwords,
             "max_ngram_len": self.max_ngram_len,
+            "max_terms": self.max_terms,
         }
+        date_hour = file_mgmt.extract_date_hour(filepath)
+        vocab_dict["date_hours"] = [date_hour] if date_hour else []
 
         # Get text from English tweets.
         tweet_terms = common_pipelines.get_tweet_text_pipeline(
-            filepath, self.include_retweets
+            filepath, include_retweets=self.include_retweets
         )
 
         # Tokenize tweets.
-        tokenizer = TweetTokenizer(preserve_case=False)
-        tweet_terms.add_map(tokenizer.tokenize)
-
-        # Remove stopwords.
-        tweet_terms.add_map(stopwords.remove_stopword_tokens)
+        tokenizer = tokenize.get_tokenizer(preserve_case=False)
+        tweet_terms.add_batch_map(tokenizer.tokenize_batch)
 
-        # Collect ngrams from the tokens for each tweet.
-        tweet_terms.add_map(partial(ngrams.get_ngrams, self.max_ngram_len))
+        # Build vocabulary of terms and count occurances.
+        if self.max_ngram_len <= ngrams.MAX_PACKED_NGRAM_LEN:
+            # Intern the tokens of each batch of tweets to integer ids once,
+            # then remove stopwords and count ngrams as packed integer keys.
+            term_dictionary = terms.TermDictionary()
+            stopword_id_filter = self.stopword_filter.id_filter(term_dictionary)
+            ngram_counter = ngrams.NgramCounter(
+                self.max_ngram_len,
+                max_terms=self.max_terms,
+                doc_counts=True,
+                term_dictionary=term_dictionary,
+                epsilon=self.epsilon,
+                delta=self.delta,
+                sketch_nbytes=self.sketch_nbytes,
+            )
+            for token_lists in utils.chunked(tweet_terms, 10000):
+                id_arrays = term_dictionary.encode_batch(token_lists)
+                ngram_counter.update_ids(stopword_id_filter.remove_batch(id_arrays))
+            term_counts = ngram_counter.to_counter()
+            doc_counts = ngram_counter.doc_counter()
+            num_docs = ngram_counter.num_docs
+        else:
+            # Remove stopwords.
+            tweet_terms.add_map(self.stopword_filter)
 
-        # Flatten tokens to single list.
-        terms = itertools.chain.from_iterable(tweet_terms)
+            # Collect ngrams from the tokens for each tweet.
+            tweet_terms.add_map(partial(ngrams.get_ngrams, self.max_ngram_len))
 
-        # Build vocabulary of terms and count occurances.
-        term_counts = Counter(terms)
+            term_counts = Counter()
+            doc_counts = Counter()
+            num_docs = 0
+            for tweet_ngrams in tweet_terms:
+                term_counts.update(tweet_ngrams)
+                doc_counts.update(set(tweet_ngrams))
+                num_docs += 1
+            if self.max_terms is not None:
+                # Longer ngrams can't be packed, so they are counted exactly
+                # and only the most frequent are kept.
+                term_counts = Counter(dict(term_counts.most_common(self.max_terms)))
+                doc_counts = Counter({term: doc_counts[term] for term in term_counts})
 
-        # Save vocabulary.
+        # Save vocabulary, with the number of tweets each term appears in.
         vocab_dict["term_counts"] = term_counts
+        vocab_dict["doc_counts"] = doc_counts
+        vocab_dict["num_docs"] = num_docs
 
         if save_vocab:
-            # Pickle the vocabulary and associated data.
-            filepath = re.sub(
-                "-id-", "-{}-".format(self.vocab_file_substring), filepath
+            # Save the vocabulary and associated data.
+            vocab_filepath = self.vocab_filepath(filepath)
+            vocabulary_file.save_vocabulary(vocab_filepath, vocab_dict)
+            if self._vocab_index is not None:
+                self._vocab_index.add(vocab_filepath)
+
+        return vocab_dict
+
+    def vocab_filepath(self, tweets_filepath):
+        """Return the path the vocabulary of a tweet file is saved to.
+
+        >>> Vocabulary(include_retweets=False).vocab_filepath(
+        ...     "2020-03/coronavirus-tweet-id-2020-03-01-00.jsonl.gz")
+        '2020-03/coronavirus-tweet-vocab-retweets-False-ngrams-1-to-2-2020-03-01-00.vocab'
+        """
+        filepath = re.sub(
+            "-id-", "-{}-".format(self.vocab_file_substring), tweets_filepath
+        )
+        return re.sub(r"\.jsonl\.gz$", vocabulary_file.VOCAB_SUFFIX, filepath)
+
+    def build(
+        self,
+        filepaths,
+        workers=1,
+        min_count=1,
+        save_path=None,
+        save_file_vocabs=False,
+        prune=True,
+    ):
+        """Build the vocabulary of several tweet files.
+
+        The files are split between workers, each of which builds the
+        vocabulary of its files and merges them into a vocabulary file.
+        Files whose vocabulary has been saved, see `vocab_exists`, are not
+        built again. The vocabulary files of the workers and those saved are
+        then merged on disk with `vocabulary_file.merge_vocabulary_files`,
+        and only the terms kept are loaded.
+
+        Args:
+            filepaths (iterable of str): The files containing the tweet data.
+            workers (int): Number of processes to build vocabularies in.
+            min_count (int): Smallest total count of the terms to keep.
+            save_path (str, optional): Where to save the merged vocabulary,
+                see `vocabulary_file.save_vocabulary`.
+            save_file_vocabs (bool): Whether to save the vocabulary of each
+                file built, so that it is loaded by later builds.
+            prune (bool): Whether to keep only the max_terms most frequent
+                terms of the merged vocabulary. Without pruning, the
+                vocabulary can be merged with others before taking its most
+                frequent terms.
+
+        Returns:
+            dict: The merged vocabulary, in the same form as the vocabulary
+                returned by `build_vocabulary_for_file`.
+
+        Example:
+            >>> vocabulary = Vocabulary("data", include_retweets=False)
+            >>> files = file_mgmt.files_in_range(
+            ...     "data", "2020-03-01-00", "2020-03-31-23")
+            >>> vocab_dict = vocabulary.build(files, workers=8)  # doctest: +SKIP
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            vocab_paths = self._vocab_files(
+                filepaths, workers, save_file_vocabs, tmp_dir
             )
-            filepath = re.sub(".jsonl.gz", ".pickle", filepath)
-            with open(filepath, "wb") as file:
-                pickle.dump(vocab_dict, file)
+            with vocabulary_file.merge_vocabulary_files(
+                vocab_paths, os.path.join(tmp_dir, "merged.vocab"), min_count
+            ) as merged:
+                vocab_dict = self._vocab_dict_from_file(merged, prune)
+        vocab_dict["min_count"] = min_count
+        if save_path is not None:
+            vocabulary_file.save_vocabulary(save_path, vocab_dict)
+        return vocab_dict
 
+    def _vocab_files(self, filepaths, workers, save_file_vocabs, tmp_dir):
+        """Return the paths of vocabulary files covering the tweet files.
+
+        These are the vocabulary files saved for the tweet files and those
+        the workers merged the vocabularies of the other files into, in
+        tmp_dir.
+        """
+        filepaths = sorted(filepaths)
+        # Index the saved vocabularies once, before copying self to workers.
+        self._ensure_vocab_index()
+        if workers > 1:
+            groups = [
+                filepaths[i::workers] for i in range(min(workers, len(filepaths)))
+            ]
+            with ProcessPoolExecutor(workers) as executor:
+                results = list(
+                    executor.map(
+                        _build_partial_vocabulary,
+                        [self] * len(groups),
+                        groups,
+                        [save_file_vocabs] * len(groups),
+                        [tmp_dir] * len(groups),
+                    )
+                )
+            for _, saved_paths in results:
+                for path in saved_paths:
+                    self.vocab_index.add(path)
+        else:
+            results = [
+                _build_partial_vocabulary(self, filepaths, save_file_vocabs, tmp_dir)
+            ]
+        return list(itertools.chain.from_iterable(paths for paths, _ in results))
+
+    def _params(self):
+        """Return the parameters saved with the vocabularies."""
+        return {
+            "include_retweets": self.include_retweets,
+            "stopwords": self.stopword_filter.stopwords,
+            "max_ngram_len": self.max_ngram_len,
+            "max_terms": self.max_terms,
+        }
+
+    def _vocab_dict_from_file(self, vocab, prune):
+        """Return the vocabulary in a vocabulary file with this one's params.
+
+        With prune and max_terms, only the most frequent terms are loaded.
+        """
+        if prune and self.max_terms is not None:
+            term_counts = Counter(dict(vocab.most_common(self.max_terms)))
+            doc_counts = None
+            if vocab.has_doc_counts:
+                doc_counts = Counter(
+                    {term: vocab.get_doc_count(term) for term in term_counts}
+                )
+        else:
+            counts = vocab.to_vocab_dict()
+            term_counts = counts["term_counts"]
+            doc_counts = counts.get("doc_counts")
+        vocab_dict = dict(
+            self._params(),
+            date_hours=vocab.params.get("date_hours", []),
+            term_counts=term_counts,
+        )
+        if doc_counts is not None and "num_docs" in vocab.params:
+            vocab_dict["doc_counts"] = doc_counts
+            vocab_dict["num_docs"] = vocab.params["num_docs"]
         return vocab_dict
 
-    def vocab_exists(self, tweets_filepath):
-        """Return whether the vocab for filepath already exists.
+    def update_aggregate(
+        self, aggregate_path, filepaths, workers=1, save_file_vocabs=False
+    ):
+        """Fold the vocabularies of new tweet files into an aggregate vocabulary.
+
+        The aggregate is a vocabulary file recording the date-hours of the
+        files it includes. Only the files whose date-hour it doesn't include
+        yet are built (or loaded, see `build`), and their counts, document
+        counts and number of tweets are merged into the aggregate, which is
+        rewritten with its top terms updated. The aggregate is created if it
+        doesn't exist.
+
+        With max_terms, the aggregate keeps all of the terms of the files'
+        vocabularies, so that it stays equal to building them at once. Take
+        its `most_common(max_terms)` to get the top terms.
 
         Args:
-            filepath: filepath for data file.
+            aggregate_path (str): Path to the aggregate vocabulary file.
+            filepaths (iterable of str): The files containing the tweet data,
+                which may include files already in the aggregate.
+            workers (int): Number of processes to build vocabularies in.
+            save_file_vocabs (bool): Whether to save the vocabulary of each
+                file built.
+
+        Returns:
+            VocabularyFile: The updated aggregate vocabulary.
+
+        Example:
+            To add the latest files to a running vocabulary every day:
+
+            >>> vocabulary = Vocabulary("data", include_retweets=False)
+            >>> files = file_mgmt.files_in_range(
+            ...     "data", "2020-01-01-00", "2020-12-31-23")
+            >>> aggregate = vocabulary.update_aggregate(
+            ...     "data/vocab.vocab", files, workers=8)  # doctest: +SKIP
+            >>> aggregate.most_common(10)  # doctest: +SKIP
+        """
+        included = set()
+        aggregate = None
+        if os.path.exists(aggregate_path):
+            aggregate = vocabulary_file.VocabularyFile(aggregate_path)
+            params = {
+                "include_retweets": self.include_retweets,
+                "max_ngram_len": self.max_ngram_len,
+                "max_terms": self.max_terms,
+                "stopwords": self.stopword_filter.stopwords,
+            }
+            for key, value in params.items():
+                if aggregate.params.get(key) != value:
+                    raise Exception(
+                        "{} was built with a different {}.".format(aggregate_path, key)
+                    )
+            included = set(aggregate.params.get("date_hours", []))
+
+        new_filepaths = []
+        for filepath in filepaths:
+            date_hour = file_mgmt.extract_date_hour(filepath)
+            if date_hour is None:
+                raise Exception("No date-hour in {}.".format(filepath))
+            if date_hour not in included:
+                new_filepaths.append(filepath)
+        if aggregate is not None and not new_filepaths:
+            return aggregate
+
+        # Merge the vocabulary files without pruning, so that the tail of the
+        # new files still counts towards the top terms of the aggregate.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            vocab_paths = self._vocab_files(
+                new_filepaths, workers, save_file_vocabs, tmp_dir
+            )
+            if aggregate is not None:
+                # The aggregate is replaced, which fails on Windows while it is
+                # memory mapped.
+                aggregate.close()
+                vocab_paths.insert(0, aggregate_path)
+            return vocabulary_file.merge_vocabulary_files(vocab_paths, aggregate_path)
+
+    @property
+    def vocab_index(self):
+        """The index of the vocabularies saved under data_dir.
+
+        The index is built the first time it's used. Call `refresh` on it
+        to pick up vocabularies saved by other programs since.
+        """
+        return self._ensure_vocab_index()
+
+    def _ensure_vocab_index(self):
+        """Build the index of the saved vocabularies if it isn't built yet."""
+        if self._vocab_index is None:
+            self._vocab_index = VocabularyIndex(self.data_dir)
+        return self._vocab_index
+
+    def _saved_vocab_paths(self, tweets_filepath):
+        """Return the paths of the saved vocabularies for filepath.
+
+        Vocabulary files come before vocabularies pickled by older versions.
         """
         date_hour = file_mgmt.extract_date_hour(tweets_filepath)
-        year_month = file_mgmt.year_month_from_date_hour(date_hour)
+        return self.vocab_index.paths(self.vocab_file_substring, date_hour)
 
-        # Form of the corresponding vocab file.
-        vocab_file_form = "{}/*{}-{}.pickle".format(
-            year_month, self.vocab_file_substring, date_hour
-        )
-        match_vocab_file = os.path.join(self.data_dir, vocab_file_form)
+    def vocab_exists(self, tweets_filepath):
+        """Return whether the vocab for filepath already exists.
 
+        Args:
+            filepath: filepath for data file.
+        """
         # Return True if a matching vocabulary file exists.
-        if glob.glob(match_vocab_file, recursive=True):
+        if self._saved_vocab_paths(tweets_filepath):
             return True
         return False
 
+    def load_vocabulary_for_file(self, tweets_filepath):
+        """Load the saved vocabulary for filepath.
+
+        Args:
+            tweets_filepath (str): The file containing the tweet data.
+
+        Returns:
+            dict: The vocabulary saved by `build_vocabulary_for_file`.
+        """
+        paths = self._saved_vocab_paths(tweets_filepath)
+        if not paths:
+            raise Exception("No vocabulary saved for {}.".format(tweets_filepath))
+        return vocabulary_file.load_vocabulary(paths[0])
+
     def vocab_does_not_exist(self, tweets_filepath):
         """Return whether the vocab for filepath does not already exist."""
         return not self.vocab_exists(tweets_filepath)
@@ -0,0 +1,384 @@
+"""Compact on-disk storage for vocabularies.
+
+A vocabulary file holds the terms of a vocabulary sorted by their UTF-8
+encoding, in a single pool of bytes with the offset of each term, along with
+NumPy arrays of their counts, optionally of the number of tweets they appear
+in (their document counts), and of the order of the terms by count. The
+arrays are memory mapped, so a vocabulary can be queried without loading it,
+and sorted vocabulary files can be merged without building a Counter.
+
+Layout, with integers little-endian:
+
+    8 bytes   magic b"TATVOCAB"
+    8 bytes   length of the header
+    header    JSON with the number of terms, the size of the pool, the names
+              of the count columns and the parameters of the vocabulary,
+              padded to a multiple of 8 bytes
+    int64     offset of each term in the pool, followed by the pool size
+    int64     for each column, the count of each term
+    int64     index of each term, most frequent first
+    bytes     pool of UTF-8 encoded terms
+"""
+
+import itertools
+import json
+import operator
+import os
+import pickle
+import struct
+from collections import Counter
+
+import numpy as np
+
+# Suffix of vocabulary files.
+VOCAB_SUFFIX = ".vocab"
+
+_MAGIC = b"TATVOCAB"
+_VERSION = 1
+_ALIGNMENT = 8
+
+
+def _params_to_json(params):
+    """Make the parameters of a vocabulary JSON serializable."""
+    params = dict(params)
+    if "stopwords" in params:
+        params["stopwords"] = sorted(params["stopwords"])
+    return params
+
+
+def _params_from_json(params):
+    """Restore the parameters of a vocabulary read from JSON."""
+    if "stopwords" in params:
+        params["stopwords"] = frozenset(params["stopwords"])
+    return params
+
+
+def _merge_params(params_list, min_count):
+    """Return the parameters of the merge of vocabularies.
+
+    The parameters are those of the first vocabulary, with the total number
+    of tweets and all of the date-hours of the vocabularies.
+    """
+    params = dict(params_list[0] if params_list else {}, min_count=min_count)
+    for key, merge in [("num_docs", sum), ("date_hours", _union)]:
+        if params_list and all(key in other for other in params_list):
+            params[key] = merge(other[key] for other in params_list)
+        else:
+            params.pop(key, None)
+    return params
+
+
+def _union(date_hours_lists):
+    """Return the sorted union of lists of date-hours."""
+    return sorted(set(itertools.chain.from_iterable(date_hours_lists)))
+
+
+def _write_vocabulary(path, terms, columns, params):
+    """Write sorted UTF-8 encoded terms and their counts to a vocabulary file.
+
+    columns maps the name of each count column, starting with "counts", to
+    the counts of the terms.
+    """
+    columns = {
+        name: np.asarray(counts, dtype=np.int64) for name, counts in columns.items()
+    }
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum([len(term) for term in terms], out=offsets[1:])
+    # Ties are kept in the order of the terms.
+    order = np.argsort(-columns["counts"], kind="stable").astype(np.int64)
+
+    header = json.dumps(
+        {
+            "version": _VERSION,
+            "num_terms": len(terms),
+            "pool_nbytes": int(offsets[-1]),
+            "columns": list(columns),
+            "params": _params_to_json(params),
+        }
+    ).encode()
+    header += b" " * (-len(header) % _ALIGNMENT)
+
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as file:
+        file.write(_MAGIC)
+        file.write(struct.pack("<Q", len(header)))
+        file.write(header)
+        for array in [offsets, *columns.values(), order]:
+            file.write(array.astype("<i8").tobytes())
+        file.write(b"".join(terms))
+    os.replace(tmp_path, path)
+
+
+def save_vocabulary(path, vocab_dict):
+    """Save a vocabulary to a vocabulary file.
+
+    Args:
+        path (str): Where to save the vocabulary.
+        vocab_dict (dict): Vocabulary, as returned by
+            `Vocabulary.build_vocabulary_for_file`. "term_counts" holds the
+            count of each term, the optional "doc_counts" holds the number
+            of tweets each term appears in and the other entries are
+            parameters which must be JSON serializable, apart from the set
+            of stopwords.
+    """
+    terms = sorted(vocab_dict["term_counts"])
+    columns = {"counts": [vocab_dict["term_counts"][term] for term in terms]}
+    if "doc_counts" in vocab_dict:
+        doc_counts = vocab_dict["doc_counts"]
+        columns["doc_counts"] = [doc_counts.get(term, 0) for term in terms]
+    params = {
+        key: value
+        for key, value in vocab_dict.items()
+        if key not in ("term_counts", "doc_counts")
+    }
+    # Sort by the UTF-8 encoding, which may differ from the order of the str.
+    encoded = [term.encode() for term in terms]
+    order = sorted(range(len(encoded)), key=encoded.__getitem__)
+    _write_vocabulary(
+        path,
+        [encoded[i] for i in order],
+        {name: [counts[i] for i in order] for name, counts in columns.items()},
+        params,
+    )
+
+
+def is_vocabulary_file(path):
+    """Check whether path is a vocabulary file rather than a pickled vocabulary."""
+    with open(path, "rb") as file:
+        return file.read(len(_MAGIC)) == _MAGIC
+
+
+class VocabularyFile:
+    """Read-only view of a vocabulary file, loading terms only when needed.
+
+    Args:
+        path (str): Path to the vocabulary file.
+
+    Example:
+        >>> import tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "example.vocab")
+        >>> save_vocabulary(path, {"max_ngram_len": 1,
+        ...                        "term_counts": Counter(b=3, a=1, c=2)})
+        >>> vocab = VocabularyFile(path)
+        >>> len(vocab), vocab["c"], "d" in vocab
+        (3, 2, False)
+        >>> vocab.most_common(2)
+        [('b', 3), ('c', 2)]
+        >>> vocab.params
+        {'max_ngram_len': 1}
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            if file.read(len(_MAGIC)) != _MAGIC:
+                raise Exception("{} is not a vocabulary file.".format(path))
+            (header_nbytes,) = struct.unpack("<Q", file.read(8))
+            header = json.loads(file.read(header_nbytes))
+        if header["version"] != _VERSION:
+            raise Exception(
+                "Unsupported vocabulary file version {}.".format(header["version"])
+            )
+        self.params = _params_from_json(header["params"])
+        num_terms = header["num_terms"]
+
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        start = len(_MAGIC) + 8 + header_nbytes
+        arrays = []
+        for length in [num_terms + 1] + [num_terms] * (len(header["columns"]) + 1):
+            arrays.append(data[start : start + 8 * length].view("<i8"))
+            start += 8 * length
+        self._offsets = arrays[0]
+        self._columns = dict(zip(header["columns"], arrays[1:-1]))
+        self._counts = self._columns["counts"]
+        self._order = arrays[-1]
+        self._pool = data[start : start + header["pool_nbytes"]]
+
+    def __len__(self):
+        return len(self._counts)
+
+    def close(self):
+        """Unmap the file, so that it can be replaced or deleted on Windows.
+
+        The vocabulary can't be queried once closed.
+        """
+        # The file is unmapped once no array refers to it.
+        self._offsets = self._columns = self._counts = None
+        self._order = self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _term_bytes(self, i):
+        """Return the UTF-8 encoding of the i-th term."""
+        return self._pool[self._offsets[i] : self._offsets[i + 1]].tobytes()
+
+    def _index(self, term):
+        """Return the index of term by binary search, or -1 if it's missing."""
+        term = term.encode()
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._term_bytes(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self) and self._term_bytes(low) == term:
+            return low
+        return -1
+
+    def __contains__(self, term):
+        return self._index(term) != -1
+
+    def __getitem__(self, term):
+        i = self._index(term)
+        if i == -1:
+            raise KeyError(term)
+        return int(self._counts[i])
+
+    def get(self, term, default=0):
+        """Return the count of term, or default if it's not in the vocabulary."""
+        i = self._index(term)
+        return default if i == -1 else int(self._counts[i])
+
+    @property
+    def has_doc_counts(self):
+        """Whether the number of tweets each term appears in was saved."""
+        return "doc_counts" in self._columns
+
+    def get_doc_count(self, term, default=0):
+        """Return the number of tweets term appears in, or default if missing."""
+        i = self._index(term)
+        return default if i == -1 else int(self._columns["doc_counts"][i])
+
+    def _terms_bytes(self):
+        """Return the UTF-8 encoded terms, in sorted order."""
+        pool = self._pool.tobytes()
+        offsets = self._offsets.tolist()
+        return [pool[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    def terms(self):
+        """Return the terms, sorted by their UTF-8 encoding."""
+        # Decode the whole pool at once, finding the offsets of the terms in
+        # the decoded text from the bytes which start a character.
+        starts_char = (self._pool & 0xC0) != 0x80
+        char_offsets = np.zeros(len(self._pool) + 1, dtype=np.int64)
+        np.cumsum(starts_char, out=char_offsets[1:])
+        char_offsets = char_offsets[self._offsets].tolist()
+        text = self._pool.tobytes().decode()
+        return [text[start:end] for start, end in zip(char_offsets, char_offsets[1:])]
+
+    def items(self):
+        """Return the terms and their counts, sorted by the UTF-8 encoded terms."""
+        return zip(self.terms(), self._counts.tolist())
+
+    def most_common(self, n=None):
+        """Return the n most frequent terms and their counts.
+
+        Only the n most frequent terms are read from the file.
+
+        Args:
+            n (int, optional): Number of terms. Defaults to all of them.
+
+        Returns:
+            list of (str, int): Terms and their counts, most frequent first.
+        """
+        return [
+            (self._term_bytes(i).decode(), int(self._counts[i]))
+            for i in self._order[:n].tolist()
+        ]
+
+    def to_counter(self):
+        """Return the count of each term as a Counter."""
+        return Counter(dict(self.items()))
+
+    def to_vocab_dict(self):
+        """Return the vocabulary in the form of a pickled vocabulary."""
+        terms = self.terms()
+        vocab_dict = dict(self.params)
+        for name, key in [("counts", "term_counts"), ("doc_counts", "doc_counts")]:
+            if name in self._columns:
+                counts = self._columns[name].tolist()
+                vocab_dict[key] = Counter(dict(zip(terms, counts)))
+        return vocab_dict
+
+
+def load_vocabulary(path):
+    """Load a vocabulary from a vocabulary file or a pickled vocabulary.
+
+    Args:
+        path (str): Path to the saved vocabulary.
+
+    Returns:
+        dict: The vocabulary, with the count of each term in "term_counts".
+    """
+    if is_vocabulary_file(path):
+        with VocabularyFile(path) as vocab:
+            return vocab.to_vocab_dict()
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def merge_vocabulary_files(paths, save_path, min_count=1, params=None):
+    """Merge vocabulary files into a new vocabulary file.
+
+    The sorted terms of the files are merged with a sort which takes
+    advantage of the terms of each file already being sorted, and the counts
+    are summed with NumPy, so no Counter of all of the terms is built.
+
+    Args:
+        paths (iterable of str): Paths to the vocabulary files to merge.
+        save_path (str): Where to save the merged vocabulary.
+        min_count (int): Smallest total count of the terms to keep.
+        params (dict, optional): Parameters to save with the merged
+            vocabulary. Defaults to those of the first file, with min_count,
+            the total number of tweets and the date-hours of all of the
+            files, if every file has them.
+
+    Returns:
+        VocabularyFile: The merged vocabulary.
+    """
+    vocabs = [VocabularyFile(path) for path in paths]
+    if params is None:
+        params = _merge_params([vocab.params for vocab in vocabs], min_count)
+    # Only keep the count columns which every file has.
+    names = ["counts"] + [
+        name
+        for name in ["doc_counts"]
+        if vocabs and all(name in vocab._columns for vocab in vocabs)
+    ]
+
+    terms = list(
+        itertools.chain.from_iterable(vocab._terms_bytes() for vocab in vocabs)
+    )
+    order = sorted(range(len(terms)), key=terms.__getitem__)
+    terms = list(map(terms.__getitem__, order))
+
+    # Sum the counts of each run of equal terms.
+    is_new_term = np.ones(len(terms), dtype=bool)
+    is_new_term[1:] = np.fromiter(
+        map(operator.ne, terms[1:], terms[:-1]), dtype=bool, count=len(terms) - 1
+    )
+    starts = np.flatnonzero(is_new_term)
+    columns = {}
+    for name in names:
+        counts = np.concatenate(
+            [np.zeros(0, dtype=np.int64)] + [vocab._columns[name] for vocab in vocabs]
+        )
+        columns[name] = np.add.reduceat(counts[order], starts) if terms else counts
+    keep = np.flatnonzero(columns["counts"] >= min_count)
+    # save_path may be one of the merged files, which can't be replaced on
+    # Windows while it is memory mapped.
+    for vocab in vocabs:
+        vocab.close()
+
+    _write_vocabulary(
+        save_path,
+        [terms[starts[i]] for i in keep.tolist()],
+        {name: counts[keep] for name, counts in columns.items()},
+        params,
+    )
+    return VocabularyFile(save_path)
@@ -1,7 +1,13 @@
 """Utility functions not related to any particular module."""
+import math
+import random
 import sys
-from collections.abc import Iterable
-from functools import wraps
+from collections import deque
+from collections.abc import Iterable, Iterator, Sized
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial, update_wrapper
+from itertools import chain, compress, islice
+from operator import itemgetter
 
 import numpy as np
 
@@ -14,11 +20,6 @@ else:
 class Pipeline:
     """Apply a sequence of manipulations to a stream of items.
 
-    TODO:
-        * We need a good way to subsample from a pipeline. This could be
-          done randomly by keeping x% of items, and/or deterministically by
-          keeping only every y'th item.
-
     Args:
         stream (iterable): A stream of things to be filtered and transformed.
         steps (list of (applier, to_apply)): Manipulations to apply to the
@@ -102,6 +103,41 @@ class Pipeline:
         >>> pipeline = pipeline.subset([1, 2, 3])
         >>> list(pipeline)
         [2, 4, 6]
+
+        Subsampling can also be done in a single pass over the stream, by
+        keeping a random sample of fixed size, keeping each element with a
+        fixed probability or keeping every n'th element. Filters may follow
+        these samplers.
+
+        >>> pipeline = Pipeline(range(100)).reservoir_sample(10, seed=0)
+        >>> len(list(pipeline))
+        10
+        >>> pipeline = Pipeline(range(100)).bernoulli_sample(0.5, seed=0)
+        >>> pipeline = pipeline.add_filter(is_even)
+        >>> all(is_even(x) for x in pipeline)
+        True
+        >>> list(Pipeline(range(10)).stride_sample(3, offset=1))
+        [1, 4, 7]
+
+        Functions which are faster on many items at a time can be mapped
+        over batches of the stream, returning one result per item, or whole
+        batches can be passed to later steps and flattened again.
+
+        >>> double_all = lambda xs: [2 * x for x in xs]
+        >>> list(Pipeline(range(5)).add_batch_map(double_all, batch_size=2))
+        [0, 2, 4, 6, 8]
+        >>> pipeline = Pipeline(range(5)).batch(2)
+        >>> list(pipeline)
+        [[0, 1], [2, 3], [4]]
+        >>> list(pipeline.add_map(sum).batch(2).unbatch())
+        [1, 5, 4]
+
+        The filter and map steps can be run in a pool of worker processes,
+        in which case they must be picklable.
+
+        >>> pipeline = Pipeline(range(-5, 5)).add_map(abs).add_filter(bool)
+        >>> list(pipeline.parallel(workers=2, chunksize=3))
+        [5, 4, 3, 2, 1, 1, 2, 3, 4]
     """
 
     def __init__(self, stream, steps=None, precompute_len=False):
@@ -117,15 +153,27 @@ class Pipeline:
             steps = []
         self._steps = steps
         self._prev_subsampled = False
+        self._parallel = None
 
         # Using cached_property to compute and store length of stream.
         if precompute_len:
             len(self)
 
     def __iter__(self):
-        stream = self._stream
-        for applier, to_apply in self._steps:
-            stream = applier(to_apply, stream)
+        if self._parallel is None:
+            stream = apply_steps(self._steps, self._stream)
+        else:
+            # Only the leading filters and maps can be applied to each chunk
+            # of the stream independently.
+            n_parallel = 0
+            for applier, _ in self._steps:
+                if applier not in _ELEMENTWISE_APPLIERS:
+                    break
+                n_parallel += 1
+            stream = _apply_steps_in_parallel(
+                self._steps[:n_parallel], self._stream, *self._parallel
+            )
+            stream = apply_steps(self._steps[n_parallel:], stream)
 
         return (elm for elm in stream)
 
@@ -158,6 +206,97 @@ class Pipeline:
         self._steps.append((map, to_apply))
         return self
 
+    def add_batch_filter(self, to_apply, batch_size=1000):
+        """Add a filter step which decides on batches of items at a time.
+
+        Args:
+            to_apply (function): Function taking a list of up to batch_size
+                items and returning whether to keep each of them.
+            batch_size (int): Number of items passed to to_apply at a time.
+        """
+        # Scrap the length if it exists as the length has now changed.
+        try:
+            del self._len
+        except AttributeError:
+            pass
+
+        # Check whether the stream has been previously subsampled.
+        if self._prev_subsampled:
+            raise Warning(
+                "Filtering after subsampling will lead to further reduction to "
+                "the number of elements."
+            )
+        self._steps.append((_batch_filter, (to_apply, batch_size)))
+        return self
+
+    def add_batch_map(self, to_apply, batch_size=1000):
+        """Add a map step which transforms batches of items at a time.
+
+        Like a map step, the items are still emitted one at a time, so the
+        step can be used in place of a map with a function which is faster
+        on many items at once, e.g. a vectorized one.
+
+        Args:
+            to_apply (function): Function taking a list of up to batch_size
+                items and returning an iterable of the result for each item.
+            batch_size (int): Number of items passed to to_apply at a time.
+        """
+        self._steps.append((_batch_map, (to_apply, batch_size)))
+        return self
+
+    def batch(self, size):
+        """Group the items of the stream into lists of `size` consecutive items.
+
+        Only the last list may be shorter. Later steps act on the lists.
+
+        Args:
+            size (int): Number of items in each list.
+        """
+        # Scrap the length if it exists as the length has now changed.
+        try:
+            del self._len
+        except AttributeError:
+            pass
+
+        self._steps.append((_apply_to_stream, partial(_batch, size)))
+        return self
+
+    def unbatch(self):
+        """Flatten a stream of iterables, e.g. batches, into their items."""
+        # Scrap the length if it exists as the length has now changed.
+        try:
+            del self._len
+        except AttributeError:
+            pass
+
+        self._steps.append((_apply_to_stream, chain.from_iterable))
+        return self
+
+    def parallel(self, workers, chunksize=1000, ordered=True):
+        """Apply the filter and map steps in a pool of worker processes.
+
+        The stream is split into chunks of `chunksize` items which are sent to
+        the workers, with at most two chunks per worker in flight at a time.
+        The filter and map steps before the first other step (such as a
+        subset) are applied in the workers and must be picklable; the
+        remaining steps are applied to the combined results in this process.
+        Items which are iterators, such as the output of a map, are turned
+        into lists before being sent back from the workers.
+
+        Args:
+            workers (int): Number of worker processes. With one worker the
+                steps are applied in this process.
+            chunksize (int): Number of items sent to a worker at a time.
+            ordered (bool): Whether to preserve the order of the stream. If
+                False, the results of each chunk are yielded as soon as they
+                are ready.
+        """
+        if workers > 1:
+            self._parallel = (workers, chunksize, ordered)
+        else:
+            self._parallel = None
+        return self
+
     def subsample(self, num_samples):
         """Randomly subsample the elements in the stream."""
         self._prev_subsampled = True
@@ -165,6 +304,57 @@ class Pipeline:
         self.subset(keep_idxs)
         return self
 
+    def reservoir_sample(self, num_samples, seed=None):
+        """Keep a uniformly random sample of a fixed number of elements.
+
+        The sample is drawn in a single pass over the stream, holding at most
+        `num_samples` elements in memory, and is yielded in stream order once
+        the stream is exhausted. All of the elements are kept if there are
+        fewer than `num_samples`.
+
+        Args:
+            num_samples (int): Number of elements to keep.
+            seed (int): Seed for the random sample. If None, a seed is drawn
+                from `np.random`. Either way, iterating over the pipeline
+                again yields the same sample.
+        """
+        if seed is None:
+            seed = np.random.randint(2 ** 31)
+        return self._add_sampler(partial(_reservoir_sample, num_samples, seed))
+
+    def bernoulli_sample(self, rate, seed=None):
+        """Keep each element independently with a fixed probability.
+
+        Args:
+            rate (float): Probability of keeping each element.
+            seed (int): Seed for the random sample. If None, a seed is drawn
+                from `np.random`. Either way, iterating over the pipeline
+                again yields the same sample.
+        """
+        if seed is None:
+            seed = np.random.randint(2 ** 31)
+        return self._add_sampler(partial(_bernoulli_sample, rate, seed))
+
+    def stride_sample(self, stride, offset=0):
+        """Keep every stride'th element, starting from the element at offset.
+
+        Args:
+            stride (int): Keep one in every `stride` elements.
+            offset (int): Index of the first element to keep.
+        """
+        return self._add_sampler(partial(_stride_sample, stride, offset))
+
+    def _add_sampler(self, sampler):
+        """Add a step applying sampler to the whole stream."""
+        # Scrap the length if it exists as the length has now changed.
+        try:
+            del self._len
+        except AttributeError:
+            pass
+
+        self._steps.append((_apply_to_stream, sampler))
+        return self
+
     def subset(self, keep_idxs):
         """Keep only the elements indicated in keep_idxs from the stream."""
 
@@ -177,11 +367,16 @@ class Pipeline:
             return (item for i, item in enumerate(stream) if i in keep_idxs)
 
         self._steps.append((_applier, _keep_idxs))
-        self._len = keep_idxs
+        self._len = len(keep_idxs)
         return self
 
     @cached_property
     def _len(self):
+        if isinstance(self._stream, Sized) and all(
+            applier in (map, _batch_map) for applier, _ in self._steps
+        ):
+            # Maps do not change the number of items in the stream.
+            return len(self._stream)
         return sum(1 for _ in self)
 
     def __len__(self):
@@ -198,9 +393,187 @@ class Pipeline:
         info_strs.append("Steps to apply:")
         for applier, to_apply in self._steps:
             info_strs.append("\t{} on {}".format(applier, to_apply))
+        if self._parallel is not None:
+            info_strs.append("Workers: {}".format(self._parallel[0]))
         return "\n".join(info_strs)
 
 
+def _apply_to_stream(to_apply, stream):
+    """Apply a function to the whole stream, as a pipeline step."""
+    return to_apply(stream)
+
+
+def _open_uniform(rng):
+    """Draw uniformly from the open interval (0, 1)."""
+    u = rng.random()
+    while u == 0.0:
+        u = rng.random()
+    return u
+
+
+def _reservoir_sample(num_samples, seed, stream):
+    """Yield a uniformly random sample of the stream, in stream order.
+
+    Uses Algorithm L (Li, 1994), which skips over elements between
+    replacements rather than drawing a random number for every element.
+    """
+    rng = random.Random(seed)
+    stream = enumerate(stream)
+    reservoir = list(islice(stream, num_samples))
+    if num_samples > 0 and len(reservoir) == num_samples:
+        w = math.exp(math.log(_open_uniform(rng)) / num_samples)
+        while True:
+            if w < 1.0:
+                skip = int(math.log(_open_uniform(rng)) / math.log1p(-w))
+            else:
+                skip = 0
+            replacement = next(islice(stream, skip, None), None)
+            if replacement is None:
+                break
+            reservoir[rng.randrange(num_samples)] = replacement
+            w *= math.exp(math.log(_open_uniform(rng)) / num_samples)
+    reservoir.sort(key=itemgetter(0))
+    return (item for _, item in reservoir)
+
+
+def _bernoulli_sample(rate, seed, stream):
+    """Yield each element of the stream with probability rate.
+
+    The number of elements skipped between kept elements is drawn from a
+    geometric distribution rather than drawing a random number per element.
+    """
+    if rate >= 1:
+        yield from stream
+        return
+    if rate <= 0:
+        return
+    rng = random.Random(seed)
+    log_keep_prob = math.log1p(-rate)
+    stream = iter(stream)
+    while True:
+        skip = int(math.log(_open_uniform(rng)) / log_keep_prob)
+        # Wrap elements so a None element is not mistaken for the end.
+        kept = next(islice(zip(stream), skip, None), None)
+        if kept is None:
+            return
+        yield kept[0]
+
+
+def _stride_sample(stride, offset, stream):
+    """Yield every stride'th element of the stream, starting at offset."""
+    return islice(stream, offset, None, stride)
+
+
+def _batch(size, stream):
+    """Group the stream into lists of size consecutive elements."""
+    return chunked(stream, size)
+
+
+def _batch_map(batch_to_apply, stream):
+    """Apply a function to batches of the stream, yielding each result."""
+    to_apply, batch_size = batch_to_apply
+    for batch in chunked(stream, batch_size):
+        yield from to_apply(batch)
+
+
+def _batch_filter(batch_to_apply, stream):
+    """Yield the elements of the stream kept by a function of batches."""
+    to_apply, batch_size = batch_to_apply
+    for batch in chunked(stream, batch_size):
+        yield from compress(batch, to_apply(batch))
+
+
+# Steps which act on each item of the stream independently of the others.
+_ELEMENTWISE_APPLIERS = (filter, map, _batch_filter, _batch_map)
+
+
+def _apply_steps_to_chunk(steps, chunk):
+    """Apply steps to a chunk of a stream in a worker process."""
+    return [
+        list(item) if isinstance(item, Iterator) else item
+        for item in apply_steps(steps, chunk)
+    ]
+
+
+def _apply_steps_in_parallel(steps, stream, workers, chunksize, ordered):
+    """Apply elementwise steps to chunks of a stream in a process pool.
+
+    Args:
+        steps (list of (applier, to_apply)): Picklable filter and map steps.
+        stream (iterable): A stream of picklable items.
+        workers (int): Number of worker processes.
+        chunksize (int): Number of items sent to a worker at a time.
+        ordered (bool): Whether to preserve the order of the stream.
+
+    Yields:
+        The items of the stream with the steps applied.
+    """
+    max_pending = 2 * workers
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        try:
+            for chunk in chunked(stream, chunksize):
+                pending.append(executor.submit(_apply_steps_to_chunk, steps, chunk))
+                while len(pending) >= max_pending:
+                    if ordered:
+                        yield from pending.popleft().result()
+                    else:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            pending.remove(future)
+                            yield from future.result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Don't wait on chunks that are no longer needed.
+            for future in pending:
+                future.cancel()
+
+
+def apply_steps(steps, stream):
+    """Apply a list of pipeline steps to a stream.
+
+    Args:
+        steps (list of (applier, to_apply)): Manipulations to apply to the
+            stream, in order. Each manipulation will be applied by
+            `applier(to_apply, stream)`.
+        stream (iterable): A stream of things to be filtered and transformed.
+
+    Returns:
+        iterable: The stream with each of the steps applied.
+
+    Example:
+        >>> steps = [(filter, lambda x: x % 2 == 0), (map, str)]
+        >>> list(apply_steps(steps, range(5)))
+        ['0', '2', '4']
+    """
+    for applier, to_apply in steps:
+        stream = applier(to_apply, stream)
+    return stream
+
+
+def chunked(iterable, size):
+    """Split an iterable into lists of at most `size` consecutive items.
+
+    Args:
+        iterable (iterable): Items to split into chunks.
+        size (int): Maximum number of items in each chunk.
+
+    Yields:
+        list: The next chunk of items. Only the last chunk may be shorter
+            than `size`.
+
+    Example:
+        >>> list(chunked(range(5), 2))
+        [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
 def negate(f):
     """Create the boolean inverse of a function.
 
@@ -223,11 +596,18 @@ def negate(f):
         False
     """
 
-    @wraps(f)
-    def g(*args, **kwargs):
-        return not f(*args, **kwargs)
+    return _Negated(f)
+
+
+class _Negated:
+    """Picklable boolean inverse of a function, see `negate`."""
+
+    def __init__(self, f):
+        self._f = f
+        update_wrapper(self, f)
 
-    return g
+    def __call__(self, *args, **kwargs):
+        return not self._f(*args, **kwargs)
 
 
 def listify_nested_iterables(iterable):
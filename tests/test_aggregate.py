@@ -0,0 +1,51 @@
+import gzip
+import json
+import os
+
+import numpy as np
+import pytest
+
+from twitter_analysis_tools.twitter.aggregate import TimeSeriesAggregator
+
+
+def test_aggregate_files(tmp_path):
+    filepath = os.path.join(str(tmp_path), "tweets-2020-03-01-23.jsonl.gz")
+    tweets = [
+        ("Sun Mar 01 23:10:00 +0000 2020", "en", "Wash your hands"),
+        ("Sun Mar 01 23:50:00 +0000 2020", "en", "hands hands"),
+        ("Mon Mar 02 01:00:00 +0000 2020", "en", "Stay home"),
+        ("Mon Mar 02 01:00:00 +0000 2020", "fr", "hands"),
+    ]
+    with gzip.open(filepath, "wt") as f:
+        for created_at, lang, text in tweets:
+            tweet = {"created_at": created_at, "lang": lang, "full_text": text}
+            f.write(json.dumps(tweet) + "\n")
+
+    aggregator = TimeSeriesAggregator(["hands", "stay home"], buffer_size=2)
+    aggregator.update_from_files([filepath])
+    assert aggregator.to_array().tolist() == [[3, 0, 0], [0, 0, 1]]
+    assert aggregator.num_tweets().tolist() == [2, 0, 1]
+    assert len(aggregator.time_slices()) == 3
+    np.testing.assert_allclose(
+        aggregator.to_array(normalize=True), [[1.5, 0, 0], [0, 0, 1]]
+    )
+
+    aggregator = TimeSeriesAggregator(["hands"], slice_by="day")
+    aggregator.update_from_files([filepath], use_file_date_hours=True)
+    assert aggregator.to_array().tolist() == [[3]]
+    assert aggregator.num_tweets().tolist() == [3]
+
+
+def test_terms_are_tokenized_like_tweets():
+    aggregator = TimeSeriesAggregator(["COVID-19", "Stay Home"], slice_by="day")
+    aggregator.add(
+        {
+            "created_at": "Mon Mar 02 10:00:00 +0000 2020",
+            "full_text": "covid-19: stay home",
+        }
+    )
+    assert aggregator.series_names == ["COVID-19", "Stay Home"]
+    assert aggregator.to_array().tolist() == [[1], [1]]
+
+    with pytest.raises(Exception, match="same"):
+        TimeSeriesAggregator(["flu", "Flu"])
@@ -0,0 +1,13 @@
+from twitter_analysis_tools.text import emojis
+
+
+def test_every_emoji_is_matched_whole():
+    codes = emojis.load_emoji_codes()
+    pattern = emojis.get_emoji_pattern()
+    assert all(pattern.fullmatch(code) for code in codes)
+
+    texts = ["x{}y{}".format(code, code) for code in codes]
+    assert emojis.extract_emojis_batch(texts) == [[code, code] for code in codes]
+    assert all(emojis.contains_emoji_batch(texts))
+    assert emojis.total_emoji_counts(texts) == {code: 2 for code in codes}
+    assert not any(emojis.contains_emoji_batch(["#1 *", "café ’"]))
@@ -0,0 +1,37 @@
+import os
+
+from twitter_analysis_tools.twitter.file_mgmt import (
+    CATALOG_FILENAME,
+    FileCatalog,
+    files_in_range,
+)
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "w").close()
+
+
+def test_file_catalog(tmp_path):
+    data_dir = str(tmp_path)
+    for date_hour in ["2020-03-01-00", "2020-03-01-01", "2021-01-05-12"]:
+        month = date_hour[:7]
+        _touch(os.path.join(data_dir, month, "tweets-{}.jsonl.gz".format(date_hour)))
+    _touch(os.path.join(data_dir, "2020-03", "notes.txt"))
+    _touch(os.path.join(data_dir, "2020-03", "undated.gz"))
+
+    catalog = FileCatalog(data_dir)
+    assert catalog.date_hours == ["2020-03-01-00", "2020-03-01-01", "2021-01-05-12"]
+    assert os.path.exists(os.path.join(data_dir, CATALOG_FILENAME))
+    assert [
+        os.path.basename(path)
+        for path in catalog.files_in_range("2020-03-01-01", "2021-12-31-23")
+    ] == ["tweets-2020-03-01-01.jsonl.gz", "tweets-2021-01-05-12.jsonl.gz"]
+
+    # The saved catalog is loaded, and only changed directories are listed.
+    assert not FileCatalog(data_dir).refresh()
+    new_path = os.path.join(data_dir, "2021-01", "tweets-2021-01-01-00.jsonl.gz")
+    _touch(new_path)
+    os.utime(os.path.dirname(new_path), ns=(0, 10 ** 18))
+    assert files_in_range(data_dir, "2021-01-01-00", "2021-01-01-00") == [new_path]
+    assert len(FileCatalog(data_dir)) == 4
@@ -1,6 +1,17 @@
+import gzip
 import os
 
-from twitter_analysis_tools.fileio import LinesFromGzipFiles
+import pytest
+
+from twitter_analysis_tools import fileio
+from twitter_analysis_tools.bin import make_seekable_gzip
+from twitter_analysis_tools.fileio import (
+    GzipLineIndex,
+    LinesFromGzipFiles,
+    read_line_count,
+    write_line_count,
+    write_seekable_gzip,
+)
 
 
 def test_iter_lines_from_gzip_files(datadir):
@@ -23,3 +34,171 @@ def test_iter_lines_from_gzip_files(datadir):
     ]
 
     assert len(lines) == 4
+
+
+def test_iter_lines_from_gzip_files_in_parallel(datadir):
+    filepaths = [os.path.join(datadir, "file1.gz"), os.path.join(datadir, "file2.gz")]
+    lines = LinesFromGzipFiles(filepaths, workers=2, chunksize=1)
+
+    assert list(lines) == [
+        b"file 1 line 1\n",
+        b"file 1 line 2\n",
+        b"file 2 line 1\n",
+        b"file 2 line 2\n",
+    ]
+    assert len(lines) == 4
+
+    # Without preserving order, lines within a file still arrive in order.
+    lines = LinesFromGzipFiles(filepaths, workers=2, ordered=False, chunksize=1)
+    unordered_lines = list(lines)
+    assert sorted(unordered_lines) == [
+        b"file 1 line 1\n",
+        b"file 1 line 2\n",
+        b"file 2 line 1\n",
+        b"file 2 line 2\n",
+    ]
+    assert unordered_lines.index(b"file 1 line 1\n") < unordered_lines.index(
+        b"file 1 line 2\n"
+    )
+
+    # Stopping early shuts down the workers.
+    lines = iter(LinesFromGzipFiles(filepaths, workers=2, chunksize=1))
+    assert next(lines) == b"file 1 line 1\n"
+    lines.close()
+
+
+def test_parallel_read_raises_worker_errors(datadir):
+    filepaths = [os.path.join(datadir, "file1.gz"), os.path.join(datadir, "missing.gz")]
+    lines = LinesFromGzipFiles(filepaths, workers=2)
+
+    # Iterate rather than calling list, which would count the lines first.
+    with pytest.raises(RuntimeError, match="FileNotFoundError"):
+        for _ in lines:
+            pass
+
+
+def _exit_process(line):
+    os._exit(1)
+
+
+def test_parallel_read_raises_when_a_worker_dies(datadir):
+    filepaths = [os.path.join(datadir, "file1.gz"), os.path.join(datadir, "file2.gz")]
+    lines = LinesFromGzipFiles(filepaths, workers=2, steps=[(map, _exit_process)])
+
+    with pytest.raises(RuntimeError, match="exit code 1"):
+        list(lines)
+
+
+def test_line_count_index(datadir):
+    filepaths = [os.path.join(datadir, "file1.gz"), os.path.join(datadir, "file2.gz")]
+    assert read_line_count(filepaths[0]) is None
+
+    # By default nothing is written next to the files.
+    list(LinesFromGzipFiles(filepaths))
+    assert read_line_count(filepaths[0]) is None
+
+    # Reading the files with the index records their line counts.
+    list(LinesFromGzipFiles(filepaths, use_index=True))
+    assert read_line_count(filepaths[0]) == 2
+    assert read_line_count(filepaths[1]) == 2
+
+    # The recorded counts are trusted, so the files are not read for the length.
+    write_line_count(filepaths[0], 10)
+    assert len(LinesFromGzipFiles(filepaths, use_index=True)) == 12
+    assert len(LinesFromGzipFiles(filepaths)) == 4
+
+    # The index is ignored once the file changes.
+    stat = os.stat(filepaths[0])
+    os.utime(filepaths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert read_line_count(filepaths[0]) is None
+    assert len(LinesFromGzipFiles(filepaths, use_index=True)) == 4
+    assert read_line_count(filepaths[0]) == 2
+
+
+def test_line_count_index_in_read_only_directory(datadir, monkeypatch):
+    filepath = os.path.join(datadir, "file1.gz")
+
+    def replace(src, dst):
+        raise PermissionError("Read-only directory.")
+
+    monkeypatch.setattr(fileio.os, "replace", replace)
+    assert list(LinesFromGzipFiles([filepath], use_index=True)) == [
+        b"file 1 line 1\n",
+        b"file 1 line 2\n",
+    ]
+    assert read_line_count(filepath) is None
+    assert not [name for name in os.listdir(datadir) if name.endswith(".tmp")]
+
+
+def test_line_offsets_index(datadir, tmp_path):
+    filepath = os.path.join(datadir, "file2.gz")
+    index = GzipLineIndex.for_file(filepath)
+    assert len(index) == 2
+    assert list(index.read_lines(filepath, [1])) == [b"file 2 line 2\n"]
+    assert read_line_count(filepath) == 2
+
+    # The saved index is reused.
+    assert GzipLineIndex.load(filepath).line_offsets.tolist() == [0, 14]
+
+    # Rewritten files have a restart point every few lines.
+    lines = [b"line %d\n" % i for i in range(10)]
+    with gzip.open(str(tmp_path / "lines.gz"), "wb") as f:
+        f.writelines(lines)
+    seekable = str(tmp_path / "seekable.gz")
+    write_seekable_gzip(str(tmp_path / "lines.gz"), seekable, lines_per_member=3)
+    with gzip.open(seekable, "rb") as f:
+        assert list(f) == lines
+    index = GzipLineIndex.load(seekable)
+    assert len(index.restart_points) == 4
+    assert list(index.read_lines(seekable, [8, 0, 4, 5])) == [
+        lines[0],
+        lines[4],
+        lines[5],
+        lines[8],
+    ]
+
+    all_lines = LinesFromGzipFiles([filepath, seekable])
+    assert list(all_lines.subset([1, 2, 11, 100])) == [
+        b"file 2 line 2\n",
+        lines[0],
+        lines[9],
+    ]
+
+
+def test_make_seekable_gzip(tmp_path):
+    lines = [b"line %d\n" % i for i in range(10)]
+    filepath = str(tmp_path / "lines.gz")
+    with gzip.open(filepath, "wb") as f:
+        f.writelines(lines)
+
+    output_dir = tmp_path / "seekable"
+    make_seekable_gzip.main(
+        [filepath, "--output-dir", str(output_dir), "--lines-per-member", "4"]
+    )
+    index = GzipLineIndex.load(str(output_dir / "lines.gz"))
+    assert len(index.restart_points) == 3
+
+    # Without an output directory, the files are rewritten in place.
+    make_seekable_gzip.main([filepath, "--lines-per-member", "4"])
+    with gzip.open(filepath, "rb") as f:
+        assert list(f) == lines
+    assert len(GzipLineIndex.load(filepath).restart_points) == 3
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "lines.gz",
+        "lines.gz" + fileio.LINE_COUNT_SUFFIX,
+        "lines.gz" + fileio.LINE_OFFSETS_SUFFIX,
+        "seekable",
+    ]
+
+
+def test_line_offsets_index_with_magic_bytes_split_across_reads(tmp_path, monkeypatch):
+    members = [gzip.compress(b"member %d\n" % i) for i in range(3)]
+    filepath = str(tmp_path / "members.gz")
+    with open(filepath, "wb") as f:
+        f.write(b"".join(members))
+    # The first read ends after the first byte of the second member.
+    monkeypatch.setattr(fileio, "_INDEX_READ_SIZE", len(members[0]) + 1)
+    index = GzipLineIndex.build(filepath)
+    assert len(index) == 3
+    assert len(index.restart_points) == 3
+    assert list(index.read_lines(filepath, [2])) == [b"member 2\n"]
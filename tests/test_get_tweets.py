@@ -1,5 +1,8 @@
 import os
 
+import pytest
+
+from twitter_analysis_tools.twitter import tweet_info
 from twitter_analysis_tools.twitter.get_tweets import TweetsFromFiles
 
 
@@ -35,3 +38,75 @@ def test_tweets_from_single_file(datadir):
     ]
 
     assert len(tweets) == 2
+
+
+def test_tweets_from_files_in_parallel(datadir):
+    filepaths = [
+        os.path.join(datadir, "tweets1.jsonl.gz"),
+        os.path.join(datadir, "tweets2.jsonl.gz"),
+    ]
+    tweets = TweetsFromFiles(*filepaths, workers=2)
+    assert list(tweets) == [
+        {"full_text": "Text of tweet 0 in file tweets1.jsonl.gz"},
+        {"full_text": "Text of tweet 1 in file tweets1.jsonl.gz"},
+        {"full_text": "Text of tweet 0 in file tweets2.jsonl.gz"},
+        {"full_text": "Text of tweet 1 in file tweets2.jsonl.gz"},
+    ]
+    assert len(tweets) == 4
+
+    tweets = TweetsFromFiles(*filepaths, workers=2, ordered=False)
+    assert len(list(tweets)) == 4
+
+
+def test_subset_tweets_from_files(datadir):
+    filepaths = [
+        os.path.join(datadir, "tweets1.jsonl.gz"),
+        os.path.join(datadir, "tweets2.jsonl.gz"),
+    ]
+    tweets = TweetsFromFiles(*filepaths).subset([3, 1])
+    assert list(tweets) == [
+        {"full_text": "Text of tweet 1 in file tweets1.jsonl.gz"},
+        {"full_text": "Text of tweet 1 in file tweets2.jsonl.gz"},
+    ]
+    assert len(tweets) == 2
+
+    tweets = TweetsFromFiles(*filepaths).subsample(3)
+    assert len(list(tweets)) == 3
+
+
+@pytest.mark.parametrize("backend", tweet_info.JSON_BACKENDS)
+def test_tweets_from_files_json_backends(datadir, backend):
+    filepath = os.path.join(datadir, "tweets1.jsonl.gz")
+    tweet_info.set_json_backend(backend)
+    try:
+        assert list(TweetsFromFiles(filepath)) == [
+            {"full_text": "Text of tweet 0 in file tweets1.jsonl.gz"},
+            {"full_text": "Text of tweet 1 in file tweets1.jsonl.gz"},
+        ]
+
+        tweets = TweetsFromFiles(
+            filepath, fields=["lang"], present_fields=["full_text"]
+        )
+        assert list(tweets) == [{"full_text": True}, {"full_text": True}]
+    finally:
+        tweet_info.set_json_backend(tweet_info.JSON_BACKENDS[0])
+
+
+def test_tweets_from_files_passes_json_backend_to_workers(datadir):
+    filepaths = [
+        os.path.join(datadir, "tweets1.jsonl.gz"),
+        os.path.join(datadir, "tweets2.jsonl.gz"),
+    ]
+    tweet_info.set_json_backend("json")
+    try:
+        tweets = TweetsFromFiles(*filepaths, workers=2)
+    finally:
+        tweet_info.set_json_backend(tweet_info.JSON_BACKENDS[0])
+    # The backend chosen when the pipeline was created goes with the steps
+    # run in the workers, rather than being read from their module.
+    _, parse = tweets._stream._steps[-1]
+    assert parse.keywords["backend"] == "json"
+    assert len(list(tweets)) == 4
+
+    with pytest.raises(Exception, match="not one of"):
+        TweetsFromFiles(*filepaths, json_backend="ujson")
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+import numpy as np
+
+from twitter_analysis_tools.plotting import plot_data
+
+# Modules which are slow to import, so only imported when they're used.
+_HEAVY_MODULES = ("nltk", "sklearn", "scipy", "matplotlib", "seaborn")
+
+
+def test_import_is_lazy():
+    # Import in a new process, as other tests have imported these modules.
+    code = (
+        "import sys\n"
+        "import twitter_analysis_tools\n"
+        "import twitter_analysis_tools.plotting\n"
+        "print(' '.join(m for m in {!r} if m in sys.modules))".format(_HEAVY_MODULES)
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, stdout=subprocess.PIPE
+    ).stdout
+    assert output.decode().split() == []
+
+
+def test_plot_data_restores_rc_params():
+    import matplotlib.pyplot as plt
+
+    rc_params = dict(plt.rcParams)
+    data = np.arange(40).reshape([4, 10])
+    plot_data(data, save_fig=False)
+    plot_data(data, plot_type="stackplot", save_fig=False)
+    assert dict(plt.rcParams) == rc_params
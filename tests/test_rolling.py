@@ -0,0 +1,54 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from twitter_analysis_tools import rolling
+from twitter_analysis_tools.plotting import sliding_average
+
+
+def test_rolling_reducers_match_loops():
+    data = np.random.RandomState(0).rand(5, 200)
+    window = 7
+    windows = [data[:, i : i + window] for i in range(data.shape[1] - window + 1)]
+    np.testing.assert_allclose(
+        sliding_average(data, window), np.stack([w.mean(axis=1) for w in windows], 1)
+    )
+    np.testing.assert_allclose(
+        rolling.rolling_sum(data, window), np.stack([w.sum(axis=1) for w in windows], 1)
+    )
+    np.testing.assert_array_equal(
+        rolling.rolling_median(data, window),
+        np.stack([np.median(w, axis=1) for w in windows], 1),
+    )
+
+    with pytest.raises(Exception):
+        rolling.rolling_mean(data, 201)
+
+
+@pytest.mark.parametrize("reducer", sorted(rolling.ROLLING_REDUCERS))
+def test_online_matches_batch(reducer):
+    data = np.random.RandomState(1).randint(0, 100, size=(3, 50))
+    online = rolling.RollingWindow(window=6, reducer=reducer)
+    batch = rolling.ROLLING_REDUCERS[reducer](data, 6)
+    updates = [online.update(data[:, i : i + 4]) for i in range(0, 50, 4)]
+    np.testing.assert_allclose(np.concatenate(updates, axis=1), batch)
+
+    average = rolling.ExponentialMovingAverage(alpha=0.3)
+    updates = [average.update(data[:, i]) for i in range(50)]
+    np.testing.assert_allclose(
+        np.concatenate(updates, axis=1),
+        rolling.exponential_moving_average(data, alpha=0.3),
+    )
+
+
+def test_rolling_median_memory_is_bounded():
+    data = np.random.RandomState(2).rand(200, 5000)
+    tracemalloc.start()
+    try:
+        rolling.rolling_median(data, 60)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Copying all the windows at once would take 60 times the input.
+    assert peak < 4 * data.nbytes
@@ -0,0 +1,42 @@
+import os
+
+from twitter_analysis_tools.bin import build_tweet_cache
+from twitter_analysis_tools.twitter import common_pipelines, tweet_cache
+from twitter_analysis_tools.twitter.get_tweets import TweetsFromFiles
+
+
+def test_tweets_from_cache(datadir):
+    filepath = os.path.join(datadir, "tweets.jsonl.gz")
+    assert not tweet_cache.cache_is_valid(filepath)
+
+    build_tweet_cache.main([filepath])
+    assert tweet_cache.cache_is_valid(filepath)
+
+    tweets = TweetsFromFiles(
+        filepath,
+        fields=["id", "created_at", "lang", "full_text"],
+        present_fields=["retweeted_status", "place"],
+    )
+    cached_tweets = tweet_cache.TweetsFromCache(filepath)
+    assert list(cached_tweets) == list(tweets)
+    assert len(cached_tweets) == 4
+
+
+def test_get_tweet_text_from_cache(datadir):
+    filepath = os.path.join(datadir, "tweets.jsonl.gz")
+    for include_retweets in [True, False]:
+        tweet_text = common_pipelines.get_tweet_text_pipeline(
+            filepath, include_retweets=include_retweets
+        )
+        cached_tweet_text = common_pipelines.get_tweet_text_pipeline(
+            filepath, include_retweets=include_retweets, use_cache=True
+        )
+        assert list(cached_tweet_text) == list(tweet_text)
+        assert len(cached_tweet_text) == len(list(tweet_text))
+
+    # The cache is rebuilt once the file changes.
+    stat = os.stat(filepath)
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert not tweet_cache.cache_is_valid(filepath)
+    assert len(list(tweet_cache.TextFromCache(filepath))) == 3
+    assert tweet_cache.cache_is_valid(filepath)
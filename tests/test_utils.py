@@ -0,0 +1,144 @@
+from collections import Counter
+
+import pytest
+
+from twitter_analysis_tools.utils import Pipeline
+
+
+def _inclusion_counts(sample, num_runs):
+    """Count how often each element is kept over runs with different seeds."""
+    counts = Counter()
+    for seed in range(num_runs):
+        counts.update(sample(seed))
+    return counts
+
+
+def test_reservoir_sample():
+    pipeline = Pipeline(range(100)).reservoir_sample(10, seed=0)
+    sample = list(pipeline)
+    assert len(sample) == 10
+    assert len(pipeline) == 10
+    # The sample is in stream order, and the same on every iteration.
+    assert sample == sorted(set(sample))
+    assert set(sample) <= set(range(100))
+    assert list(pipeline) == sample
+    assert list(Pipeline(range(100)).reservoir_sample(10, seed=0)) == sample
+    assert list(Pipeline(range(100)).reservoir_sample(10, seed=1)) != sample
+
+    # Each element is kept 1000 * 5 / 20 = 250 times on average.
+    counts = _inclusion_counts(
+        lambda seed: Pipeline(range(20)).reservoir_sample(5, seed=seed), 1000
+    )
+    assert sorted(counts) == list(range(20))
+    assert 190 < min(counts.values()) and max(counts.values()) < 310
+
+
+@pytest.mark.parametrize("num_samples", [5, 6, 10])
+def test_reservoir_sample_of_short_stream(num_samples):
+    pipeline = Pipeline(range(5)).reservoir_sample(num_samples, seed=0)
+    assert list(pipeline) == [0, 1, 2, 3, 4]
+    assert len(pipeline) == 5
+
+
+def test_bernoulli_sample():
+    pipeline = Pipeline(range(10000)).bernoulli_sample(0.1, seed=0)
+    sample = list(pipeline)
+    assert 850 < len(sample) < 1150
+    assert len(pipeline) == len(sample)
+    assert sample == sorted(set(sample))
+    assert list(pipeline) == sample
+    assert list(Pipeline(range(10000)).bernoulli_sample(0.1, seed=0)) == sample
+
+    # Each element is kept 1000 * 0.25 = 250 times on average.
+    counts = _inclusion_counts(
+        lambda seed: Pipeline(range(20)).bernoulli_sample(0.25, seed=seed), 1000
+    )
+    assert sorted(counts) == list(range(20))
+    assert 190 < min(counts.values()) and max(counts.values()) < 310
+
+    # None elements aren't mistaken for the end of the stream.
+    nones = list(Pipeline([None] * 100).bernoulli_sample(0.5, seed=0))
+    assert len(nones) == len(list(Pipeline(range(100)).bernoulli_sample(0.5, seed=0)))
+
+
+@pytest.mark.parametrize("rate, expected", [(0, []), (1, list(range(10)))])
+def test_bernoulli_sample_of_all_or_nothing(rate, expected):
+    pipeline = Pipeline(range(10)).bernoulli_sample(rate, seed=0)
+    assert list(pipeline) == expected
+    assert len(pipeline) == len(expected)
+
+
+def test_stride_sample():
+    pipeline = Pipeline(range(100)).stride_sample(10, offset=3)
+    assert list(pipeline) == list(range(3, 100, 10))
+    assert len(pipeline) == 10
+    assert list(Pipeline(range(5)).stride_sample(2)) == [0, 2, 4]
+    assert len(Pipeline(range(5)).stride_sample(10, offset=5)) == 0
+
+
+def test_sampled_length_replaces_precomputed_length():
+    pipeline = Pipeline(range(100), precompute_len=True)
+    assert len(pipeline) == 100
+    pipeline.stride_sample(4)
+    assert len(pipeline) == 25
+    pipeline.reservoir_sample(10, seed=0)
+    assert len(pipeline) == 10
+    pipeline.bernoulli_sample(0, seed=0)
+    assert len(pipeline) == 0
+
+
+def _squares(batch):
+    return [x * x for x in batch]
+
+
+def _is_even(batch):
+    return [x % 2 == 0 for x in batch]
+
+
+def test_add_batch_map_and_filter():
+    # The final batch of 10 items in batches of 3 has a single item.
+    batch_sizes = []
+
+    def squares(batch):
+        batch_sizes.append(len(batch))
+        return _squares(batch)
+
+    pipeline = Pipeline(range(10)).add_batch_map(squares, batch_size=3)
+    assert list(pipeline) == [x * x for x in range(10)]
+    assert batch_sizes == [3, 3, 3, 1]
+    assert len(pipeline) == 10
+
+    pipeline = Pipeline(range(10)).add_batch_filter(_is_even, batch_size=3)
+    assert list(pipeline) == [0, 2, 4, 6, 8]
+    assert len(pipeline) == 5
+
+
+def test_add_batch_map_in_parallel():
+    # Chunks of 4 items sent to the workers are split into batches of 3.
+    pipeline = Pipeline(range(25)).add_batch_map(_squares, batch_size=3)
+    pipeline.add_batch_filter(_is_even, batch_size=3)
+    pipeline.add_batch_map(_squares, batch_size=3)
+    pipeline.parallel(2, chunksize=4)
+    assert list(pipeline) == [pow(x, 4) for x in range(0, 25, 2)]
+    assert len(pipeline) == 13
+
+    # Batch maps keep the length of the stream, which isn't read for it.
+    pipeline = Pipeline(range(25)).add_batch_map(_squares, batch_size=3)
+    pipeline.parallel(2, chunksize=4)
+    assert len(pipeline) == 25
+    assert list(pipeline) == [x * x for x in range(25)]
+
+
+def test_batch_and_unbatch():
+    pipeline = Pipeline(range(10)).batch(4)
+    assert list(pipeline) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert len(pipeline) == 3
+
+    pipeline.add_map(_squares)
+    pipeline.unbatch()
+    assert list(pipeline) == [x * x for x in range(10)]
+    assert len(pipeline) == 10
+
+    # Batches are emitted whole, and the round trip keeps an empty stream.
+    assert list(Pipeline(range(8)).batch(4)) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert list(Pipeline([]).batch(4).unbatch()) == []
@@ -1,6 +1,20 @@
+import gzip
+import json
 import os
+import pickle
+import shutil
+from collections import Counter
 
-from twitter_analysis_tools.twitter import common_pipelines
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer
+
+from twitter_analysis_tools.text import tokenize
+from twitter_analysis_tools.text.ngrams import NgramCounter
+from twitter_analysis_tools.text.stopwords import StopwordFilter
+from twitter_analysis_tools.text.terms import TermDictionary
+from twitter_analysis_tools.text.tokenize import get_tokenizer
+from twitter_analysis_tools.twitter import common_pipelines, vocabulary_file
+from twitter_analysis_tools.twitter.vocabulary import Vocabulary
 
 
 def test_get_tweet_text(datadir):
@@ -22,3 +36,341 @@ def test_get_tweet_text(datadir):
         "Hello my friend, how are you?",
         "My dog ate my homework. Sorry it is late.",
     ]
+
+
+def test_fast_tokenizer_matches_nltk(datadir):
+    filepath = os.path.join(datadir, "test_tweets.jsonl.gz")
+    texts = list(
+        common_pipelines.get_tweet_text_pipeline(filepath, include_retweets=True)
+    )
+    texts += [
+        "RT @User: Sooooo GOOD!!!! :D &amp; :P http://t.co/AbC #Yes 555-123-4567",
+        # Characters which the re and regex modules treat differently.
+        "Caf\u00e9 \u2019quoted\u2019 \u0915\u093f \u00b2\u200d\u216b \x1c",
+    ]
+    for preserve_case in (True, False):
+        fast = get_tokenizer("fast", preserve_case=preserve_case)
+        nltk = get_tokenizer("nltk", preserve_case=preserve_case)
+        assert fast.tokenize_batch(texts) == nltk.tokenize_batch(texts)
+
+
+def test_fast_tokenizer_finds_nltk_internals(monkeypatch):
+    # Fails loudly if NLTK moves the names the fast backend relies on.
+    patterns = tokenize._TweetPatterns()
+    assert patterns.replace_html_entities("&amp;") == "&"
+    assert patterns.hang_re.sub(r"\1\1\1", "!!!!!!") == "!!!"
+
+    from nltk.tokenize import casual
+
+    monkeypatch.delattr(casual, "HANG_RE")
+    with pytest.raises(Exception, match="HANG_RE"):
+        tokenize._TweetPatterns()
+
+
+def test_get_bag_of_words_per_file_in_batches(datadir):
+    filepath = os.path.join(datadir, "test_tweets.jsonl.gz")
+    tweet_text = list(
+        common_pipelines.get_tweet_text_pipeline(filepath, include_retweets=True)
+    )
+    vectorizer = CountVectorizer().fit(tweet_text)
+    (bag_of_words,) = common_pipelines.get_bag_of_words_per_file(
+        [filepath], include_retweets=True, vectorizer=vectorizer, batch_size=3
+    )
+    expected = vectorizer.transform(tweet_text).transpose()
+    assert (bag_of_words != expected).nnz == 0
+
+
+def test_get_bag_of_words_by_id(datadir):
+    filepath = os.path.join(datadir, "test_tweets.jsonl.gz")
+    tweet_text = list(
+        common_pipelines.get_tweet_text_pipeline(filepath, include_retweets=True)
+    )
+    tokenizer = get_tokenizer(preserve_case=False)
+    # Leave out some tokens, which are then skipped.
+    term_dictionary = TermDictionary(
+        sorted(set(tokenizer.tokenize(" ".join(tweet_text))))[::2]
+    )
+    vectorizer = CountVectorizer(
+        vocabulary=dict(zip(term_dictionary.tokens, range(len(term_dictionary)))),
+        tokenizer=tokenizer.tokenize,
+        lowercase=False,
+        token_pattern=None,
+    )
+    expected = vectorizer.transform(tweet_text).transpose()
+    assert expected.nnz > 0
+
+    (bag_of_words,) = common_pipelines.get_bag_of_words_per_file(
+        [filepath], include_retweets=True, term_dictionary=term_dictionary, batch_size=3
+    )
+    assert bag_of_words.shape == expected.shape
+    assert (bag_of_words != expected).nnz == 0
+
+    ((key, bag_of_words),) = common_pipelines.get_bag_of_words_per_slice(
+        [filepath],
+        True,
+        term_dictionary=term_dictionary,
+        slice_by=len(tweet_text),
+        batch_size=3,
+        return_keys=True,
+    )
+    assert key == 0
+    assert (bag_of_words != expected).nnz == 0
+
+    with pytest.raises(Exception, match="either"):
+        common_pipelines.get_bag_of_words_per_file([filepath], True)
+    with pytest.raises(Exception, match="either"):
+        common_pipelines.get_bag_of_words_per_slice(
+            [filepath], True, vectorizer, term_dictionary=term_dictionary
+        )
+
+
+def test_get_bag_of_words_per_slice(tmp_path):
+    filepath = str(tmp_path / "tweets.jsonl.gz")
+    created_ats = [
+        "Sun Oct 07 23:59:59 +0000 2018",
+        "Mon Oct 08 00:00:00 +0000 2018",
+        "Mon Oct 08 01:30:00 +0000 2018",
+        "Wed Oct 10 20:19:24 +0000 2018",
+    ]
+    with gzip.open(filepath, "wt") as f:
+        for i, created_at in enumerate(created_ats):
+            tweet = {"created_at": created_at, "lang": "en", "full_text": f"word{i}"}
+            f.write(json.dumps(tweet) + "\n")
+    vectorizer = CountVectorizer().fit([f"word{i}" for i in range(4)])
+
+    def slice_sizes(slice_by):
+        bags_of_words = common_pipelines.get_bag_of_words_per_slice(
+            [filepath], True, vectorizer, slice_by=slice_by, batch_size=1
+        )
+        return [bag_of_words.shape for bag_of_words in bags_of_words]
+
+    assert slice_sizes("hour") == [(4, 1), (4, 1), (4, 1), (4, 1)]
+    assert slice_sizes("day") == [(4, 1), (4, 2), (4, 1)]
+    assert slice_sizes("week") == [(4, 1), (4, 3)]
+    assert slice_sizes(3) == [(4, 3), (4, 1)]
+
+    ((key, bag_of_words),) = common_pipelines.get_bag_of_words_per_slice(
+        [filepath], True, vectorizer, slice_by=10, return_keys=True
+    )
+    assert key == 0
+    expected = vectorizer.transform(["word0", "word1", "word2", "word3"]).T
+    assert (bag_of_words != expected).nnz == 0
+
+    # A tweet from an earlier day than the one before it isn't split off.
+    with gzip.open(filepath, "at") as f:
+        tweet = {"created_at": created_ats[0], "lang": "en", "full_text": "word0"}
+        f.write(json.dumps(tweet) + "\n")
+    with pytest.raises(Exception, match="order"):
+        slice_sizes("day")
+    assert slice_sizes(3) == [(4, 3), (4, 2)]
+
+
+def test_get_tweet_text_in_parallel(datadir):
+    filepath = os.path.join(datadir, "test_tweets.jsonl.gz")
+    tweet_text = common_pipelines.get_tweet_text_pipeline(
+        filepath, include_retweets=False
+    )
+    tweet_text = tweet_text.parallel(workers=2, chunksize=1)
+    assert list(tweet_text) == [
+        "Hello my friend, how are you?",
+        "My dog ate my homework. Sorry it is late.",
+    ]
+
+
+def test_build_vocabulary_for_file(datadir):
+    filepath = os.path.join(datadir, "test_tweets.jsonl.gz")
+    vocab = Vocabulary(include_retweets=False).build_vocabulary_for_file(filepath)
+    assert vocab["term_counts"] == {
+        "hello": 1,
+        "hello friend": 1,
+        "friend": 1,
+        "dog": 1,
+        "dog ate": 1,
+        "ate": 1,
+        "ate homework": 1,
+        "homework": 1,
+        "homework sorry": 1,
+        "sorry": 1,
+        "sorry late": 1,
+        "late": 1,
+    }
+
+    vocab = Vocabulary(
+        include_retweets=True,
+        max_ngram_len=1,
+        stopword_filter=StopwordFilter(["dog", "ate", "homework", "sorry", "late"]),
+    ).build_vocabulary_for_file(filepath)
+    assert vocab["term_counts"] == {"hello": 2, "friend": 2}
+
+
+def test_build_approximate_vocabulary_for_file(datadir):
+    filepath = os.path.join(datadir, "test_tweets.jsonl.gz")
+    vocab = Vocabulary(
+        include_retweets=True,
+        max_ngram_len=1,
+        stopword_filter=StopwordFilter(["ate", "homework", "sorry", "late"]),
+        max_terms=2,
+    ).build_vocabulary_for_file(filepath)
+    assert vocab["term_counts"] == {"hello": 2, "friend": 2}
+
+    # The sketches fit in a memory budget, or are sized for an error bound.
+    vocab = Vocabulary(
+        include_retweets=True,
+        max_ngram_len=1,
+        stopword_filter=StopwordFilter(["ate", "homework", "sorry", "late"]),
+        max_terms=2,
+        sketch_nbytes=1 << 16,
+    ).build_vocabulary_for_file(filepath)
+    assert vocab["term_counts"] == {"hello": 2, "friend": 2}
+    counter = NgramCounter(1, max_terms=2, doc_counts=True, sketch_nbytes=1 << 16)
+    assert counter._term_counts.sketch.nbytes + counter._doc_counts.nbytes <= 1 << 16
+    counter = NgramCounter(1, max_terms=2, epsilon=0.01, delta=0.1)
+    assert counter._term_counts.sketch.epsilon <= 0.01
+
+    # Ngrams too long to pack are counted exactly.
+    vocab = Vocabulary(
+        include_retweets=True, max_ngram_len=4, max_terms=1
+    ).build_vocabulary_for_file(filepath)
+    assert vocab["term_counts"] == {"hello": 2}
+    assert vocab["doc_counts"] == {"hello": 2}
+
+
+def test_ngram_counter_adds_up_ngrams_decoded_alike():
+    counter = NgramCounter(2, doc_counts=True)
+    # A token containing a space decodes like a bigram.
+    counter.update([["a b"], ["a", "b"]])
+    assert counter.to_counter() == {"a": 1, "b": 1, "a b": 2}
+    assert counter.doc_counter() == {"a": 1, "b": 1, "a b": 2}
+
+
+def test_build_vocabulary_for_files(datadir, monkeypatch):
+    month_dir = os.path.join(datadir, "2020-03")
+    os.mkdir(month_dir)
+    filepaths = []
+    for hour in range(3):
+        filepath = os.path.join(
+            month_dir, "coronavirus-tweet-id-2020-03-01-{:02}.jsonl.gz".format(hour)
+        )
+        shutil.copy(os.path.join(datadir, "test_tweets.jsonl.gz"), filepath)
+        filepaths.append(filepath)
+
+    vocabulary = Vocabulary(data_dir=str(datadir), include_retweets=False)
+    vocab = vocabulary.build(filepaths, workers=2, min_count=3, save_file_vocabs=True)
+    assert vocab["term_counts"] == {
+        term: 3
+        for term in Vocabulary(include_retweets=False).build_vocabulary_for_file(
+            filepaths[0]
+        )["term_counts"]
+    }
+    assert not vocabulary.build(filepaths, min_count=4)["term_counts"]
+    assert all(vocabulary.vocab_exists(filepath) for filepath in filepaths)
+    # A new index finds the saved vocabularies with a single walk.
+    assert len(Vocabulary(data_dir=str(datadir)).vocab_index) == 3
+    # Only the year-month directories are listed, not other directories.
+    os.makedirs(os.path.join(datadir, "other", "2020-03"))
+    shutil.copy(
+        vocabulary.vocab_filepath(filepaths[0]),
+        os.path.join(datadir, "other", "2020-03"),
+    )
+    assert len(Vocabulary(data_dir=str(datadir)).vocab_index) == 3
+    assert not Vocabulary(data_dir=str(datadir)).vocab_exists(filepaths[0])
+
+    # Saved vocabularies are merged on disk rather than built from the tweets
+    # or loaded.
+    for filepath in filepaths:
+        os.remove(filepath)
+    monkeypatch.setattr(vocabulary_file, "load_vocabulary", None)
+    assert vocabulary.build(filepaths, min_count=3) == vocab
+
+
+def test_merge_vocabulary_files(tmpdir):
+    paths = [str(tmpdir.join("{}.vocab".format(i))) for i in range(3)]
+    term_counts = [
+        Counter({"a": 1, "b": 2, "ü": 1}),
+        Counter({"b": 1, "c": 5}),
+        Counter({"a": 1, "ü": 3}),
+    ]
+    for path, counts in zip(paths, term_counts):
+        vocabulary_file.save_vocabulary(
+            path, {"stopwords": frozenset(["the"]), "term_counts": counts}
+        )
+
+    merged = vocabulary_file.merge_vocabulary_files(
+        paths, str(tmpdir.join("merged.vocab")), min_count=3
+    )
+    assert merged.to_counter() == {"b": 3, "c": 5, "ü": 4}
+    assert merged.most_common(2) == [("c", 5), ("ü", 4)]
+    assert merged.params == {"stopwords": frozenset(["the"]), "min_count": 3}
+
+    # Vocabularies pickled by older versions can still be loaded.
+    legacy_path = str(tmpdir.join("legacy.pickle"))
+    with open(legacy_path, "wb") as file:
+        pickle.dump({"term_counts": term_counts[0]}, file)
+    assert vocabulary_file.load_vocabulary(legacy_path) == {
+        "term_counts": term_counts[0]
+    }
+
+
+def test_update_aggregate_vocabulary(datadir):
+    filepaths = []
+    for hour in range(3):
+        filepath = os.path.join(
+            datadir, "coronavirus-tweet-id-2020-03-01-{:02}.jsonl.gz".format(hour)
+        )
+        shutil.copy(os.path.join(datadir, "test_tweets.jsonl.gz"), filepath)
+        filepaths.append(filepath)
+    aggregate_path = os.path.join(datadir, "aggregate.vocab")
+    vocabulary = Vocabulary(data_dir=str(datadir), include_retweets=True)
+
+    aggregate = vocabulary.update_aggregate(aggregate_path, filepaths[:2])
+    assert aggregate["hello"] == 4
+    assert aggregate.get_doc_count("hello") == 4
+    assert aggregate.params["num_docs"] == 8
+
+    # Only the new file is added, so the first two aren't counted twice.
+    aggregate = vocabulary.update_aggregate(aggregate_path, filepaths, workers=2)
+    assert aggregate["hello"] == 6
+    assert aggregate.params["num_docs"] == 12
+    assert aggregate.params["date_hours"] == [
+        "2020-03-01-00",
+        "2020-03-01-01",
+        "2020-03-01-02",
+    ]
+    assert aggregate.to_vocab_dict()["term_counts"] == {
+        term: 3 * count
+        for term, count in vocabulary.build_vocabulary_for_file(filepaths[0])[
+            "term_counts"
+        ].items()
+    }
+
+
+def test_update_aggregate_vocabulary_with_max_terms(tmp_path):
+    texts = [
+        "apple apple kiwi",
+        "banana banana banana apple",
+        "cherry cherry cherry apple",
+    ]
+    filepaths = []
+    for hour, text in enumerate(texts):
+        filepath = os.path.join(
+            str(tmp_path), "coronavirus-tweet-id-2020-03-01-{:02}.jsonl.gz".format(hour)
+        )
+        with gzip.open(filepath, "wt") as f:
+            f.write(json.dumps({"lang": "en", "full_text": text}) + "\n")
+        filepaths.append(filepath)
+    aggregate_path = os.path.join(str(tmp_path), "aggregate.vocab")
+    vocabulary = Vocabulary(str(tmp_path), max_ngram_len=1, max_terms=2)
+
+    vocabulary.update_aggregate(aggregate_path, filepaths[:1])
+    aggregate = vocabulary.update_aggregate(aggregate_path, filepaths)
+    # "apple" is in the tail of the new files but the most frequent overall.
+    assert aggregate.most_common(1) == [("apple", 4)]
+    assert (
+        aggregate.to_counter()
+        == vocabulary.build(filepaths, prune=False)["term_counts"]
+    )
+
+    with pytest.raises(Exception, match="max_terms"):
+        Vocabulary(str(tmp_path), max_ngram_len=1).update_aggregate(
+            aggregate_path, filepaths
+        )